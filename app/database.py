@@ -1,5 +1,6 @@
 import sqlite3
 import os
+import json
 from contextlib import contextmanager
 from typing import Optional
 import uuid
@@ -7,6 +8,10 @@ import uuid
 
 DATABASE_URL = "feedny.db"
 
+# Bumped whenever feedbacks are deleted, so caches built from them (new
+# feedbacks are detected through their IDs) know to reload
+_feedback_generation = 0
+
 
 @contextmanager
 def get_db():
@@ -22,6 +27,38 @@ def get_db():
         conn.close()
 
 
+def ping_db():
+    """Cheapest round trip to the database; raises sqlite3.Error if it is unusable."""
+    with get_db() as conn:
+        conn.execute("SELECT 1").fetchone()
+
+
+# Collection day of a feedback row (days since the Unix epoch), and whether
+# the row counts in the emotion statistics
+_EMOTION_DAY = "CAST(julianday({row}.created_at) - 2440587.5 AS INTEGER)"
+_EMOTION_VALID = (
+    "{row}.emotion BETWEEN 1 AND 10 AND {row}.teacher_id IS NOT NULL AND julianday({row}.created_at) IS NOT NULL"
+)
+_EMOTION_ADD = f"""
+    INSERT INTO emotion_daily (teacher_id, day, emotion, count)
+    SELECT NEW.teacher_id, {_EMOTION_DAY.format(row="NEW")}, NEW.emotion, 1
+    WHERE {_EMOTION_VALID.format(row="NEW")}
+    ON CONFLICT (teacher_id, day, emotion) DO UPDATE SET count = count + 1;
+"""
+_EMOTION_REMOVE = f"""
+    UPDATE emotion_daily SET count = count - 1
+    WHERE teacher_id = OLD.teacher_id AND day = {_EMOTION_DAY.format(row="OLD")} AND emotion = OLD.emotion;
+"""
+_EMOTION_DAILY_TRIGGERS = f"""
+CREATE TRIGGER IF NOT EXISTS feedbacks_emotion_insert AFTER INSERT ON feedbacks
+BEGIN {_EMOTION_ADD} END;
+CREATE TRIGGER IF NOT EXISTS feedbacks_emotion_delete AFTER DELETE ON feedbacks
+BEGIN {_EMOTION_REMOVE} END;
+CREATE TRIGGER IF NOT EXISTS feedbacks_emotion_update AFTER UPDATE OF emotion, created_at, teacher_id ON feedbacks
+BEGIN {_EMOTION_REMOVE} {_EMOTION_ADD} END;
+"""
+
+
 def init_db():
     """Initialize the database with required tables and run migrations."""
     with get_db() as conn:
@@ -44,14 +81,120 @@ def init_db():
             conn.execute("ALTER TABLE feedbacks ADD COLUMN teacher_id INTEGER DEFAULT 1")
             conn.commit()
 
+        # Migration: Add terms_indexed column if it doesn't exist (existing
+        # feedbacks get their token bag on first use)
+        try:
+            conn.execute("SELECT terms_indexed FROM feedbacks LIMIT 1")
+        except sqlite3.OperationalError:
+            conn.execute("ALTER TABLE feedbacks ADD COLUMN terms_indexed BOOLEAN DEFAULT 0")
+            conn.commit()
+
+        # Feedbacks are always read per teacher; the index also gives MAX(id) per teacher
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_feedbacks_teacher ON feedbacks (teacher_id)")
+        # Feedbacks still without a token bag, found without scanning the indexed ones
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_feedbacks_unindexed ON feedbacks (teacher_id) WHERE terms_indexed = 0"
+        )
+        conn.commit()
 
-def insert_feedback(content: str, device_id: str, emotion: Optional[int] = None, teacher_id: int = 1) -> int:
-    """Insert a new feedback and return its ID."""
+        # Migration: Add incremental analysis watermark columns if they don't exist
+        for column, column_type in (
+            ("feedback_ids", "TEXT"), ("max_feedback_id", "INTEGER"), ("term_counts", "TEXT"), ("wordcloud_layout", "TEXT"),
+            ("wordcloud_thumbnail", "TEXT"), ("token_counts", "TEXT")
+        ):
+            try:
+                conn.execute(f"SELECT {column} FROM analysis_history LIMIT 1")
+            except sqlite3.OperationalError:
+                conn.execute(f"ALTER TABLE analysis_history ADD COLUMN {column} {column_type}")
+                conn.commit()
+
+        # Migration: Add wordcloud_format column to analysis jobs if it doesn't exist
+        try:
+            conn.execute("SELECT wordcloud_format FROM analysis_jobs LIMIT 1")
+        except sqlite3.OperationalError:
+            conn.execute("ALTER TABLE analysis_jobs ADD COLUMN wordcloud_format TEXT")
+            conn.commit()
+
+        # Migration: Add wordcloud_thumbnail column to analysis jobs if it doesn't exist
+        try:
+            conn.execute("SELECT wordcloud_thumbnail FROM analysis_jobs LIMIT 1")
+        except sqlite3.OperationalError:
+            conn.execute("ALTER TABLE analysis_jobs ADD COLUMN wordcloud_thumbnail TEXT")
+            conn.commit()
+
+        # Migration: Add prompt-size columns to analysis telemetry if they don't exist
+        for column in ("raw_lines", "prompt_lines", "raw_chars", "prompt_chars"):
+            try:
+                conn.execute(f"SELECT {column} FROM analysis_telemetry LIMIT 1")
+            except sqlite3.OperationalError:
+                conn.execute(f"ALTER TABLE analysis_telemetry ADD COLUMN {column} INTEGER")
+                conn.commit()
+
+        # Migration: Maintain the per-day emotion aggregate with triggers, and
+        # fill it from the existing feedbacks when they are first created
+        if not conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'feedbacks_emotion_insert'"
+        ).fetchone():
+            conn.executescript(_EMOTION_DAILY_TRIGGERS)
+            conn.execute("DELETE FROM emotion_daily")
+            conn.execute(
+                f"""INSERT INTO emotion_daily (teacher_id, day, emotion, count)
+                    SELECT teacher_id, {_EMOTION_DAY.format(row="feedbacks")} AS day, emotion, COUNT(*)
+                    FROM feedbacks
+                    WHERE {_EMOTION_VALID.format(row="feedbacks")}
+                    GROUP BY teacher_id, day, emotion"""
+            )
+            conn.commit()
+
+
+def _store_token_bags(conn: sqlite3.Connection, bags: list[tuple[int, dict[str, int]]]):
+    """
+    Store (feedback_id, token bag) pairs in feedback_terms and mark those
+    feedbacks as indexed. Bags are per-spelling term counts, computed by the
+    service layer (app.services.feedback_terms); the caller commits.
+    """
+    if not bags:
+        return
+
+    vocabulary = sorted({term for _, bag in bags for term in bag})
+    conn.executemany("INSERT OR IGNORE INTO terms (term) VALUES (?)", ((term,) for term in vocabulary))
+    term_ids = {}
+    for start in range(0, len(vocabulary), 500):
+        chunk = vocabulary[start:start + 500]
+        placeholders = ','.join('?' * len(chunk))
+        term_ids.update(
+            (row[1], row[0])
+            for row in conn.execute(f"SELECT id, term FROM terms WHERE term IN ({placeholders})", chunk)
+        )
+
+    conn.executemany(
+        "INSERT OR REPLACE INTO feedback_terms (feedback_id, term_id, count) VALUES (?, ?, ?)",
+        ((feedback_id, term_ids[term], count) for feedback_id, bag in bags for term, count in bag.items())
+    )
+    conn.executemany(
+        "UPDATE feedbacks SET terms_indexed = 1 WHERE id = ?",
+        ((feedback_id,) for feedback_id, _ in bags)
+    )
+
+
+def insert_feedback(
+    content: str,
+    device_id: str,
+    emotion: Optional[int] = None,
+    teacher_id: int = 1,
+    token_counts: Optional[dict[str, int]] = None
+) -> int:
+    """
+    Insert a new feedback, with its token bag if given, and return its ID.
+    A feedback without one is indexed when its terms are first counted.
+    """
     with get_db() as conn:
         cursor = conn.execute(
             "INSERT INTO feedbacks (content, device_id, emotion, teacher_id) VALUES (?, ?, ?, ?)",
             (content, device_id, emotion, teacher_id)
         )
+        if token_counts is not None:
+            _store_token_bags(conn, [(cursor.lastrowid, token_counts)])
         conn.commit()
         return cursor.lastrowid
 
@@ -155,12 +298,19 @@ def increment_device_feedback(device_id: str):
 
 def reset_database(teacher_id: Optional[int] = None):
     """Reset the database: delete all feedbacks and device limits, or optionally filter by teacher_id."""
+    global _feedback_generation
+    _feedback_generation += 1
     with get_db() as conn:
         if teacher_id is not None:
             conn.execute("DELETE FROM device_limits WHERE device_id IN (SELECT device_id FROM feedbacks WHERE teacher_id = ?)", (teacher_id,))
+            conn.execute("DELETE FROM feedback_terms WHERE feedback_id IN (SELECT id FROM feedbacks WHERE teacher_id = ?)", (teacher_id,))
+            # Emptied first, so the delete trigger finds nothing to decrement
+            conn.execute("DELETE FROM emotion_daily WHERE teacher_id = ?", (teacher_id,))
             conn.execute("DELETE FROM feedbacks WHERE teacher_id = ?", (teacher_id,))
         else:
+            conn.execute("DELETE FROM emotion_daily")
             conn.execute("DELETE FROM feedbacks")
+            conn.execute("DELETE FROM feedback_terms")
             conn.execute("DELETE FROM device_limits")
         conn.commit()
 
@@ -182,9 +332,38 @@ def get_feedback_stats(teacher_id: int = 1) -> dict:
         }
 
 
+def feedback_generation() -> int:
+    """Counter that changes whenever feedbacks are deleted."""
+    return _feedback_generation
+
+
+def get_max_feedback_id(teacher_id: int) -> int:
+    """Highest feedback ID of a teacher (0 if none), from the (teacher_id, id) index."""
+    with get_db() as conn:
+        row = conn.execute("SELECT MAX(id) FROM feedbacks WHERE teacher_id = ?", (teacher_id,)).fetchone()
+        return row[0] or 0
+
+
+def get_feedback_emotion_counts(teacher_id: int) -> list[tuple]:
+    """
+    (emotion, collection day, count) rows for a teacher's feedbacks with a
+    valid emotion, read from the per-day aggregate kept by triggers: one row
+    per day and emotion, whatever the number of feedbacks. The day is counted
+    from the Unix epoch.
+    """
+    with get_db() as conn:
+        conn.row_factory = None
+        cursor = conn.execute(
+            "SELECT emotion, day, count FROM emotion_daily WHERE teacher_id = ? AND count > 0",
+            (teacher_id,)
+        )
+        return cursor.fetchall()
+
+
 def import_feedbacks(feedbacks_data: list[dict]) -> int:
     """
-    Import multiple feedbacks from exported data.
+    Import multiple feedbacks from exported data, with the token bag of each
+    one that has a "token_counts" entry.
     Returns the number of feedbacks imported.
     """
     if not feedbacks_data:
@@ -192,6 +371,8 @@ def import_feedbacks(feedbacks_data: list[dict]) -> int:
     
     with_created_at = []
     without_created_at = []
+    # Same content, same bag: new rows are matched to their bag by content
+    bags = {fb['content']: fb['token_counts'] for fb in feedbacks_data if fb.get('token_counts') is not None}
 
     for fb in feedbacks_data:
         device_id = fb.get('device_id') or str(uuid.uuid4())
@@ -206,6 +387,7 @@ def import_feedbacks(feedbacks_data: list[dict]) -> int:
             without_created_at.append((fb['content'], device_id, included, emotion, teacher_id))
             
     with get_db() as conn:
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM feedbacks").fetchone()[0]
         if with_created_at:
             conn.executemany(
                 """INSERT INTO feedbacks (content, device_id, created_at, included_in_analysis, emotion, teacher_id)
@@ -218,10 +400,92 @@ def import_feedbacks(feedbacks_data: list[dict]) -> int:
                    VALUES (?, ?, ?, ?, ?)""",
                 without_created_at
             )
+        if bags:
+            new_rows = conn.execute(
+                "SELECT id, content FROM feedbacks WHERE id > ? AND terms_indexed = 0", (last_id,)
+            ).fetchall()
+            _store_token_bags(conn, [(row[0], bags[row[1]]) for row in new_rows if row[1] in bags])
         conn.commit()
     return len(feedbacks_data)
 
 
+def _feedback_scope(teacher_id: int, feedback_ids: Optional[list[int]], selected_only: bool) -> tuple[str, list]:
+    """WHERE clause and parameters selecting a teacher's feedbacks."""
+    clause = "teacher_id = ?"
+    params: list = [teacher_id]
+    if feedback_ids is not None:
+        clause += f" AND id IN ({','.join('?' * len(feedback_ids))})"
+        params += list(feedback_ids)
+    if selected_only:
+        clause += " AND included_in_analysis = 1"
+    return clause, params
+
+
+def get_unindexed_feedbacks(teacher_id: int) -> list[tuple[int, str]]:
+    """(id, content) of a teacher's feedbacks without a stored token bag."""
+    with get_db() as conn:
+        conn.row_factory = None
+        return conn.execute(
+            "SELECT id, content FROM feedbacks WHERE teacher_id = ? AND terms_indexed = 0", (teacher_id,)
+        ).fetchall()
+
+
+def store_feedback_token_bags(bags: list[tuple[int, dict[str, int]]]):
+    """Store (feedback_id, token bag) pairs computed for already written feedbacks."""
+    with get_db() as conn:
+        _store_token_bags(conn, bags)
+        conn.commit()
+
+
+def get_feedback_token_counts(
+    teacher_id: int,
+    after_id: int = 0,
+    up_to_id: Optional[int] = None,
+    feedback_ids: Optional[list[int]] = None,
+    selected_only: bool = False
+) -> dict[str, int]:
+    """
+    Summed token bags (per spelling, not merged across case and plurals) of
+    a teacher's feedbacks with after_id < id <= up_to_id, or of feedback_ids
+    (all of them if None, or only those selected for analysis), in one
+    aggregate query. Running totals can thus be updated with the feedbacks
+    added since; feedbacks without a stored bag are not counted.
+    """
+    if feedback_ids is not None and not feedback_ids:
+        return {}
+    clause, params = _feedback_scope(teacher_id, feedback_ids, selected_only)
+    if after_id or up_to_id is not None:
+        clause += " AND id > ? AND id <= ?"
+        params += [after_id, up_to_id if up_to_id is not None else 2 ** 63 - 1]
+    with get_db() as conn:
+        # Aggregate on term IDs first, then look up only the distinct terms
+        conn.row_factory = None
+        cursor = conn.execute(
+            f"""SELECT t.term, s.total
+                FROM (SELECT term_id, SUM(count) AS total
+                      FROM feedback_terms
+                      WHERE feedback_id IN (SELECT id FROM feedbacks WHERE {clause})
+                      GROUP BY term_id) s
+                JOIN terms t ON t.id = s.term_id""",
+            params
+        )
+        return dict(cursor.fetchall())
+
+
+def get_feedback_contents(
+    teacher_id: int,
+    feedback_ids: Optional[list[int]] = None,
+    selected_only: bool = False
+) -> list[str]:
+    """Texts of a selection of a teacher's feedbacks (same scope as get_feedback_token_counts)."""
+    if feedback_ids is not None and not feedback_ids:
+        return []
+    clause, params = _feedback_scope(teacher_id, feedback_ids, selected_only)
+    with get_db() as conn:
+        conn.row_factory = None
+        return [row[0] for row in conn.execute(f"SELECT content FROM feedbacks WHERE {clause}", params)]
+
+
 def get_setting(key: str, default: Optional[str] = None) -> Optional[str]:
     """Get a setting value by key."""
     with get_db() as conn:
@@ -381,18 +645,29 @@ def save_analysis(teacher_id: int, summary: str, wordcloud_image: str, feedback_
         return cursor.lastrowid
 
 
+def _analysis_row(row: sqlite3.Row) -> dict:
+    """Analysis as a dict, with its wordcloud layout decoded."""
+    analysis = dict(row)
+    if analysis.get("wordcloud_layout"):
+        analysis["wordcloud_layout"] = json.loads(analysis["wordcloud_layout"])
+    return analysis
+
+
 def get_analysis_history(teacher_id: int, limit: int = 20) -> list[dict]:
-    """Get analysis history for a teacher."""
+    """
+    Get analysis history for a teacher, with wordcloud thumbnails: full images
+    are served by the analysis wordcloud endpoint.
+    """
     with get_db() as conn:
         cursor = conn.execute(
-            """SELECT id, summary, wordcloud_image, feedback_count, context, created_at
+            """SELECT id, summary, wordcloud_thumbnail, wordcloud_layout, feedback_count, context, created_at
                FROM analysis_history
                WHERE teacher_id = ?
                ORDER BY created_at DESC
                LIMIT ?""",
             (teacher_id, limit)
         )
-        return [dict(row) for row in cursor.fetchall()]
+        return [_analysis_row(row) for row in cursor.fetchall()]
 
 
 def delete_analysis_by_id(analysis_id: int, teacher_id: int) -> bool:
@@ -405,3 +680,311 @@ def delete_analysis_by_id(analysis_id: int, teacher_id: int) -> bool:
         conn.commit()
         return cursor.rowcount > 0
 
+
+# Analysis Jobs
+
+def create_analysis_job(
+    job_id: str,
+    teacher_id: int,
+    feedback_ids: list[int],
+    context: str,
+    priority: int = 0,
+    wordcloud_format: Optional[str] = None
+) -> dict:
+    """Persist a new queued analysis job and return it."""
+    with get_db() as conn:
+        conn.execute(
+            """INSERT INTO analysis_jobs (id, teacher_id, priority, feedback_ids, context, wordcloud_format)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            (job_id, teacher_id, priority, json.dumps(sorted(set(feedback_ids))), context, wordcloud_format)
+        )
+        conn.commit()
+    return get_analysis_job(job_id)
+
+
+def get_analysis_job(job_id: str, teacher_id: Optional[int] = None) -> Optional[dict]:
+    """Get an analysis job, optionally restricted to a teacher."""
+    query = "SELECT * FROM analysis_jobs WHERE id = ?"
+    params = [job_id]
+    if teacher_id is not None:
+        query += " AND teacher_id = ?"
+        params.append(teacher_id)
+    with get_db() as conn:
+        row = conn.execute(query, params).fetchone()
+        if not row:
+            return None
+        job = dict(row)
+        job["feedback_ids"] = json.loads(job["feedback_ids"])
+        return job
+
+
+def find_active_analysis_job(
+    teacher_id: int,
+    feedback_ids: list[int],
+    context: str,
+    wordcloud_format: Optional[str] = None,
+    default_format: str = "png"
+) -> Optional[dict]:
+    """
+    Find a queued or running job for the same teacher, selection, context and
+    wordcloud format; jobs without a format (NULL) use default_format.
+    """
+    with get_db() as conn:
+        row = conn.execute(
+            """SELECT id FROM analysis_jobs
+               WHERE teacher_id = ? AND feedback_ids = ? AND context = ?
+                 AND COALESCE(wordcloud_format, ?) = ?
+                 AND status IN ('queued', 'running')
+               ORDER BY created_at DESC LIMIT 1""",
+            (
+                teacher_id, json.dumps(sorted(set(feedback_ids))), context,
+                default_format, wordcloud_format or default_format
+            )
+        ).fetchone()
+    return get_analysis_job(row["id"]) if row else None
+
+
+def get_pending_analysis_jobs() -> list[dict]:
+    """Get queued and interrupted (running) jobs in priority then FIFO order."""
+    with get_db() as conn:
+        cursor = conn.execute(
+            """SELECT * FROM analysis_jobs
+               WHERE status IN ('queued', 'running')
+               ORDER BY priority DESC, created_at ASC"""
+        )
+        jobs = [dict(row) for row in cursor.fetchall()]
+    for job in jobs:
+        job["feedback_ids"] = json.loads(job["feedback_ids"])
+    return jobs
+
+
+def count_active_analysis_jobs(teacher_id: Optional[int] = None) -> int:
+    """Count queued and running jobs, optionally for a single teacher."""
+    query = "SELECT COUNT(*) AS n FROM analysis_jobs WHERE status IN ('queued', 'running')"
+    params = []
+    if teacher_id is not None:
+        query += " AND teacher_id = ?"
+        params.append(teacher_id)
+    with get_db() as conn:
+        return conn.execute(query, params).fetchone()["n"]
+
+
+def update_analysis_job_status(job_id: str, status: str, error: Optional[str] = None) -> bool:
+    """Move a job to queued, running or failed."""
+    with get_db() as conn:
+        if status == "running":
+            cursor = conn.execute(
+                "UPDATE analysis_jobs SET status = ?, started_at = CURRENT_TIMESTAMP WHERE id = ?",
+                (status, job_id)
+            )
+        elif status == "failed":
+            cursor = conn.execute(
+                "UPDATE analysis_jobs SET status = ?, error = ?, finished_at = CURRENT_TIMESTAMP WHERE id = ?",
+                (status, error, job_id)
+            )
+        else:
+            cursor = conn.execute("UPDATE analysis_jobs SET status = ? WHERE id = ?", (status, job_id))
+        conn.commit()
+        return cursor.rowcount > 0
+
+
+def set_analysis_job_thumbnail(job_id: str, thumbnail: str) -> bool:
+    """Store the wordcloud thumbnail of a running job, shown before the analysis completes."""
+    with get_db() as conn:
+        cursor = conn.execute(
+            "UPDATE analysis_jobs SET wordcloud_thumbnail = ? WHERE id = ? AND status = 'running'",
+            (thumbnail, job_id)
+        )
+        conn.commit()
+        return cursor.rowcount > 0
+
+
+def complete_analysis_job(
+    job_id: str,
+    teacher_id: int,
+    summary: str,
+    wordcloud_image: str,
+    feedback_count: int,
+    context: str,
+    charge_credit: bool = True,
+    feedback_ids: Optional[list[int]] = None,
+    term_counts: Optional[dict] = None,
+    wordcloud_layout: Optional[str] = None,
+    wordcloud_thumbnail: Optional[str] = None,
+    token_counts: Optional[dict] = None
+) -> Optional[int]:
+    """
+    Atomically save the analysis, deduct the credit and mark the job completed.
+    feedback_ids and token_counts (per spelling) are stored as the watermark
+    for incremental re-analysis, term_counts to render the wordcloud again;
+    wordcloud_layout (JSON) when the wordcloud is drawn by the browser.
+    Returns the analysis_history ID, or None if the job was already completed.
+    """
+    with get_db() as conn:
+        try:
+            cursor = conn.execute(
+                """UPDATE analysis_jobs SET status = 'completed', finished_at = CURRENT_TIMESTAMP
+                   WHERE id = ? AND status != 'completed'""",
+                (job_id,)
+            )
+            if cursor.rowcount == 0:
+                conn.rollback()
+                return None
+            if charge_credit:
+                conn.execute(
+                    "UPDATE teachers SET credits = credits - 1 WHERE id = ? AND credits > 0",
+                    (teacher_id,)
+                )
+            cursor = conn.execute(
+                """INSERT INTO analysis_history
+                   (teacher_id, summary, wordcloud_image, feedback_count, context,
+                    feedback_ids, max_feedback_id, token_counts, term_counts, wordcloud_layout,
+                    wordcloud_thumbnail)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (
+                    teacher_id, summary, wordcloud_image, feedback_count, context,
+                    json.dumps(sorted(set(feedback_ids))) if feedback_ids else None,
+                    max(feedback_ids) if feedback_ids else None,
+                    json.dumps(token_counts, ensure_ascii=False, separators=(",", ":")) if token_counts else None,
+                    json.dumps(term_counts, ensure_ascii=False, separators=(",", ":")) if term_counts else None,
+                    wordcloud_layout,
+                    wordcloud_thumbnail
+                )
+            )
+            analysis_id = cursor.lastrowid
+            conn.execute("UPDATE analysis_jobs SET analysis_id = ? WHERE id = ?", (analysis_id, job_id))
+            conn.commit()
+            return analysis_id
+        except Exception:
+            conn.rollback()
+            raise
+
+
+def get_analysis_by_id(analysis_id: int, teacher_id: int) -> Optional[dict]:
+    """Get a single analysis, only if it belongs to the teacher."""
+    with get_db() as conn:
+        cursor = conn.execute(
+            """SELECT id, summary, wordcloud_image, wordcloud_layout, wordcloud_thumbnail,
+                      feedback_count, context, created_at
+               FROM analysis_history
+               WHERE id = ? AND teacher_id = ?""",
+            (analysis_id, teacher_id)
+        )
+        row = cursor.fetchone()
+        return _analysis_row(row) if row else None
+
+
+def get_analysis_term_counts(analysis_id: int, teacher_id: int) -> Optional[dict]:
+    """
+    Term counts stored with an analysis, to render its wordcloud again; None
+    if the analysis is not the teacher's, empty if it predates stored counts.
+    """
+    with get_db() as conn:
+        row = conn.execute(
+            "SELECT term_counts FROM analysis_history WHERE id = ? AND teacher_id = ?",
+            (analysis_id, teacher_id)
+        ).fetchone()
+    if row is None:
+        return None
+    return json.loads(row["term_counts"]) if row["term_counts"] else {}
+
+
+def find_incremental_base(teacher_id: int, context: str, feedback_ids: list[int]) -> Optional[dict]:
+    """
+    Most recent analysis of the same teacher and context that covered a
+    subset of feedback_ids and has a watermark, to be updated incrementally.
+    """
+    if not feedback_ids:
+        return None
+    wanted = set(feedback_ids)
+    with get_db() as conn:
+        cursor = conn.execute(
+            """SELECT id, summary, feedback_count, feedback_ids, token_counts
+               FROM analysis_history
+               WHERE teacher_id = ? AND context = ? AND token_counts IS NOT NULL
+                 AND max_feedback_id <= ?
+               ORDER BY id DESC
+               LIMIT 5""",
+            (teacher_id, context, max(wanted))
+        )
+        for row in cursor.fetchall():
+            previous_ids = json.loads(row["feedback_ids"] or "[]")
+            if previous_ids and set(previous_ids) <= wanted:
+                data = dict(row)
+                data["feedback_ids"] = previous_ids
+                data["token_counts"] = json.loads(row["token_counts"])
+                return data
+    return None
+
+
+def insert_analysis_telemetry(analysis_id: int, teacher_id: int, job_id: Optional[str], data: dict) -> int:
+    """Store the timings (ms), token usage, prompt-size reduction and cost of one analysis."""
+    timings = data.get("timings", {})
+    usage = data.get("usage", {})
+    prompt = data.get("prompt", {})
+    with get_db() as conn:
+        cursor = conn.execute(
+            """INSERT INTO analysis_telemetry
+               (analysis_id, job_id, teacher_id, mode, feedback_count, processed_feedbacks,
+                db_fetch_ms, tokenize_ms, layout_ms, encode_ms, llm_ms, save_ms, total_ms,
+                llm_calls, prompt_tokens, completion_tokens, cached_tokens, model, cost_usd,
+                raw_lines, prompt_lines, raw_chars, prompt_chars)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (
+                analysis_id, job_id, teacher_id, data.get("mode"),
+                data.get("feedback_count", 0), data.get("processed_feedbacks", 0),
+                timings.get("db_fetch"), timings.get("tokenize"), timings.get("layout"),
+                timings.get("encode"), timings.get("llm"), timings.get("save"), timings.get("total"),
+                usage.get("calls", 0), usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0),
+                usage.get("cached_tokens", 0), usage.get("model"), data.get("cost_usd", 0.0),
+                prompt.get("raw_lines"), prompt.get("prompt_lines"), prompt.get("raw_chars"), prompt.get("prompt_chars")
+            )
+        )
+        conn.commit()
+        return cursor.lastrowid
+
+
+def get_analysis_telemetry(days: int = 7, limit: int = 5000) -> list[dict]:
+    """Telemetry rows of the last given days, most recent first."""
+    with get_db() as conn:
+        cursor = conn.execute(
+            """SELECT * FROM analysis_telemetry
+               WHERE created_at >= datetime('now', ?)
+               ORDER BY id DESC
+               LIMIT ?""",
+            (f"-{int(days)} days", limit)
+        )
+        return [dict(row) for row in cursor.fetchall()]
+
+
+def get_token_usage_by_day(days: int = 30) -> list[dict]:
+    """Analyses, LLM tokens and estimated cost per day."""
+    with get_db() as conn:
+        cursor = conn.execute(
+            """SELECT date(created_at) AS day,
+                      COUNT(*) AS analyses,
+                      SUM(llm_calls) AS llm_calls,
+                      SUM(prompt_tokens) AS prompt_tokens,
+                      SUM(completion_tokens) AS completion_tokens,
+                      SUM(cached_tokens) AS cached_tokens,
+                      ROUND(SUM(cost_usd), 6) AS cost_usd
+               FROM analysis_telemetry
+               WHERE created_at >= datetime('now', ?)
+               GROUP BY day
+               ORDER BY day""",
+            (f"-{int(days)} days",)
+        )
+        return [dict(row) for row in cursor.fetchall()]
+
+
+def delete_old_analysis_jobs(days: int = 7) -> int:
+    """Purge finished jobs older than the given number of days."""
+    with get_db() as conn:
+        cursor = conn.execute(
+            """DELETE FROM analysis_jobs
+               WHERE status IN ('completed', 'failed')
+                 AND created_at < datetime('now', ?)""",
+            (f"-{int(days)} days",)
+        )
+        conn.commit()
+        return cursor.rowcount
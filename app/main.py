@@ -1,14 +1,19 @@
 import html
 import os
 import sys
+import json
+import time
 import uuid
+import base64
+import hashlib
+import sqlite3
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Annotated, Literal, Optional
 
 from fastapi import FastAPI, Request, Response, HTTPException, Depends, Form, Body, File, UploadFile, Cookie, Query
 from fastapi.concurrency import run_in_threadpool
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, FileResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import ValidationError
 
@@ -43,12 +48,23 @@ from app.database import (
     get_teacher_by_email,
     get_teacher_by_code,
     get_teacher_by_id,
-    deduct_credit,
     add_credits,
     update_teacher_password,
     update_teacher_code,
-    save_analysis,
-    get_analysis_history
+    get_analysis_history,
+    get_analysis_by_id,
+    get_analysis_term_counts,
+    delete_analysis_by_id,
+    get_analysis_job,
+    get_feedback_contents,
+    get_analysis_telemetry,
+    get_token_usage_by_day,
+    create_payment_receipt,
+    get_all_receipts,
+    get_receipt_by_id,
+    update_receipt_status,
+    get_all_teachers,
+    ping_db
 )
 from app.models import (
     FeedbackRequest,
@@ -58,12 +74,23 @@ from app.models import (
     TeacherLoginResponse,
     AnalyzeRequest,
     AnalyzeResponse,
+    AnalyzeJobResponse,
     StatusResponse,
     ErrorResponse,
     ImportFeedbackItem,
     ReceiptApprovalRequest
 )
-from app.services.analysis import process_feedback_analysis
+from app.services.jobs import ANALYSIS_ADMIN_PRIORITY, analysis_job_queue, serialize_job
+from app.services.admission import analysis_admission, AdmissionRejected
+from app.services.render_pool import render_pool
+from app.services.warmup import warmup
+from app.services.live import live_wordclouds, LIVE_WORDCLOUD_KEEPALIVE
+from app.services.deepseek import close_client, get_client_health
+from app.services.tokenizer import get_tokenizer, top_words
+from app.services.feedback_terms import token_bag, count_feedback_terms
+from app.services.render_cache import render_key
+from app.services.telemetry import summarize_phases
+from app.services.wordcloud import render_layout_png, WORDCLOUD_QUALITY_TIERS, WORDCLOUD_PDF_IMAGE_FORMAT
 
 # Initialize FastAPI app
 APP_VERSION = "1.2.4"
@@ -117,6 +144,18 @@ async def get_template(filepath: str) -> str:
 async def startup_event():
     init_db()
     sync_admin_account()
+    render_pool.start()
+    await analysis_job_queue.start()
+    warmup.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await warmup.stop()
+    await live_wordclouds.stop()
+    await analysis_job_queue.stop()
+    await close_client()
+    render_pool.shutdown()
 
 def sync_admin_account():
     """Ensure the main admin account exists and matches environment variables."""
@@ -387,8 +426,11 @@ async def submit_feedback(
         raise HTTPException(status_code=403, detail="Vous avez déjà soumis un feedback")
 
     # Insert feedback with emotion and teacher_id
-    feedback_id = insert_feedback(request.content, device_id, request.emotion, teacher['id'])
+    feedback_id = insert_feedback(
+        request.content, device_id, request.emotion, teacher['id'], token_counts=token_bag(request.content)
+    )
     increment_device_feedback(device_id)
+    live_wordclouds.notify(teacher['id'])
 
     # Get the created feedback
     feedback = get_feedback_by_id(feedback_id)
@@ -449,6 +491,86 @@ async def get_stats(teacher: dict = Depends(get_current_teacher)):
     return {"total": total, "selected": selected}
 
 
+@app.get("/api/emotions")
+async def get_emotions(
+    window: int = Query(7, ge=1, le=60),
+    days: Optional[int] = Query(None, ge=1, le=3650),
+    teacher: dict = Depends(get_current_teacher)
+):
+    """
+    Emotion analytics: histogram, percentiles, per-day breakdown and moving average.
+
+    With days, every statistic covers only the last days collection days (the
+    moving average of the first of them still looks back window days).
+    """
+    # Deliberately lazy: emotions loads numpy, kept off the startup path (see app.services.lazy)
+    from app.services.emotions import emotion_stats_cache
+    return await run_in_threadpool(emotion_stats_cache.get, teacher['id'], window, days)
+
+
+@app.get("/api/words/top")
+async def get_top_words_endpoint(
+    n: int = Query(50, ge=1, le=500),
+    ngram: int = Query(1, ge=1, le=3),
+    ids: Optional[str] = Query(None, description="IDs de feedbacks séparés par des virgules"),
+    selected: bool = False,
+    teacher: dict = Depends(get_current_teacher)
+):
+    """
+    Most frequent wordcloud terms (or n-grams) of a selection of feedbacks, or
+    of the whole collection, without laying out or rendering an image.
+    """
+    feedback_ids = None
+    if ids:
+        try:
+            feedback_ids = [int(i) for i in ids.split(",") if i.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Identifiants de feedbacks invalides")
+
+    def count() -> dict:
+        if ngram == 1:
+            # Aggregated from the token bags stored with each feedback
+            return count_feedback_terms(feedback_ids, teacher['id'], selected_only=selected)
+        return get_tokenizer().ngram_counts(get_feedback_contents(teacher['id'], feedback_ids, selected), ngram)
+
+    counts = await run_in_threadpool(count)
+    return {
+        "ngram": ngram,
+        "distinct_terms": len(counts),
+        "words": [{"term": term, "count": c} for term, c in top_words(counts, n)]
+    }
+
+
+@app.get("/api/wordcloud/live")
+async def live_wordcloud_stream(
+    request: Request,
+    teacher: dict = Depends(get_current_teacher)
+):
+    """
+    Server-Sent Events stream of the collection's wordcloud, re-rendered as a
+    preview while students submit (no credit used, see LiveWordclouds).
+    """
+    queue = live_wordclouds.subscribe(teacher['id'])
+
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=LIVE_WORDCLOUD_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: wordcloud\ndata: {json.dumps(event)}\n\n"
+        finally:
+            live_wordclouds.unsubscribe(teacher['id'], queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.get("/api/status", response_model=StatusResponse)
 async def get_status(request: Request):
     """Check if feedback collection is open."""
@@ -500,64 +622,69 @@ async def toggle_feedback(
     return {"success": True, "message": "Statut mis à jour"}
 
 
-@app.post("/api/analyze")
+@app.post("/api/analyze", response_model=AnalyzeJobResponse, status_code=202)
 async def analyze_feedbacks_endpoint(
     request_data: AnalyzeRequest, 
     request: Request,
     teacher: dict = Depends(get_current_teacher)
 ):
-    """Analyze selected feedbacks and generate wordcloud (teacher only)."""
-    try:
-        # Admin has unlimited credits
-        if not teacher.get('is_admin') and teacher['credits'] <= 0:
-            raise HTTPException(status_code=403, detail="Crédits insuffisants. Veuillez recharger votre compte.")
+    """Queue an analysis of the selected feedbacks (teacher only).
 
-        if not request_data.feedback_ids:
-            raise HTTPException(status_code=400, detail="Veuillez sélectionner au moins un feedback")
+    The wordcloud and AI summary are produced by a background worker; poll
+    GET /api/analyze/jobs/{job_id} for the result. Credits are only deducted
+    once the analysis completes.
+    """
+    # Admin has unlimited credits
+    if not teacher.get('is_admin') and teacher['credits'] <= 0:
+        raise HTTPException(status_code=403, detail="Crédits insuffisants. Veuillez recharger votre compte.")
 
-        # Get selected feedbacks
-        feedbacks = get_feedbacks_by_ids(request_data.feedback_ids)
+    if not request_data.feedback_ids:
+        raise HTTPException(status_code=400, detail="Veuillez sélectionner au moins un feedback")
 
-        if not feedbacks:
-            raise HTTPException(status_code=404, detail="Aucun feedback trouvé")
+    # Get selected feedbacks
+    feedbacks = get_feedbacks_by_ids(request_data.feedback_ids)
 
-        # Verify ownership - use .get() to avoid KeyError
-        for fb in feedbacks:
-            if fb.get('teacher_id') and fb['teacher_id'] != teacher['id']:
-                raise HTTPException(status_code=403, detail="Accès non autorisé à certains feedbacks")
+    if not feedbacks:
+        raise HTTPException(status_code=404, detail="Aucun feedback trouvé")
 
-        # Process feedback analysis (wordcloud and DeepSeek AI analysis)
-        summary, wordcloud_base64 = await process_feedback_analysis(feedbacks, request_data.context)
-        
-        # Deduct credit if not admin
-        if not teacher.get('is_admin'):
-            deduct_credit(teacher['id'])
-        
-        # Save to analysis history
-        try:
-            save_analysis(
-                teacher_id=teacher['id'],
-                summary=summary,
-                wordcloud_image=wordcloud_base64,
-                feedback_count=len(feedbacks),
-                context=request_data.context or ""
-            )
-        except Exception as e:
-            print(f"Save analysis history error (non-fatal): {e}")
-        
-        return {
-            "summary": summary,
-            "wordcloud_data": {"image": wordcloud_base64}
-        }
-    except HTTPException:
-        raise
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return {
-            "summary": f"Erreur lors de l'analyse: {str(e)}",
-            "wordcloud_data": {"image": ""}
-        }
+    # Verify ownership - use .get() to avoid KeyError
+    for fb in feedbacks:
+        if fb.get('teacher_id') and fb['teacher_id'] != teacher['id']:
+            raise HTTPException(status_code=403, detail="Accès non autorisé à certains feedbacks")
+
+    try:
+        job = await analysis_job_queue.submit(
+            teacher_id=teacher['id'],
+            feedback_ids=[fb['id'] for fb in feedbacks],
+            context=request_data.context or "",
+            # Set by the server: a request cannot jump the shared queue
+            priority=ANALYSIS_ADMIN_PRIORITY if teacher.get('is_admin') else 0,
+            wordcloud_format=request_data.wordcloud_format
+        )
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=429,
+            detail=e.detail,
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+    return AnalyzeJobResponse(
+        job_id=job['id'],
+        status=job['status'],
+        status_url=f"/api/analyze/jobs/{job['id']}"
+    )
+
+
+@app.get("/api/analyze/jobs/{job_id}")
+async def get_analyze_job(
+    job_id: str,
+    teacher: dict = Depends(get_current_teacher)
+):
+    """Get the status of an analysis job, and its result once completed."""
+    job = get_analysis_job(job_id, teacher['id'])
+    if not job:
+        raise HTTPException(status_code=404, detail="Analyse non trouvée")
+    return serialize_job(job)
 
 
 @app.get("/api/analyses")
@@ -569,13 +696,80 @@ async def get_analyses(
     return {"analyses": history}
 
 
+@app.get("/api/analyses/{analysis_id}/wordcloud")
+async def get_analysis_wordcloud(
+    analysis_id: int,
+    request: Request,
+    size: Literal["full", "thumbnail"] = "full",
+    width: Annotated[Optional[int], Query(ge=100, le=4000)] = None,
+    height: Annotated[Optional[int], Query(ge=100, le=4000)] = None,
+    image_format: Annotated[Optional[Literal["png", "png8", "webp", "svg"]], Query(alias="format")] = None,
+    teacher: dict = Depends(get_current_teacher)
+):
+    """
+    Wordcloud image of an analysis, full size or thumbnail, with an ETag so
+    browsers revalidate it instead of downloading it again.
+
+    With width, height or format, the wordcloud is rendered again from the
+    term counts stored with the analysis (e.g. slide sizes or WebP exports):
+    only a layout is computed, and renders are cached by the render pool.
+    """
+    rerender = bool(width or height or image_format)
+    if rerender:
+        term_counts = get_analysis_term_counts(analysis_id, teacher['id'])
+        if term_counts is None:
+            raise HTTPException(status_code=404, detail="Analyse non trouvée")
+        if not term_counts:
+            raise HTTPException(status_code=404, detail="Fréquences non disponibles pour cette analyse")
+        options = {"width": width or 800, "height": height or 400}
+        if image_format == "svg":
+            options["output"] = "svg"
+        elif image_format:
+            options["image_format"] = image_format
+        image = None
+        # Tagged from the stored counts and the render settings
+        etag = f'"{render_key(term_counts, options)[:32]}"'
+    else:
+        analysis = get_analysis_by_id(analysis_id, teacher['id'])
+        if not analysis:
+            raise HTTPException(status_code=404, detail="Analyse non trouvée")
+
+        image = (analysis["wordcloud_thumbnail"] if size == "thumbnail" else None) or analysis["wordcloud_image"]
+        layout = analysis["wordcloud_layout"]
+        if not (image or layout):
+            raise HTTPException(status_code=404, detail="Nuage de mots non disponible")
+
+        # Tagged from the stored data, so a match is answered without rendering
+        source = image or json.dumps(layout, sort_keys=True)
+        etag = f'"{hashlib.sha256(source.encode("utf-8")).hexdigest()[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    if rerender:
+        image = await render_pool.render(term_counts, **options)
+        if not image:
+            raise HTTPException(status_code=500, detail="Erreur lors de la génération du nuage de mots")
+    elif not image:
+        # Wordcloud drawn by the browser: render the PNG from its layout
+        image = await run_in_threadpool(render_layout_png, layout)
+    # Base64 of "<svg" and of the "RIFF" header of WebP files
+    if image.startswith("PHN2Zy"):
+        media_type = "image/svg+xml"
+    elif image.startswith("UklGR"):
+        media_type = "image/webp"
+    else:
+        media_type = "image/png"
+    return Response(content=base64.b64decode(image), media_type=media_type, headers=headers)
+
+
 @app.delete("/api/analyses/{analysis_id}")
 async def delete_analysis(
     analysis_id: int,
     teacher: dict = Depends(get_current_teacher)
 ):
     """Delete an analysis from history."""
-    from app.database import delete_analysis_by_id
     success = delete_analysis_by_id(analysis_id, teacher['id'])
     if not success:
         raise HTTPException(status_code=404, detail="Analyse non trouvée")
@@ -608,15 +802,17 @@ async def reset_database_endpoint(
     """Reset the database (teacher only)."""
     if teacher.get('is_admin'):
         reset_database()
+        live_wordclouds.notify()
         return {"success": True, "message": "Base de données réinitialisée (Admin)"}
     else:
         reset_database(teacher['id'])
+        live_wordclouds.notify(teacher['id'])
         return {"success": True, "message": "Vos données ont été réinitialisées"}
 
 
 def _generate_csv(feedbacks_list: list) -> str:
     """Helper to generate CSV from a list of feedback objects."""
-    import pandas as pd
+    import pandas as pd  # Deliberately lazy: only needed for CSV exports
     if not feedbacks_list:
         return ""
     
@@ -670,8 +866,6 @@ async def export_csv(
 
 # Health check endpoints for Railway serverless
 # Password Reset & Email
-import resend
-
 @app.post("/api/auth/forgot-password")
 async def forgot_password(data: dict = Body(...)):
     """Send password reset email."""
@@ -691,6 +885,8 @@ async def forgot_password(data: dict = Body(...)):
         return {"message": "Email envoyé (Mode Dev: vérifier logs serveur pour le token)"}
     
     try:
+        import resend  # Only needed to send emails, kept off the startup path
+
         resend.api_key = RESEND_API_KEY
         # In a real app, strict reset URL. Here assuming localhost or deployed URL
         # We need a frontend page to handle the token, let's call it /reset-password?token=...
@@ -777,7 +973,6 @@ async def upload_receipt(
     # Create receipt record
     # Store relative path for serving
     relative_path = f"/static/uploads/receipts/{filename}"
-    from app.database import create_payment_receipt
     create_payment_receipt(teacher['id'], relative_path)
     
     return {"status": "success", "message": "Reçu envoyé avec succès"}
@@ -817,7 +1012,6 @@ async def list_receipts(
     if not teacher['is_admin']:
         raise HTTPException(status_code=403, detail="Admin only")
         
-    from app.database import get_all_receipts
     return {"receipts": get_all_receipts()}
 
 
@@ -831,8 +1025,6 @@ async def approve_receipt(
     if not teacher['is_admin']:
         raise HTTPException(status_code=403, detail="Admin only")
         
-    from app.database import get_receipt_by_id, update_receipt_status, add_credits
-    
     receipt = get_receipt_by_id(receipt_id)
     if not receipt:
         raise HTTPException(status_code=404, detail="Reçu non trouvé")
@@ -858,7 +1050,6 @@ async def reject_receipt(
     if not teacher['is_admin']:
         raise HTTPException(status_code=403, detail="Admin only")
         
-    from app.database import update_receipt_status
     update_receipt_status(receipt_id, 'rejected')
     return {"status": "success", "message": "Reçu rejeté"}
 
@@ -871,7 +1062,6 @@ async def list_teachers(
     if not teacher['is_admin']:
         raise HTTPException(status_code=403, detail="Admin only")
         
-    from app.database import get_all_teachers
     teachers = get_all_teachers()
     # Mask passwords
     for t in teachers:
@@ -881,6 +1071,53 @@ async def list_teachers(
 
 
 
+@app.get("/api/admin/metrics")
+async def get_metrics(
+    teacher: dict = Depends(get_current_teacher)
+):
+    """Analysis pipeline metrics: queue depth, concurrency and rejections (Admin only)."""
+    if not teacher['is_admin']:
+        raise HTTPException(status_code=403, detail="Admin only")
+    return {
+        "analysis_queue": analysis_job_queue.snapshot(),
+        "admission": analysis_admission.snapshot(),
+        "render_pool": render_pool.snapshot(),
+        "render_cache": render_pool.cache.snapshot(),
+        "live_wordclouds": live_wordclouds.snapshot(),
+        "deepseek": get_client_health()
+    }
+
+
+@app.get("/api/admin/telemetry")
+async def get_telemetry(
+    days: int = 7,
+    teacher: dict = Depends(get_current_teacher)
+):
+    """Per-phase latency percentiles, token usage and cost of recent analyses (Admin only)."""
+    if not teacher['is_admin']:
+        raise HTTPException(status_code=403, detail="Admin only")
+
+    days = max(1, min(days, 365))
+    rows = get_analysis_telemetry(days)
+    by_day = get_token_usage_by_day(days)
+    return {
+        "days": days,
+        "analyses": len(rows),
+        "phases": summarize_phases(rows),
+        "tokens_by_day": by_day,
+        "totals": {
+            "prompt_tokens": sum(d["prompt_tokens"] or 0 for d in by_day),
+            "completion_tokens": sum(d["completion_tokens"] or 0 for d in by_day),
+            "cached_tokens": sum(d["cached_tokens"] or 0 for d in by_day),
+            "cost_usd": round(sum(d["cost_usd"] or 0 for d in by_day), 6),
+            # Prompt-size reduction from duplicate collapsing
+            "raw_chars": sum(r["raw_chars"] or 0 for r in rows),
+            "prompt_chars": sum(r["prompt_chars"] or 0 for r in rows)
+        },
+        "slowest": sorted(rows, key=lambda r: r["total_ms"] or 0, reverse=True)[:10]
+    }
+
+
 @app.get("/health")
 @app.get("/healthz")
 async def health_check():
@@ -888,6 +1125,29 @@ async def health_check():
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
 
+@app.get("/ready")
+async def readiness_check(response: Response):
+    """Readiness probe for Railway: 503 until the database answers and the warm-up is done."""
+    database = {"ok": True, "latency_ms": None}
+    started = time.perf_counter()
+    try:
+        await run_in_threadpool(ping_db)
+    except sqlite3.Error as e:
+        database = {"ok": False, "error": str(e)}
+    else:
+        database["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+    ready = database["ok"] and warmup.ready
+    if not ready:
+        response.status_code = 503
+    return {
+        "status": "ready" if ready else ("warming_up" if database["ok"] else "unavailable"),
+        "database": database,
+        "warmup": warmup.snapshot(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
 # JSON Export/Import for data persistence
 @app.get("/api/export/json")
 async def export_json(
@@ -899,9 +1159,6 @@ async def export_json(
 
     if not feedbacks:
         raise HTTPException(status_code=404, detail="Aucun feedback à exporter")
-
-    import json
-
     json_content = json.dumps({
         "exported_at": datetime.now().isoformat(),
         "teacher_email": teacher['email'],
@@ -970,11 +1227,13 @@ async def import_json(
             else:
                 return {"success": False, "message": "Aucun feedback trouvé dans le fichier"}
 
-        # Add teacher_id to each feedback before importing
+        # Add teacher_id and the token bag to each feedback before importing
         for fb in feedbacks_data:
             fb['teacher_id'] = teacher['id']
+            fb['token_counts'] = token_bag(fb['content'])
 
         count = import_feedbacks(feedbacks_data)
+        live_wordclouds.notify(teacher['id'])
         return {"success": True, "message": f"{count} feedbacks importés avec succès"}
             
     except Exception as e:
@@ -990,19 +1249,39 @@ async def export_pdf(
 ):
     """Generate PDF with wordcloud and analysis (teacher only)."""
     try:
-        import json
+        # Deliberately lazy: reportlab is only needed for PDF exports (see app.services.lazy)
         from app.services.pdf import create_analysis_pdf
 
         body = await request.body()
         data = json.loads(body.decode('utf-8'))
 
         wordcloud_image = data.get('wordcloud_image', '')
+        wordcloud_layout = data.get('wordcloud_layout')
         analysis_text = data.get('analysis_text', '')
         context = data.get('context', '')
 
-        if not wordcloud_image or not analysis_text:
+        if data.get('analysis_id') and not (wordcloud_image or wordcloud_layout):
+            # History entries only carry thumbnails: use the stored wordcloud
+            analysis = get_analysis_by_id(int(data['analysis_id']), teacher['id'])
+            if not analysis:
+                raise HTTPException(status_code=404, detail="Analyse non trouvée")
+            wordcloud_image = analysis['wordcloud_image'] or ''
+            wordcloud_layout = analysis['wordcloud_layout']
+
+        if not (wordcloud_image or wordcloud_layout) or not analysis_text:
             raise HTTPException(status_code=400, detail="Données manquantes pour générer le PDF")
 
+        if not wordcloud_image:
+            # Wordcloud drawn by the browser: render the PNG from its layout, on demand
+            if isinstance(wordcloud_layout, str):
+                wordcloud_layout = json.loads(wordcloud_layout)
+            wordcloud_image = await run_in_threadpool(
+                render_layout_png,
+                wordcloud_layout,
+                scale=WORDCLOUD_QUALITY_TIERS["print"]["scale"],
+                image_format=WORDCLOUD_PDF_IMAGE_FORMAT
+            )
+
         # Generate PDF (offloaded to threadpool)
         pdf_bytes = await run_in_threadpool(
             create_analysis_pdf,
@@ -35,6 +35,9 @@ class TeacherLoginResponse(BaseModel):
 class AnalyzeRequest(BaseModel):
     feedback_ids: list[int]
     context: str = Field(..., min_length=1, max_length=1000)
+    wordcloud_format: Optional[Literal["png", "svg", "layout"]] = Field(
+        None, description="Wordcloud output format; defaults to the server setting"
+    )
 
 
 class AnalyzeResponse(BaseModel):
@@ -42,6 +45,12 @@ class AnalyzeResponse(BaseModel):
     wordcloud_data: dict
 
 
+class AnalyzeJobResponse(BaseModel):
+    job_id: str
+    status: str
+    status_url: str
+
+
 class StatusResponse(BaseModel):
     collection_open: bool
     message: str
@@ -5,9 +5,35 @@ CREATE TABLE IF NOT EXISTS feedbacks (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     included_in_analysis BOOLEAN DEFAULT 0,
     emotion INTEGER DEFAULT NULL,
-    teacher_id INTEGER DEFAULT 1
+    teacher_id INTEGER DEFAULT 1,
+    -- Whether the feedback's token bag is in feedback_terms
+    terms_indexed BOOLEAN DEFAULT 0
 );
 
+-- Term dictionary: each distinct spelling of a wordcloud term
+CREATE TABLE IF NOT EXISTS terms (
+    id INTEGER PRIMARY KEY,
+    term TEXT UNIQUE NOT NULL
+);
+
+-- Token bag of each feedback, computed when it is written
+CREATE TABLE IF NOT EXISTS feedback_terms (
+    feedback_id INTEGER NOT NULL,
+    term_id INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (feedback_id, term_id)
+) WITHOUT ROWID;
+
+-- Number of answers per teacher, collection day (since the Unix epoch) and
+-- emotion, kept up to date by the triggers created in init_db
+CREATE TABLE IF NOT EXISTS emotion_daily (
+    teacher_id INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    emotion INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (teacher_id, day, emotion)
+) WITHOUT ROWID;
+
 CREATE TABLE IF NOT EXISTS device_limits (
     device_id TEXT PRIMARY KEY,
     feedback_count INTEGER DEFAULT 0,
@@ -47,5 +73,71 @@ CREATE TABLE IF NOT EXISTS analysis_history (
     feedback_count INTEGER DEFAULT 0,
     context TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- Watermark for incremental re-analysis: analysed feedback IDs (JSON),
+    -- the highest of them, and their token counts per spelling (JSON, not
+    -- merged across case and plurals so that new counts can be added)
+    feedback_ids TEXT,
+    max_feedback_id INTEGER,
+    token_counts TEXT,
+    -- Top wordcloud term counts (JSON), to render the wordcloud again
+    term_counts TEXT,
+    -- Wordcloud layout (JSON) when rendered by the browser instead of a PNG
+    wordcloud_layout TEXT,
+    -- Small preview PNG (base64), shown first and in the history list
+    wordcloud_thumbnail TEXT,
+    FOREIGN KEY (teacher_id) REFERENCES teachers (id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_analysis_history_teacher_context ON analysis_history(teacher_id, context);
+
+CREATE TABLE IF NOT EXISTS analysis_jobs (
+    id TEXT PRIMARY KEY,
+    teacher_id INTEGER NOT NULL,
+    status TEXT DEFAULT 'queued',
+    priority INTEGER DEFAULT 0,
+    feedback_ids TEXT NOT NULL,
+    context TEXT,
+    -- Wordcloud format requested (png, svg, layout); NULL uses the server default
+    wordcloud_format TEXT,
+    -- Thumbnail of the wordcloud, available while the analysis is still running
+    wordcloud_thumbnail TEXT,
+    analysis_id INTEGER,
+    error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP,
     FOREIGN KEY (teacher_id) REFERENCES teachers (id)
 );
+
+CREATE INDEX IF NOT EXISTS idx_analysis_jobs_status ON analysis_jobs (status, priority, created_at);
+
+CREATE TABLE IF NOT EXISTS analysis_telemetry (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    analysis_id INTEGER NOT NULL,
+    job_id TEXT,
+    teacher_id INTEGER NOT NULL,
+    mode TEXT,
+    feedback_count INTEGER DEFAULT 0,
+    processed_feedbacks INTEGER DEFAULT 0,
+    db_fetch_ms REAL,
+    tokenize_ms REAL,
+    layout_ms REAL,
+    encode_ms REAL,
+    llm_ms REAL,
+    save_ms REAL,
+    total_ms REAL,
+    llm_calls INTEGER DEFAULT 0,
+    prompt_tokens INTEGER DEFAULT 0,
+    completion_tokens INTEGER DEFAULT 0,
+    cached_tokens INTEGER DEFAULT 0,
+    model TEXT,
+    cost_usd REAL DEFAULT 0,
+    raw_lines INTEGER,
+    prompt_lines INTEGER,
+    raw_chars INTEGER,
+    prompt_chars INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (analysis_id) REFERENCES analysis_history (id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_analysis_telemetry_created ON analysis_telemetry (created_at);
@@ -0,0 +1,142 @@
+import os
+import math
+import asyncio
+from collections import Counter
+from typing import Any, Awaitable, Callable
+
+
+ANALYSIS_MAX_CONCURRENT = int(os.getenv("ANALYSIS_MAX_CONCURRENT", "2"))
+ANALYSIS_TEACHER_CONCURRENCY = int(os.getenv("ANALYSIS_TEACHER_CONCURRENCY", "1"))
+ANALYSIS_MAX_PER_TEACHER = int(os.getenv("ANALYSIS_MAX_PER_TEACHER", "3"))
+ANALYSIS_QUEUE_SIZE = int(os.getenv("ANALYSIS_QUEUE_SIZE", "100"))
+
+
+class AdmissionRejected(Exception):
+    """Raised when an analysis cannot be accepted right now."""
+
+    def __init__(self, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AnalysisAdmission:
+    """
+    Admission control for feedback analyses.
+
+    - admit() is the door check: it rejects new work when the queue or the
+      teacher's backlog is full, with a Retry-After estimate.
+    - run() executes an analysis under a process-wide and a per-teacher
+      concurrency limit.
+
+    Identical requests are coalesced before this point: the job queue returns
+    the queued or running job instead of creating a duplicate.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = ANALYSIS_MAX_CONCURRENT,
+        teacher_concurrency: int = ANALYSIS_TEACHER_CONCURRENCY,
+        max_per_teacher: int = ANALYSIS_MAX_PER_TEACHER,
+        max_queued: int = ANALYSIS_QUEUE_SIZE
+    ):
+        self.max_concurrent = max(1, max_concurrent)
+        self.teacher_concurrency = max(1, teacher_concurrency)
+        self.max_per_teacher = max(1, max_per_teacher)
+        self.max_queued = max_queued
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        self._teacher_slots: dict[int, asyncio.Semaphore] = {}
+        self._teacher_inflight: Counter = Counter()
+        self._avg_duration = 10.0  # Seconds, refined as analyses complete
+        self.running = 0
+        self.waiting = 0
+        self.counters = Counter({
+            "admitted": 0,
+            "rejected_queue_full": 0,
+            "rejected_teacher_limit": 0,
+            "completed": 0,
+            "failed": 0
+        })
+
+    def retry_after(self, queue_depth: int = 0) -> int:
+        """Seconds until a slot is likely to free up, for the Retry-After header."""
+        backlog = queue_depth + self.waiting + self.running
+        return max(1, math.ceil(self._avg_duration * backlog / self.max_concurrent))
+
+    def admit(self, teacher_id: int, teacher_pending: int = 0, queue_depth: int = 0):
+        """
+        Door check before accepting new work.
+
+        Args:
+            teacher_id: Teacher requesting the analysis
+            teacher_pending: Analyses already queued or running for this teacher
+            queue_depth: Analyses queued ahead (not yet running)
+        """
+        if queue_depth + self.waiting >= self.max_queued:
+            self.counters["rejected_queue_full"] += 1
+            raise AdmissionRejected(
+                "Trop d'analyses en cours. Veuillez réessayer dans quelques instants.",
+                self.retry_after(queue_depth)
+            )
+        if max(teacher_pending, self._teacher_inflight[teacher_id]) >= self.max_per_teacher:
+            self.counters["rejected_teacher_limit"] += 1
+            raise AdmissionRejected(
+                "Vous avez déjà plusieurs analyses en cours. Veuillez patienter.",
+                self.retry_after(queue_depth)
+            )
+
+    async def run(self, teacher_id: int, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Run func() under the process-wide and per-teacher concurrency limits."""
+        self._teacher_inflight[teacher_id] += 1
+        self.counters["admitted"] += 1
+        teacher_slot = self._teacher_slots.setdefault(teacher_id, asyncio.Semaphore(self.teacher_concurrency))
+        loop = asyncio.get_running_loop()
+
+        try:
+            self.waiting += 1
+            acquired = False
+            try:
+                # Per-teacher slot first, so a teacher over its limit never holds a global slot
+                async with teacher_slot:
+                    async with self._slots:
+                        self.waiting -= 1
+                        acquired = True
+                        self.running += 1
+                        started = loop.time()
+                        try:
+                            result = await func()
+                        finally:
+                            self.running -= 1
+                            self._avg_duration = 0.8 * self._avg_duration + 0.2 * (loop.time() - started)
+            finally:
+                if not acquired:
+                    self.waiting -= 1
+        except BaseException:
+            self.counters["failed"] += 1
+            raise
+        else:
+            self.counters["completed"] += 1
+            return result
+        finally:
+            self._teacher_inflight[teacher_id] -= 1
+            if self._teacher_inflight[teacher_id] <= 0:
+                del self._teacher_inflight[teacher_id]
+                if not teacher_slot.locked():
+                    self._teacher_slots.pop(teacher_id, None)
+
+    def snapshot(self) -> dict:
+        """Current queue depth, concurrency and counters."""
+        return {
+            "running": self.running,
+            "waiting": self.waiting,
+            "inflight_teachers": len(self._teacher_inflight),
+            "max_concurrent": self.max_concurrent,
+            "teacher_concurrency": self.teacher_concurrency,
+            "max_per_teacher": self.max_per_teacher,
+            "max_queued": self.max_queued,
+            "avg_duration_seconds": round(self._avg_duration, 3),
+            **self.counters
+        }
+
+
+analysis_admission = AnalysisAdmission()
@@ -1,51 +1,170 @@
+import os
 import asyncio
-from typing import List, Dict, Any, Tuple, Optional
+from collections import Counter
+from typing import Awaitable, Callable, List, Dict, Any, Tuple, Optional
 
-from app.services.wordcloud import create_wordcloud
+from app.services.wordcloud import WORDCLOUD_OUTPUT, WORDCLOUD_QUALITY, extract_token_counts
+from app.services.tokenizer import TokenizerEngine
+from app.services.render_pool import render_pool
 from app.services.deepseek import analyze_feedbacks
+from app.services.feedback_terms import count_feedback_tokens
+from app.services.telemetry import timed_phase
+
+AI_UNAVAILABLE_MESSAGE = "L'analyse IA n'est pas disponible actuellement. Le nuage de mots a été généré."
+
+# Incremental re-analysis: only summarise feedbacks added since a previous
+# analysis of the same collection, as long as they are a minority of it
+# (beyond that a full analysis costs about the same and drifts less).
+ANALYSIS_INCREMENTAL = os.getenv("ANALYSIS_INCREMENTAL", "true").lower() in ("1", "true", "yes")
+ANALYSIS_INCREMENTAL_MAX_RATIO = float(os.getenv("ANALYSIS_INCREMENTAL_MAX_RATIO", "0.5"))
+# Terms stored to render the wordcloud again, which only shows the top 100
+# (the watermark keeps every token count)
+STORED_TERMS = 1000
+# Preview wordcloud rendered before the full-size one: shown while the
+# analysis runs, and in the history list
+WORDCLOUD_THUMBNAIL_OPTIONS = {"width": 400, "height": 200, "max_words": 40, "quality": "preview", "output": "png"}
+# Prompt-size statistics of analyze_feedbacks kept with the analysis telemetry
+PROMPT_STATS = ("raw_lines", "prompt_lines", "raw_chars", "prompt_chars")
+
+
+def top_terms(counts: Dict[str, int], limit: int = STORED_TERMS) -> Dict[str, int]:
+    """Most frequent terms, as a plain dict suitable for storage."""
+    return dict(Counter(counts).most_common(limit))
+
+
+def can_update_incrementally(previous: Optional[Dict[str, Any]], feedbacks: List[Dict[str, Any]]) -> bool:
+    """Whether an incremental update of previous covers exactly these feedbacks."""
+    if not ANALYSIS_INCREMENTAL or not previous or not previous.get("token_counts"):
+        return False
+    if previous.get("summary") in (None, "", AI_UNAVAILABLE_MESSAGE):
+        return False
+    ids = {fb["id"] for fb in feedbacks}
+    previous_ids = set(previous["feedback_ids"])
+    if not previous_ids or not previous_ids <= ids:
+        return False
+    return len(ids - previous_ids) <= len(ids) * ANALYSIS_INCREMENTAL_MAX_RATIO
+
 
 async def process_feedback_analysis(
     feedbacks: List[Dict[str, Any]],
-    context: Optional[str] = None
+    context: Optional[str] = None,
+    previous: Optional[Dict[str, Any]] = None,
+    stats: Optional[dict] = None,
+    teacher_id: Optional[int] = None,
+    output: Optional[str] = None,
+    quality: Optional[str] = None,
+    on_thumbnail: Optional[Callable[[str], Awaitable[None]]] = None
 ) -> Tuple[str, str]:
     """
     Core feedback analysis and processing logic.
     Extracts text, generates wordcloud and AI analysis concurrently.
 
+    When previous (an earlier analysis of a subset of these feedbacks, with its
+    watermark: feedback_ids, token_counts, summary) allows it, only the new
+    feedbacks are tokenised and sent to the LLM, which updates the previous
+    summary; their per-spelling token counts are added to the stored ones
+    before merging case and plural forms, as for a full analysis.
+
     Args:
         feedbacks: List of feedback dictionaries containing 'content' and 'emotion'
         context: Context provided by the teacher
+        previous: Optional earlier analysis to update incrementally
+        stats: Optional dict filled with the mode used, the new watermark
+            (feedback_ids, token_counts) and the top term_counts to store
+            with the analysis, phase
+            timings in ms ("timings"), LLM token usage ("usage"), the
+            prompt-size reduction of duplicate collapsing ("prompt", see
+            PROMPT_STATS), the
+            wordcloud thumbnail ("wordcloud_thumbnail") and, in layout output
+            mode, the wordcloud layout JSON ("wordcloud_layout")
+        teacher_id: Owner of the feedbacks; when given, term counts are
+            aggregated from the token bags stored at insert time instead of
+            tokenising the texts
+        output: Wordcloud format, "png", "svg" or "layout" (defaults to
+            WORDCLOUD_OUTPUT)
+        quality: Wordcloud quality tier, "preview", "standard" or "print"
+            (defaults to WORDCLOUD_QUALITY)
+        on_thumbnail: Coroutine function awaited with the wordcloud thumbnail
+            (base64 PNG) as soon as it is rendered, before the full-size
+            wordcloud
 
     Returns:
-        Tuple of (summary, wordcloud_base64)
+        Tuple of (summary, wordcloud_base64), the image being empty when the
+        wordcloud is shipped as a layout
     """
-    feedback_contents = [fb["content"] for fb in feedbacks]
-    feedback_emotions = [fb.get("emotion") for fb in feedbacks]
-    feedbacks_text = " ".join(feedback_contents)
+    output = output or WORDCLOUD_OUTPUT
+    quality = quality or WORDCLOUD_QUALITY
+    incremental = can_update_incrementally(previous, feedbacks)
+    if incremental:
+        previous_ids = set(previous["feedback_ids"])
+        to_process = [fb for fb in feedbacks if fb["id"] not in previous_ids]
+        base_counts = Counter(previous["token_counts"])
+    else:
+        to_process = feedbacks
+        base_counts = Counter()
+
+    feedback_contents = [fb["content"] for fb in to_process]
+    feedback_emotions = [fb.get("emotion") for fb in to_process]
+    term_counts: Dict[str, int] = {}
+    token_counts: Dict[str, int] = {}
+    timings: Dict[str, float] = {}
+    llm_stats: Dict[str, Any] = {}
+    layouts: List[str] = []
+    thumbnails: List[str] = []
+
+    def count_terms() -> Dict[str, int]:
+        with timed_phase(timings, "tokenize"):
+            if teacher_id is not None:
+                new_counts = count_feedback_tokens(teacher_id, feedback_ids=[fb["id"] for fb in to_process])
+            else:
+                new_counts = extract_token_counts(" ".join(feedback_contents))
+            # Per-spelling counts add up; forms are merged once, on the total
+            token_counts.update(base_counts + Counter(new_counts))
+            counts = TokenizerEngine.merge_forms(token_counts)
+            term_counts.update(top_terms(counts))
+        return counts
 
     async def get_wordcloud() -> str:
         try:
-            # Wordcloud is synchronous and CPU-intensive, offload to threadpool
-            # create_wordcloud is imported from app.services.wordcloud
-            result = await asyncio.to_thread(create_wordcloud, feedbacks_text)
-            if result and result[0]:
-                return result[0]
+            # Counting and rendering are CPU-intensive: count in a thread, render
+            # in the render pool (worker processes, or a thread on single-core hosts)
+            counts = await asyncio.to_thread(count_terms)
+            try:
+                thumbnail = await render_pool.render(counts, **WORDCLOUD_THUMBNAIL_OPTIONS)
+            except Exception as e:
+                print(f"Wordcloud thumbnail error (non-fatal): {e}")
+            else:
+                if thumbnail:
+                    thumbnails.append(thumbnail)
+                    if on_thumbnail is not None:
+                        await on_thumbnail(thumbnail)
+            result = await render_pool.render(counts, timings=timings, output=output, quality=quality)
+            if result and output == "layout":
+                layouts.append(result)
+            elif result:
+                return result
         except Exception as e:
             print(f"Wordcloud error (non-fatal): {e}")
         return ""
 
     async def get_ai_summary() -> str:
+        if incremental and not to_process:
+            return previous["summary"]
         try:
-            summary = await analyze_feedbacks(
-                feedbacks=feedback_contents,
-                context=context or "",
-                emotions=feedback_emotions
-            )
+            with timed_phase(timings, "llm"):
+                summary = await analyze_feedbacks(
+                    feedbacks=feedback_contents,
+                    context=context or "",
+                    emotions=feedback_emotions,
+                    previous_summary=previous["summary"] if incremental else None,
+                    previous_count=len(previous["feedback_ids"]) if incremental else 0,
+                    stats=llm_stats
+                )
             if summary:
                 return summary
         except Exception as e:
             print(f"DeepSeek error (non-fatal): {e}")
-        return "L'analyse IA n'est pas disponible actuellement. Le nuage de mots a été généré."
+        return AI_UNAVAILABLE_MESSAGE
 
     # Run both tasks concurrently
     wordcloud_base64, summary = await asyncio.gather(
@@ -53,4 +172,21 @@ async def process_feedback_analysis(
         get_ai_summary()
     )
 
+    if incremental:
+        print(f"Incremental analysis: {len(to_process)} new of {len(feedbacks)} feedbacks")
+    if stats is not None:
+        stats.update({
+            "mode": "incremental" if incremental else "full",
+            "processed_feedbacks": len(to_process),
+            "base_analysis_id": previous.get("id") if incremental else None,
+            "feedback_ids": sorted(fb["id"] for fb in feedbacks),
+            "token_counts": token_counts,
+            "term_counts": term_counts,
+            "timings": timings,
+            "usage": llm_stats.get("usage", {}),
+            "prompt": {key: llm_stats[key] for key in PROMPT_STATS if key in llm_stats},
+            "wordcloud_layout": layouts[0] if layouts else None,
+            "wordcloud_thumbnail": thumbnails[0] if thumbnails else None
+        })
+
     return summary, wordcloud_base64
@@ -0,0 +1,185 @@
+import re
+import zlib
+import unicodedata
+from collections import Counter, defaultdict
+from itertools import combinations
+from typing import Optional
+
+import numpy as np
+
+
+# MinHash / LSH parameters: 8 bands of 4 rows give a ~0.6 Jaccard candidate
+# threshold, below the verification threshold so true near-duplicates are kept.
+NUM_PERM = 32
+NUM_BANDS = 8
+SHINGLE_SIZE = 3
+DEFAULT_THRESHOLD = 0.7
+# LSH buckets above this size only pair each member with the first one, so
+# repetitive classes cost linear rather than quadratic verification work
+LARGE_BUCKET = 64
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(1)
+_PERM_A = _rng.integers(1, _MERSENNE_PRIME, size=NUM_PERM, dtype=np.int64)
+_PERM_B = _rng.integers(0, _MERSENNE_PRIME, size=NUM_PERM, dtype=np.int64)
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s\U0001F000-\U0001FAFF\u2600-\u27BF]+")
+_REPEAT_RE = re.compile(r"(.)\1{2,}")
+_SPACE_RE = re.compile(r"\s+")
+
+# Two feedbacks that differ by a negation must never be merged ("clair" vs "pas clair")
+_NEGATIONS = frozenset({
+    "ne", "n", "pas", "non", "jamais", "rien", "aucun", "aucune", "sans",
+    "not", "no", "never", "dont", "don", "didn", "isn", "wasn",
+    "لا", "ليس", "لم", "لن", "غير"
+})
+
+
+def normalize_feedback(text: str) -> str:
+    """
+    Normalise a feedback for duplicate detection.
+
+    Lowercases, strips accents and Arabic diacritics, drops punctuation,
+    squeezes repeated characters ("trèèès" -> "tres", "👍👍👍" -> "👍") and
+    collapses whitespace. Emojis are kept since they carry the sentiment.
+    """
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = _PUNCTUATION_RE.sub(" ", text)
+    text = _REPEAT_RE.sub(r"\1", text)
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def _shingles(text: str) -> set[str]:
+    padded = f" {text} "
+    if len(padded) <= SHINGLE_SIZE:
+        return {padded}
+    return {padded[i:i + SHINGLE_SIZE] for i in range(len(padded) - SHINGLE_SIZE + 1)}
+
+
+def _negations(text: str) -> frozenset:
+    return frozenset(w for w in re.split(r"[\s']+", text) if w in _NEGATIONS)
+
+
+def _shingle_masks(shingle_sets: list[set[str]]) -> list[int]:
+    """Each shingle set as an int bitmask over the shingle vocabulary, for fast exact Jaccard."""
+    vocabulary: dict[str, int] = {}
+    ids = [[vocabulary.setdefault(sh, len(vocabulary)) for sh in s] for s in shingle_sets]
+    masks = []
+    for row in ids:
+        bits = np.zeros(len(vocabulary), dtype=bool)
+        bits[row] = True
+        masks.append(int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little"))
+    return masks
+
+
+def _minhash_signatures(shingle_sets: list[set[str]]) -> np.ndarray:
+    """MinHash signatures (len(shingle_sets) x NUM_PERM), vectorised over all shingles."""
+    lengths = np.fromiter((len(s) for s in shingle_sets), dtype=np.int64, count=len(shingle_sets))
+    hashes = np.fromiter(
+        (zlib.crc32(sh.encode("utf-8")) for s in shingle_sets for sh in s),
+        dtype=np.int64,
+        count=int(lengths.sum())
+    ) & _MERSENNE_PRIME
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+    signatures = np.empty((len(shingle_sets), NUM_PERM), dtype=np.int64)
+    for i in range(NUM_PERM):
+        permuted = (_PERM_A[i] * hashes + _PERM_B[i]) % _MERSENNE_PRIME
+        signatures[:, i] = np.minimum.reduceat(permuted, starts)
+    return signatures
+
+
+def _lsh_candidates(signatures: np.ndarray) -> set[tuple[int, int]]:
+    """Pairs of rows that share at least one LSH band bucket."""
+    rows = NUM_PERM // NUM_BANDS
+    candidates = set()
+    for band in range(NUM_BANDS):
+        buckets = defaultdict(list)
+        band_slice = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        for idx, key in enumerate(band_slice):
+            buckets[key.tobytes()].append(idx)
+        for members in buckets.values():
+            if len(members) > LARGE_BUCKET:
+                # Star pairs only: the other bands give the rest a chance to meet
+                candidates.update((members[0], other) for other in members[1:])
+            elif len(members) > 1:
+                candidates.update(combinations(members, 2))
+    return candidates
+
+
+def group_feedbacks(
+    feedbacks: list[str],
+    emotions: Optional[list[Optional[int]]] = None,
+    threshold: float = DEFAULT_THRESHOLD
+) -> list[dict]:
+    """
+    Group exact and near-duplicate feedbacks.
+
+    Exact duplicates are grouped on their normalised text; near-duplicates are
+    found with MinHash + LSH over character shingles and confirmed with the
+    exact Jaccard similarity.
+
+    Returns:
+        Groups ordered by first appearance, each as a dict with the
+        representative "text" (most common original wording), "count" and
+        "emotions" (Counter of emotion value -> occurrences).
+    """
+    if not feedbacks:
+        return []
+
+    # 1. Exact duplicates after normalisation
+    unique_keys: dict[str, int] = {}
+    members: list[list[int]] = []
+    for i, fb in enumerate(feedbacks):
+        key = normalize_feedback(fb)
+        if key not in unique_keys:
+            unique_keys[key] = len(members)
+            members.append([])
+        members[unique_keys[key]].append(i)
+    keys = list(unique_keys)
+
+    # 2. Near-duplicates among the unique normalised texts
+    parent = list(range(len(keys)))
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    if len(keys) > 1 and threshold < 1.0:
+        shingle_sets = [_shingles(k) for k in keys]
+        signatures = _minhash_signatures(shingle_sets)
+        sizes = [len(s) for s in shingle_sets]
+        masks = _shingle_masks(shingle_sets)
+        negations = [_negations(k) for k in keys]
+        for a, b in _lsh_candidates(signatures):
+            root_a, root_b = find(a), find(b)
+            if root_a == root_b or negations[a] != negations[b]:
+                continue
+            # Exact Jaccard: |A & B| / |A | B|
+            common = (masks[a] & masks[b]).bit_count()
+            if common >= threshold * (sizes[a] + sizes[b] - common):
+                parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    # 3. Build groups, keyed by their root, in order of first appearance
+    grouped: dict[int, list[int]] = {}
+    for key_idx in range(len(keys)):
+        grouped.setdefault(find(key_idx), []).extend(members[key_idx])
+
+    groups = []
+    for indices in grouped.values():
+        indices.sort()
+        wording = Counter(feedbacks[i].strip() for i in indices)
+        emotion_counts = Counter()
+        if emotions:
+            emotion_counts.update(emotions[i] for i in indices if i < len(emotions) and emotions[i])
+        groups.append({
+            "text": wording.most_common(1)[0][0],
+            "count": len(indices),
+            "emotions": emotion_counts,
+            "first_index": indices[0]
+        })
+    groups.sort(key=lambda g: g["first_index"])
+    return groups
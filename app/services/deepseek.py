@@ -1,35 +1,54 @@
 import os
+import time
+import asyncio
 import httpx
+from collections import Counter
 from typing import Optional
 
+from app.services.resilience import Deadline, CircuitBreaker, LatencyTracker, backoff_delay, hedged
+
 
 DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY", "")
 DEEPSEEK_BASE_URL = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
 
+# Analysis mode: "single" sends every feedback in one prompt, "map_reduce" summarises
+# token-bounded chunks concurrently then merges them, "auto" picks map_reduce only
+# when the single prompt would not fit in DEEPSEEK_CONTEXT_TOKENS.
+DEEPSEEK_ANALYSIS_MODE = os.getenv("DEEPSEEK_ANALYSIS_MODE", "auto")
+DEEPSEEK_CONTEXT_TOKENS = int(os.getenv("DEEPSEEK_CONTEXT_TOKENS", "8000"))
+DEEPSEEK_CHUNK_TOKENS = int(os.getenv("DEEPSEEK_CHUNK_TOKENS", "4000"))
+DEEPSEEK_MAP_CONCURRENCY = int(os.getenv("DEEPSEEK_MAP_CONCURRENCY", "32"))
+DEEPSEEK_MAP_MAX_TOKENS = int(os.getenv("DEEPSEEK_MAP_MAX_TOKENS", "250"))
 
-def _generate_prompts(feedbacks: list[str], context: str, emotions: Optional[list[int]] = None) -> tuple[str, str]:
-    # Combine feedbacks with emotions if available
-    feedbacks_text = ""
-    for i, fb in enumerate(feedbacks):
-        emotion_str = ""
-        if emotions and i < len(emotions) and emotions[i]:
-            emotion_labels = {
-                1: "très triste", 2: "triste", 3: "déçu", 4: "neutre", 5: "content",
-                6: "satisfait", 7: "heureux", 8: "très heureux", 9: "ravi", 10: "euphorique"
-            }
-            emotion_str = f" [État émotionnel: {emotion_labels.get(emotions[i], 'inconnu')}]"
-        feedbacks_text += f"- {fb}{emotion_str}\n"
-
-    # Calculate emotion summary if available
-    emotion_summary = ""
-    if emotions:
-        valid_emotions = [e for e in emotions if e is not None]
-        if valid_emotions:
-            avg_emotion = sum(valid_emotions) / len(valid_emotions)
-            emotion_summary = f"\n\nRésumé émotionnel: Moyenne {avg_emotion:.1f}/10 sur {len(valid_emotions)} réponses."
-
-    # Optimized prompt for faster and more accurate analysis
-    system_prompt = """Tu es un assistant pédagogique expert qui analyse les feedbacks des étudiants.
+# Collapse exact and near-duplicate feedbacks into one prompt line with a count
+DEEPSEEK_DEDUP = os.getenv("DEEPSEEK_DEDUP", "true").lower() in ("1", "true", "yes")
+DEEPSEEK_DEDUP_THRESHOLD = float(os.getenv("DEEPSEEK_DEDUP_THRESHOLD", "0.7"))
+
+# Resilience: total time budget per analysis, retries with jittered exponential
+# backoff, circuit breaker, and optional hedged requests after the observed p95.
+DEEPSEEK_TIMEOUT_BUDGET = float(os.getenv("DEEPSEEK_TIMEOUT_BUDGET", "30"))
+DEEPSEEK_MAX_RETRIES = int(os.getenv("DEEPSEEK_MAX_RETRIES", "3"))
+DEEPSEEK_RETRY_BASE_DELAY = float(os.getenv("DEEPSEEK_RETRY_BASE_DELAY", "0.5"))
+DEEPSEEK_RETRY_MAX_DELAY = float(os.getenv("DEEPSEEK_RETRY_MAX_DELAY", "8"))
+DEEPSEEK_BREAKER_THRESHOLD = int(os.getenv("DEEPSEEK_BREAKER_THRESHOLD", "5"))
+DEEPSEEK_BREAKER_RESET = float(os.getenv("DEEPSEEK_BREAKER_RESET", "30"))
+DEEPSEEK_HEDGE = os.getenv("DEEPSEEK_HEDGE", "false").lower() in ("1", "true", "yes")
+DEEPSEEK_HEDGE_MIN_SAMPLES = int(os.getenv("DEEPSEEK_HEDGE_MIN_SAMPLES", "20"))
+
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+_breaker = CircuitBreaker(DEEPSEEK_BREAKER_THRESHOLD, DEEPSEEK_BREAKER_RESET)
+_latency = LatencyTracker()
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+EMOTION_LABELS = {
+    1: "très triste", 2: "triste", 3: "déçu", 4: "neutre", 5: "content",
+    6: "satisfait", 7: "heureux", 8: "très heureux", 9: "ravi", 10: "euphorique"
+}
+
+# Optimized prompt for faster and more accurate analysis
+SYSTEM_PROMPT = """Tu es un assistant pédagogique expert qui analyse les feedbacks des étudiants.
 
 Ta tâche:
 - Analyser les feedbacks fournis rapidement et précisément
@@ -45,6 +64,121 @@ Format de réponse (sois concis):
 
 Écris en français. Sois direct et concis."""
 
+MAP_SYSTEM_PROMPT = """Tu es un assistant pédagogique qui prépare la synthèse d'un lot de feedbacks d'étudiants.
+Ce lot n'est qu'une partie de l'ensemble: une synthèse finale sera faite plus tard.
+
+Liste de façon très compacte:
+- Les thèmes récurrents (avec leur fréquence approximative)
+- Les points positifs
+- Les points à améliorer
+- Les remarques isolées mais importantes
+
+Écris en français, en phrases courtes, sans introduction ni conclusion."""
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate for prompt budgeting.
+
+    Uses ~4 UTF-8 bytes per token, which slightly over-estimates French and
+    English and accounts for Arabic's two-byte characters.
+    """
+    if not text:
+        return 0
+    return (len(text.encode("utf-8")) + 3) // 4
+
+
+def _format_feedback_lines(feedbacks: list[str], emotions: Optional[list[int]] = None) -> list[str]:
+    """Format each feedback as a prompt line, with its emotion label if available."""
+    lines = []
+    for i, fb in enumerate(feedbacks):
+        emotion_str = ""
+        if emotions and i < len(emotions) and emotions[i]:
+            emotion_str = f" [État émotionnel: {EMOTION_LABELS.get(emotions[i], 'inconnu')}]"
+        lines.append(f"- {fb}{emotion_str}\n")
+    return lines
+
+
+def _format_grouped_lines(groups: list[dict]) -> list[str]:
+    """Format duplicate groups as prompt lines: one representative, its count and emotion distribution."""
+    lines = []
+    for group in groups:
+        emotions: Counter = group["emotions"]
+        if group["count"] == 1:
+            emotion_str = ""
+            if emotions:
+                emotion = next(iter(emotions))
+                emotion_str = f" [État émotionnel: {EMOTION_LABELS.get(emotion, 'inconnu')}]"
+            lines.append(f"- {group['text']}{emotion_str}\n")
+            continue
+        emotion_str = ""
+        if emotions:
+            distribution = ", ".join(
+                f"{EMOTION_LABELS.get(e, 'inconnu')}×{n}" for e, n in emotions.most_common()
+            )
+            emotion_str = f" [États émotionnels: {distribution}]"
+        lines.append(f"- {group['text']} (×{group['count']}){emotion_str}\n")
+    return lines
+
+
+def _build_feedback_lines(
+    feedbacks: list[str],
+    emotions: Optional[list[int]] = None,
+    dedup: bool = True
+) -> tuple[list[str], dict]:
+    """
+    Build the feedback prompt lines, collapsing duplicates if enabled.
+
+    Returns:
+        Tuple of (lines, stats) where stats reports the prompt-size reduction:
+        line, character and estimated token counts before and after collapsing
+    """
+    raw_lines = _format_feedback_lines(feedbacks, emotions)
+    lines = raw_lines
+    if dedup and len(feedbacks) > 1:
+        # numpy-based, imported with the first analysis rather than at startup
+        from app.services.dedup import group_feedbacks
+
+        lines = _format_grouped_lines(group_feedbacks(feedbacks, emotions, DEEPSEEK_DEDUP_THRESHOLD))
+
+    tokens_before = sum(estimate_tokens(line) for line in raw_lines)
+    tokens_after = sum(estimate_tokens(line) for line in lines)
+    stats = {
+        "feedbacks": len(feedbacks),
+        "raw_lines": len(raw_lines),
+        "prompt_lines": len(lines),
+        "raw_chars": sum(len(line) for line in raw_lines),
+        "prompt_chars": sum(len(line) for line in lines),
+        "feedback_tokens_before": tokens_before,
+        "feedback_tokens_after": tokens_after,
+        "reduction_pct": round(100 * (1 - tokens_after / tokens_before), 1) if tokens_before else 0.0
+    }
+    return lines, stats
+
+
+def _emotion_summary(emotions: Optional[list[int]]) -> str:
+    """Average emotion over the whole selection, as a prompt suffix."""
+    if not emotions:
+        return ""
+    valid_emotions = [e for e in emotions if e is not None]
+    if not valid_emotions:
+        return ""
+    avg_emotion = sum(valid_emotions) / len(valid_emotions)
+    return f"\n\nRésumé émotionnel: Moyenne {avg_emotion:.1f}/10 sur {len(valid_emotions)} réponses."
+
+
+def _generate_prompts(
+    feedbacks: list[str],
+    context: str,
+    emotions: Optional[list[int]] = None,
+    lines: Optional[list[str]] = None
+) -> tuple[str, str]:
+    # Pre-built (e.g. deduplicated) lines take precedence over the raw feedbacks
+    if lines is None:
+        lines = _format_feedback_lines(feedbacks, emotions)
+    feedbacks_text = "".join(lines)
+    emotion_summary = _emotion_summary(emotions)
+
     user_prompt = f"""Contexte: {context if context else "Non spécifié"}
 
 Feedbacks des étudiants:
@@ -52,7 +186,86 @@ Feedbacks des étudiants:
 
 Génère un résumé concis et actionnable."""
 
-    return system_prompt, user_prompt
+    return SYSTEM_PROMPT, user_prompt
+
+
+def _previous_summary_block(previous_summary: str, previous_count: int) -> str:
+    return f"""Synthèse précédente ({previous_count} feedbacks déjà analysés):
+{previous_summary.strip()}
+
+"""
+
+
+def _generate_update_prompts(
+    previous_summary: str,
+    previous_count: int,
+    context: str,
+    lines: list[str],
+    emotions: Optional[list[int]] = None
+) -> tuple[str, str]:
+    """Prompts asking to update a previous summary with newly added feedbacks only."""
+    emotion_summary = _emotion_summary(emotions).replace("Résumé émotionnel", "Résumé émotionnel des nouveaux feedbacks")
+    user_prompt = f"""Contexte: {context if context else "Non spécifié"}
+
+{_previous_summary_block(previous_summary, previous_count)}Nouveaux feedbacks des étudiants ({len(lines)} lignes):
+{"".join(lines)}{emotion_summary}
+
+Mets à jour la synthèse précédente avec ces nouveaux feedbacks, en gardant le même format.
+Tiens compte du poids relatif des anciens et des nouveaux feedbacks."""
+    return SYSTEM_PROMPT, user_prompt
+
+
+def _chunk_lines(lines: list[str], max_chunk_tokens: int) -> list[list[str]]:
+    """
+    Split prompt lines into consecutive chunks of at most max_chunk_tokens.
+
+    A single line larger than the budget still gets its own chunk.
+    """
+    chunks: list[list[str]] = []
+    current: list[str] = []
+    current_tokens = 0
+    for line in lines:
+        line_tokens = estimate_tokens(line)
+        if current and current_tokens + line_tokens > max_chunk_tokens:
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(line)
+        current_tokens += line_tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _generate_map_prompts(chunk_lines: list[str], context: str, index: int, total: int) -> tuple[str, str]:
+    user_prompt = f"""Contexte: {context if context else "Non spécifié"}
+
+Lot {index}/{total} des feedbacks des étudiants ({len(chunk_lines)} réponses):
+{"".join(chunk_lines)}
+Synthétise ce lot."""
+    return MAP_SYSTEM_PROMPT, user_prompt
+
+
+def _generate_reduce_prompts(
+    partial_summaries: list[str],
+    context: str,
+    feedback_count: int,
+    emotions: Optional[list[int]] = None,
+    previous_summary: Optional[str] = None,
+    previous_count: int = 0
+) -> tuple[str, str]:
+    partials_text = "\n\n".join(
+        f"### Lot {i}\n{summary.strip()}" for i, summary in enumerate(partial_summaries, 1)
+    )
+    previous_block = _previous_summary_block(previous_summary, previous_count) if previous_summary else ""
+    subject = "nouveaux feedbacks" if previous_summary else "feedbacks d'étudiants"
+    user_prompt = f"""Contexte: {context if context else "Non spécifié"}
+
+{previous_block}Synthèses partielles de {len(partial_summaries)} lots couvrant {feedback_count} {subject}:
+{partials_text}{_emotion_summary(emotions)}
+
+Fusionne ces synthèses en tenant compte de la fréquence des thèmes entre les lots.
+Génère un résumé concis et actionnable."""
+    return SYSTEM_PROMPT, user_prompt
 
 
 def _create_payload(system_prompt: str, user_prompt: str, max_tokens: int) -> dict:
@@ -68,11 +281,222 @@ def _create_payload(system_prompt: str, user_prompt: str, max_tokens: int) -> di
     }
 
 
+def get_client() -> httpx.AsyncClient:
+    """Shared pooled client, so keep-alive connections are reused across analyses."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            timeout=DEEPSEEK_TIMEOUT_BUDGET,
+            limits=httpx.Limits(max_connections=max(1, DEEPSEEK_MAP_CONCURRENCY * 2))
+        )
+        _client_loop = loop
+    return _client
+
+
+async def warm_client(timeout: float = 5.0):
+    """
+    Open the pooled client and a keep-alive connection to the API (DNS and
+    TLS handshake included), so the first analysis does not pay for them.
+    """
+    client = get_client()
+    if not DEEPSEEK_API_KEY:
+        return
+    # Any answer leaves a connection in the pool; only network errors raise
+    await client.get(
+        f"{DEEPSEEK_BASE_URL}/models",
+        headers={"Authorization": f"Bearer {DEEPSEEK_API_KEY}"},
+        timeout=timeout
+    )
+
+
+async def close_client():
+    """Close the shared client (application shutdown)."""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+
+
+def get_client_health() -> dict:
+    """Circuit breaker state and observed latency, for metrics."""
+    p95 = _latency.percentile(95)
+    return {
+        **_breaker.snapshot(),
+        "latency_samples": len(_latency),
+        "latency_p95_seconds": round(p95, 3) if p95 is not None else None
+    }
+
+
+def _retry_after_seconds(response: httpx.Response) -> float:
+    try:
+        return max(0.0, float(response.headers.get("Retry-After", "0")))
+    except ValueError:
+        return 0.0
+
+
+def _record_usage(usage: dict, data: dict):
+    """Add the token usage of one response to a per-analysis accumulator."""
+    reported = data.get("usage") or {}
+    # DeepSeek reports prompt cache hits directly, OpenAI-compatible APIs in the details
+    cached = reported.get("prompt_cache_hit_tokens")
+    if cached is None:
+        cached = (reported.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+    usage["calls"] = usage.get("calls", 0) + 1
+    usage["prompt_tokens"] = usage.get("prompt_tokens", 0) + (reported.get("prompt_tokens") or 0)
+    usage["completion_tokens"] = usage.get("completion_tokens", 0) + (reported.get("completion_tokens") or 0)
+    usage["cached_tokens"] = usage.get("cached_tokens", 0) + (cached or 0)
+    if data.get("model"):
+        usage["model"] = data["model"]
+
+
+async def _post_chat_completion(
+    client: httpx.AsyncClient,
+    payload: dict,
+    deadline: Optional[Deadline] = None,
+    usage: Optional[dict] = None
+) -> Optional[str]:
+    """
+    Send one chat completion request and return the message content, or None on failure.
+
+    Retryable failures (timeouts, connection errors, 408/429/5xx) are retried
+    with jittered exponential backoff, honouring Retry-After, as long as the
+    deadline allows. The circuit breaker short-circuits calls while DeepSeek
+    is unhealthy, and hedging duplicates a request that is slower than p95.
+    Token usage of the successful response is added to usage, if given.
+    """
+    deadline = deadline or Deadline(DEEPSEEK_TIMEOUT_BUDGET)
+
+    async def send() -> httpx.Response:
+        return await client.post(
+            f"{DEEPSEEK_BASE_URL}/chat/completions",
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {DEEPSEEK_API_KEY}"
+            },
+            json=payload,
+            timeout=max(0.001, deadline.remaining())
+        )
+
+    for attempt in range(DEEPSEEK_MAX_RETRIES + 1):
+        if deadline.expired:
+            print("DeepSeek API: time budget exhausted")
+            return None
+        if not _breaker.allow():
+            print("DeepSeek API: circuit open, failing fast")
+            return None
+
+        retry_after = 0.0
+        started = time.monotonic()
+        try:
+            hedge_delay = _latency.percentile(95) if len(_latency) >= DEEPSEEK_HEDGE_MIN_SAMPLES else None
+            if DEEPSEEK_HEDGE and hedge_delay is not None and hedge_delay < deadline.remaining():
+                response = await hedged(send, hedge_delay, is_good=lambda r: r.status_code == 200)
+            else:
+                response = await send()
+        except (httpx.TimeoutException, httpx.TransportError) as e:
+            _breaker.record_failure()
+            print(f"DeepSeek API transport error (attempt {attempt + 1}): {e!r}")
+        else:
+            if response.status_code == 200:
+                _breaker.record_success()
+                _latency.record(time.monotonic() - started)
+                data = response.json()
+                if usage is not None:
+                    _record_usage(usage, data)
+                return data["choices"][0]["message"]["content"]
+
+            print(f"DeepSeek API error: {response.status_code} - {response.text}")
+            if response.status_code not in RETRYABLE_STATUS_CODES:
+                # Our request is wrong (auth, payload): retrying cannot help,
+                # but the upstream did answer, so it counts as healthy
+                _breaker.record_success()
+                return None
+            _breaker.record_failure()
+            retry_after = _retry_after_seconds(response)
+
+        if attempt == DEEPSEEK_MAX_RETRIES:
+            break
+        delay = max(retry_after, backoff_delay(attempt, DEEPSEEK_RETRY_BASE_DELAY, DEEPSEEK_RETRY_MAX_DELAY))
+        if delay >= deadline.remaining():
+            print("DeepSeek API: not enough time budget left to retry")
+            return None
+        await asyncio.sleep(delay)
+
+    return None
+
+
+async def _map_reduce_summary(
+    client: httpx.AsyncClient,
+    lines: list[str],
+    context: str,
+    max_tokens: int,
+    emotions: Optional[list[int]],
+    chunk_tokens: int,
+    concurrency: int,
+    feedback_count: Optional[int] = None,
+    deadline: Optional[Deadline] = None,
+    previous_summary: Optional[str] = None,
+    previous_count: int = 0,
+    usage: Optional[dict] = None
+) -> Optional[str]:
+    """
+    Summarise token-bounded chunks concurrently, then merge the partial summaries.
+
+    Partial summaries that are themselves too large for one reduce prompt are
+    merged hierarchically, in groups, until a single summary remains. With a
+    previous_summary, the final reduce updates it instead of starting afresh.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def bounded_call(payload: dict) -> Optional[str]:
+        async with semaphore:
+            return await _post_chat_completion(client, payload, deadline, usage)
+
+    chunks = _chunk_lines(lines, chunk_tokens)
+    map_payloads = [
+        _create_payload(*_generate_map_prompts(chunk, context, i, len(chunks)), DEEPSEEK_MAP_MAX_TOKENS)
+        for i, chunk in enumerate(chunks, 1)
+    ]
+    results = await asyncio.gather(*(bounded_call(p) for p in map_payloads), return_exceptions=True)
+    partials = [r for r in results if isinstance(r, str) and r.strip()]
+
+    if not partials:
+        print("DeepSeek map-reduce: every chunk summary failed")
+        return None
+    if len(partials) < len(chunks):
+        print(f"DeepSeek map-reduce: {len(chunks) - len(partials)}/{len(chunks)} chunk summaries failed")
+
+    # Collapse partial summaries in groups while they do not fit one reduce prompt
+    while len(partials) > 1 and estimate_tokens("\n\n".join(partials)) > DEEPSEEK_CONTEXT_TOKENS:
+        groups = _chunk_lines([p + "\n" for p in partials], chunk_tokens)
+        if len(groups) == len(partials):
+            break  # Each partial already fills a chunk, merging further cannot help
+        group_payloads = [
+            _create_payload(*_generate_map_prompts(group, context, i, len(groups)), DEEPSEEK_MAP_MAX_TOKENS)
+            for i, group in enumerate(groups, 1)
+        ]
+        results = await asyncio.gather(*(bounded_call(p) for p in group_payloads), return_exceptions=True)
+        merged = [r for r in results if isinstance(r, str) and r.strip()]
+        if not merged:
+            break
+        partials = merged
+
+    system_prompt, user_prompt = _generate_reduce_prompts(
+        partials, context, feedback_count or len(lines), emotions, previous_summary, previous_count
+    )
+    return await _post_chat_completion(client, _create_payload(system_prompt, user_prompt, max_tokens), deadline, usage)
+
+
 async def analyze_feedbacks(
     feedbacks: list[str],
     context: str,
     max_tokens: int = 500,
-    emotions: Optional[list[int]] = None
+    emotions: Optional[list[int]] = None,
+    mode: Optional[str] = None,
+    stats: Optional[dict] = None,
+    previous_summary: Optional[str] = None,
+    previous_count: int = 0
 ) -> Optional[str]:
     """
     Analyze feedbacks using DeepSeek API with optimized settings.
@@ -82,6 +506,12 @@ async def analyze_feedbacks(
         context: Context provided by the teacher
         max_tokens: Maximum tokens for the response (reduced for faster response)
         emotions: Optional list of emotion values (1-10) corresponding to feedbacks
+        mode: "single", "map_reduce" or "auto" (defaults to DEEPSEEK_ANALYSIS_MODE)
+        stats: Optional dict filled with prompt statistics (size reduction, mode)
+            and the token usage summed over every call ("usage")
+        previous_summary: Summary of an earlier analysis that the feedbacks
+            (added since) should update, instead of summarising from scratch
+        previous_count: Number of feedbacks covered by previous_summary
 
     Returns:
         Generated summary or None if failed
@@ -94,29 +524,47 @@ async def analyze_feedbacks(
         print("Warning: No feedbacks to analyze")
         return None
 
-    system_prompt, user_prompt = _generate_prompts(feedbacks, context, emotions)
-    payload = _create_payload(system_prompt, user_prompt, max_tokens)
+    # Duplicate collapsing is CPU-bound (seconds on large classes): keep it off the event loop
+    lines, prompt_stats = await asyncio.to_thread(_build_feedback_lines, feedbacks, emotions, DEEPSEEK_DEDUP)
+
+    mode = mode or DEEPSEEK_ANALYSIS_MODE
+    if previous_summary:
+        system_prompt, user_prompt = _generate_update_prompts(previous_summary, previous_count, context, lines, emotions)
+    else:
+        system_prompt, user_prompt = _generate_prompts(feedbacks, context, emotions, lines=lines)
+    if mode == "auto":
+        prompt_tokens = estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+        mode = "map_reduce" if prompt_tokens > DEEPSEEK_CONTEXT_TOKENS else "single"
 
+    if stats is not None:
+        stats.update(prompt_stats)
+        stats["mode"] = mode
+        stats["usage"] = {"model": "deepseek-chat"}
+    usage = stats["usage"] if stats is not None else None
+
+    # Every call made for this analysis shares one time budget
+    deadline = Deadline(DEEPSEEK_TIMEOUT_BUDGET)
     try:
-        # Increased timeout for reliability, reduced temperature for consistency
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                f"{DEEPSEEK_BASE_URL}/chat/completions",
-                headers={
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {DEEPSEEK_API_KEY}"
-                },
-                json=payload
+        client = get_client()
+        if mode == "map_reduce":
+            return await _map_reduce_summary(
+                client,
+                lines,
+                context,
+                max_tokens,
+                emotions,
+                DEEPSEEK_CHUNK_TOKENS,
+                DEEPSEEK_MAP_CONCURRENCY,
+                feedback_count=len(feedbacks),
+                deadline=deadline,
+                previous_summary=previous_summary,
+                previous_count=previous_count,
+                usage=usage
             )
 
-            if response.status_code == 200:
-                data = response.json()
-                return data["choices"][0]["message"]["content"]
-            else:
-                print(f"DeepSeek API error: {response.status_code} - {response.text}")
-                return None
+        payload = _create_payload(system_prompt, user_prompt, max_tokens)
+        return await _post_chat_completion(client, payload, deadline, usage)
 
     except Exception as e:
         print(f"Error calling DeepSeek API: {e}")
         return None
-
@@ -0,0 +1,169 @@
+import threading
+from datetime import date
+from itertools import chain
+from typing import Optional
+
+import numpy as np
+
+from app.database import get_feedback_emotion_counts, get_max_feedback_id, feedback_generation
+
+EMOTION_MIN = 1
+EMOTION_MAX = 10
+BINS = EMOTION_MAX - EMOTION_MIN + 1
+PERCENTILES = (10, 25, 50, 75, 90)
+_VALUES = np.arange(EMOTION_MIN, EMOTION_MAX + 1)
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def _day_label(day: int) -> str:
+    return date.fromordinal(_EPOCH_ORDINAL + int(day)).isoformat()
+
+
+def rows_to_columns(rows: list[tuple]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(emotion, day, count) rows from the database as three NumPy columns."""
+    flat = np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=3 * len(rows))
+    return flat[0::3], flat[1::3], flat[2::3]
+
+
+def daily_histograms(
+    emotions: np.ndarray,
+    days: np.ndarray,
+    counts: Optional[np.ndarray] = None
+) -> tuple[int, np.ndarray]:
+    """
+    Bin emotions by collection day with one 2D bincount, each (emotion, day)
+    pair weighted by counts (one answer each if None).
+
+    Returns:
+        (first_day, counts) where counts[d, v] is the number of answers with
+        emotion EMOTION_MIN + v on day first_day + d (days since the epoch).
+    """
+    valid = (emotions >= EMOTION_MIN) & (emotions <= EMOTION_MAX)
+    emotions, days = emotions[valid], days[valid]
+    if counts is not None:
+        counts = counts[valid]
+    if emotions.size == 0:
+        return 0, np.zeros((0, BINS), dtype=np.int64)
+    first_day = int(days.min())
+    offsets = days - first_day
+    span = int(offsets.max()) + 1
+    binned = np.bincount(offsets * BINS + (emotions - EMOTION_MIN), weights=counts, minlength=span * BINS)
+    return first_day, binned.astype(np.int64).reshape(span, BINS)
+
+
+def compute_emotion_stats(
+    first_day: int,
+    per_day: np.ndarray,
+    window: int = 7,
+    max_days: Optional[int] = None
+) -> dict:
+    """
+    Emotion analytics from daily histograms.
+
+    Args:
+        first_day: Day (since the epoch) of the first row of per_day
+        per_day: Counts per day and emotion value, as built by daily_histograms
+        window: Number of collection days in the moving average
+        max_days: Only cover the last max_days collection days (None for all):
+            the histogram, percentiles, mean and standard deviation are
+            computed over them too, while the moving average of the first
+            kept days still includes the days before
+
+    Returns:
+        Dict with the global histogram, nearest-rank percentiles, mean and
+        standard deviation, the per-day breakdown and the moving average.
+    """
+    counts = per_day.sum(axis=1)
+    active = np.flatnonzero(counts)
+    per_day, counts = per_day[active], counts[active]
+    sums = per_day @ _VALUES
+
+    # Moving average over collection days, weighted by the number of answers
+    window = max(1, window)
+    sum_cumulative = np.concatenate(([0], np.cumsum(sums)))
+    count_cumulative = np.concatenate(([0], np.cumsum(counts)))
+    index = np.arange(1, active.size + 1)
+    start = np.maximum(0, index - window)
+    with np.errstate(invalid="ignore"):
+        moving = (sum_cumulative[index] - sum_cumulative[start]) / (count_cumulative[index] - count_cumulative[start])
+
+    if max_days:
+        keep = slice(-max_days, None)
+        active, per_day, counts, sums, moving = active[keep], per_day[keep], counts[keep], sums[keep], moving[keep]
+
+    histogram = per_day.sum(axis=0) if len(per_day) else np.zeros(BINS, dtype=np.int64)
+    total = int(histogram.sum())
+    result = {
+        "total": total,
+        "mean": None,
+        "std": None,
+        "histogram": {str(v): int(c) for v, c in zip(_VALUES, histogram)},
+        "percentiles": {f"p{p}": None for p in PERCENTILES},
+        "by_day": [],
+        "moving_average": [],
+        "window": window
+    }
+    if total == 0:
+        return result
+
+    mean = float(histogram @ _VALUES) / total
+    variance = float(histogram @ (_VALUES - mean) ** 2) / total
+    # Integer data: percentiles come straight from the cumulative histogram
+    ranks = np.ceil(np.array(PERCENTILES) / 100 * total).astype(np.int64)
+    percentile_values = _VALUES[np.searchsorted(np.cumsum(histogram), ranks)]
+    result["mean"] = round(mean, 2)
+    result["std"] = round(variance ** 0.5, 2)
+    result["percentiles"] = {f"p{p}": int(v) for p, v in zip(PERCENTILES, percentile_values)}
+
+    labels = [_day_label(first_day + d) for d in active]
+    result["by_day"] = [
+        {"date": label, "count": int(c), "mean": round(float(s) / c, 2), "histogram": h.tolist()}
+        for label, c, s, h in zip(labels, counts, sums, per_day)
+    ]
+    result["moving_average"] = [
+        {"date": label, "mean": round(float(m), 2)} for label, m in zip(labels, moving)
+    ]
+    return result
+
+
+class EmotionStatsCache:
+    """
+    Per-teacher daily emotion histograms and computed stats, kept until feedback changes.
+
+    Histograms are read from the per-day aggregate the database keeps up to
+    date (one row per collection day and emotion), so a reload costs the same
+    whatever the number of feedbacks; new feedbacks (a higher max ID) or a
+    reset (feedback_generation change) trigger one. Responses are then
+    computed from a days x 10 matrix.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: dict[int, dict] = {}
+
+    def get(self, teacher_id: int, window: int = 7, max_days: Optional[int] = None) -> dict:
+        max_id = get_max_feedback_id(teacher_id)
+        generation = feedback_generation()
+        with self._lock:
+            entry = self._entries.get(teacher_id)
+            if entry is None or entry["generation"] != generation or entry["max_id"] != max_id:
+                rows = get_feedback_emotion_counts(teacher_id)
+                entry = {
+                    "generation": generation,
+                    "max_id": max_id,
+                    "daily": daily_histograms(*rows_to_columns(rows)),
+                    "results": {}
+                }
+                self._entries[teacher_id] = entry
+
+            key = (window, max_days)
+            if key not in entry["results"]:
+                entry["results"][key] = compute_emotion_stats(*entry["daily"], window, max_days)
+            return entry["results"][key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+emotion_stats_cache = EmotionStatsCache()
@@ -0,0 +1,60 @@
+"""
+Token bags of feedbacks: per-spelling term counts computed with the wordcloud
+tokenizer when a feedback is written, stored by app.database, and summed in
+SQL to count the terms of any selection without tokenising the texts again.
+"""
+from typing import Optional
+
+from app.database import get_feedback_token_counts, get_unindexed_feedbacks, store_feedback_token_bags
+from app.services.tokenizer import TokenizerEngine, get_tokenizer
+
+
+def token_bag(content: str) -> dict[str, int]:
+    """Per-spelling term counts of a feedback, as stored with it."""
+    return dict(get_tokenizer().token_counts(content))
+
+
+def index_pending_feedbacks(teacher_id: int) -> int:
+    """
+    Store the token bags of a teacher's feedbacks written without one (e.g.
+    before token bags existed). Returns the number of feedbacks indexed.
+    """
+    rows = get_unindexed_feedbacks(teacher_id)
+    if rows:
+        store_feedback_token_bags([(feedback_id, token_bag(content)) for feedback_id, content in rows])
+    return len(rows)
+
+
+def count_feedback_tokens(
+    teacher_id: int,
+    after_id: int = 0,
+    up_to_id: Optional[int] = None,
+    feedback_ids: Optional[list[int]] = None
+) -> dict[str, int]:
+    """
+    Summed token bags (per spelling) of a teacher's feedbacks with
+    after_id < id <= up_to_id, or of feedback_ids, indexing any pending
+    feedback first. Sums of these are merged once with merge_forms.
+    """
+    index_pending_feedbacks(teacher_id)
+    return get_feedback_token_counts(teacher_id, after_id, up_to_id, feedback_ids)
+
+
+def count_feedback_terms(
+    feedback_ids: Optional[list[int]],
+    teacher_id: int,
+    selected_only: bool = False
+) -> dict[str, int]:
+    """
+    Wordcloud term frequencies of a selection of a teacher's feedbacks (all
+    of them if feedback_ids is None, or only those selected for analysis).
+
+    The stored token bags are summed, then spellings are merged across case
+    and plurals: the result equals counting the concatenated texts.
+    """
+    if feedback_ids is not None and not feedback_ids:
+        return {}
+    index_pending_feedbacks(teacher_id)
+    return TokenizerEngine.merge_forms(
+        get_feedback_token_counts(teacher_id, feedback_ids=feedback_ids, selected_only=selected_only)
+    )
@@ -0,0 +1,182 @@
+import os
+import json
+import logging
+import tempfile
+import threading
+from functools import lru_cache
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Font shipped with the app, used whenever it is present
+BUNDLED_FONT = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static", "fonts", "Tajawal-Regular.ttf"
+)
+# Searched, in this order of preference, when the bundled font is missing
+FONT_DIRS = (
+    "/usr/share/fonts",
+    "/usr/local/share/fonts",
+    "/System/Library/Fonts",
+    "/Library/Fonts",
+    os.path.expanduser("~/Library/Fonts"),
+    os.path.expanduser("~/.local/share/fonts"),
+    "/app/data/fonts"
+)
+TARGET_FONTS = ("tajawal", "cairo", "notosansarabic")
+# Result of the font directory scan, kept across restarts; empty disables it
+FONT_CACHE_FILE = os.getenv("FONT_CACHE_FILE", os.path.join(tempfile.gettempdir(), "feedny_font_cache.json"))
+# Depth of the subdirectories whose mtimes key the cache: packages install
+# fonts in <font dir>/<format>/<package>/
+FONT_CACHE_KEY_DEPTH = 2
+
+REPORTLAB_FONT_NAME = "Multilingual"
+REPORTLAB_FALLBACK_FONT = "Helvetica"
+
+_reportlab_lock = threading.Lock()
+
+
+def discover_font(font_dirs=FONT_DIRS, targets=TARGET_FONTS) -> Optional[str]:
+    """Find the bundled Tajawal font or fallback to system fonts (uncached scan)."""
+    # 1. Primary: Bundled font
+    if os.path.exists(BUNDLED_FONT):
+        return BUNDLED_FONT
+
+    # 2. Secondary: Search common font directories, in a single walk; targets
+    # are in order of preference, then directories
+    matches: dict[str, str] = {}
+    for font_dir in font_dirs:
+        if not os.path.isdir(font_dir):
+            continue
+        for root, _, files in os.walk(font_dir):
+            for f in files:
+                name = f.lower()
+                if not name.endswith(('.ttf', '.otf')):
+                    continue
+                for target in targets:
+                    if target in name:
+                        matches.setdefault(target, os.path.join(root, f))
+            if targets and targets[0] in matches:
+                return matches[targets[0]]
+    return next((matches[target] for target in targets if target in matches), None)
+
+
+def _directory_mtimes(font_dirs, depth: int = FONT_CACHE_KEY_DEPTH) -> dict[str, float]:
+    """mtimes of the font directories and their subdirectories down to depth."""
+    mtimes = {}
+    level = [font_dir for font_dir in font_dirs if os.path.isdir(font_dir)]
+    for current_depth in range(depth + 1):
+        next_level = []
+        for directory in level:
+            try:
+                mtimes[directory] = os.stat(directory).st_mtime
+                if current_depth < depth:
+                    next_level.extend(entry.path for entry in os.scandir(directory) if entry.is_dir())
+            except OSError:
+                continue
+        level = next_level
+    return mtimes
+
+
+def _cache_key(font_dirs, targets) -> dict:
+    return {"targets": list(targets), "mtimes": _directory_mtimes(font_dirs)}
+
+
+def _read_cache(path: str, key: dict) -> tuple[bool, Optional[str]]:
+    """(hit, font path) from the discovery cache file."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return False, None
+    if cached.get("key") != key:
+        return False, None
+    font_path = cached.get("font")
+    if font_path is not None and not os.path.exists(font_path):
+        return False, None
+    return True, font_path
+
+
+def _write_cache(path: str, key: dict, font_path: Optional[str]):
+    try:
+        # Write then rename, so concurrent workers never read a partial file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"key": key, "font": font_path}, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning("Font cache write error (non-fatal): %s", e)
+
+
+def resolve_font(
+    font_dirs=FONT_DIRS,
+    targets=TARGET_FONTS,
+    cache_file: Optional[str] = FONT_CACHE_FILE
+) -> Optional[str]:
+    """
+    Path of the multilingual font: the bundled one, or the result of a scan
+    of the system font directories.
+
+    The scan result is cached in cache_file, keyed by the mtimes of the font
+    directories, so restarts only stat those directories instead of walking
+    every font file.
+    """
+    if os.path.exists(BUNDLED_FONT):
+        return BUNDLED_FONT
+
+    key = _cache_key(font_dirs, targets) if cache_file else None
+    if cache_file:
+        hit, font_path = _read_cache(cache_file, key)
+        if hit:
+            return font_path
+
+    font_path = discover_font(font_dirs, targets)
+    if cache_file:
+        _write_cache(cache_file, key, font_path)
+    return font_path
+
+
+@lru_cache(maxsize=None)
+def get_font_path() -> Optional[str]:
+    """Process-wide multilingual font path, resolved on first use."""
+    font_path = resolve_font()
+    if font_path:
+        logger.info("Multilingual font loaded: %s from %s", os.path.basename(font_path), os.path.dirname(font_path))
+    else:
+        logger.error("No multilingual font found: Arabic/Latin mixed text will not render")
+    return font_path
+
+
+@lru_cache(maxsize=256)
+def get_pil_font(size: int, font_path: Optional[str] = None) -> "ImageFont.FreeTypeFont":
+    """
+    Loaded PIL font (the multilingual one unless font_path is given), shared
+    across calls; raises OSError if there is no font file.
+    """
+    from PIL import ImageFont
+
+    font_path = font_path or get_font_path()
+    if not font_path:
+        raise OSError("No multilingual font available")
+    return ImageFont.truetype(font_path, size)
+
+
+def get_reportlab_font() -> str:
+    """
+    Name of the multilingual font registered with ReportLab (once per
+    process), or Helvetica if it cannot be loaded.
+    """
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    with _reportlab_lock:
+        if REPORTLAB_FONT_NAME in pdfmetrics.getRegisteredFontNames():
+            return REPORTLAB_FONT_NAME
+        font_path = get_font_path()
+        if not font_path:
+            return REPORTLAB_FALLBACK_FONT
+        try:
+            pdfmetrics.registerFont(TTFont(REPORTLAB_FONT_NAME, font_path))
+        except Exception as e:
+            logger.error("Error registering font: %s", e)
+            return REPORTLAB_FALLBACK_FONT
+    return REPORTLAB_FONT_NAME
@@ -0,0 +1,264 @@
+import os
+import time
+import uuid
+import asyncio
+import itertools
+from typing import Optional
+
+from app.database import (
+    create_analysis_job,
+    get_analysis_job,
+    find_active_analysis_job,
+    get_pending_analysis_jobs,
+    update_analysis_job_status,
+    set_analysis_job_thumbnail,
+    complete_analysis_job,
+    delete_old_analysis_jobs,
+    get_analysis_by_id,
+    count_active_analysis_jobs,
+    get_teacher_by_id,
+    get_feedbacks_by_ids_and_teacher,
+    find_incremental_base,
+    insert_analysis_telemetry
+)
+from app.services.analysis import process_feedback_analysis
+from app.services.wordcloud import WORDCLOUD_OUTPUT
+from app.services.admission import AnalysisAdmission, analysis_admission
+from app.services.telemetry import timed_phase, estimate_cost
+
+
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "4"))
+# Queue priority of admin analyses; other teachers' jobs have priority 0
+ANALYSIS_ADMIN_PRIORITY = int(os.getenv("ANALYSIS_ADMIN_PRIORITY", "5"))
+
+
+class AnalysisJobError(Exception):
+    """Raised inside a worker to fail a job with a user-facing message."""
+
+
+class AnalysisJobQueue:
+    """
+    In-process analysis job queue backed by the analysis_jobs table.
+
+    Jobs are persisted before being queued so they survive a restart, and a
+    fixed pool of asyncio workers processes them by priority, then FIFO.
+    Credits are deducted when a job completes, in the same transaction that
+    saves the analysis. Admission (queue and per-teacher limits) and the
+    concurrency of the analyses themselves are delegated to AnalysisAdmission.
+    """
+
+    def __init__(self, workers: int = ANALYSIS_WORKERS, admission: Optional[AnalysisAdmission] = None):
+        self.workers = max(1, workers)
+        self.admission = admission or analysis_admission
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._tasks: list[asyncio.Task] = []
+        self._counter = itertools.count()
+        self._done_events: dict[str, asyncio.Event] = {}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def qsize(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def start(self):
+        """Recover unfinished jobs from the database and start the workers."""
+        if self._tasks:
+            return
+        self._queue = asyncio.PriorityQueue()
+
+        delete_old_analysis_jobs()
+        pending = get_pending_analysis_jobs()
+        for job in pending:
+            if job["status"] == "running":
+                # Interrupted by a restart: nothing was charged, run it again
+                update_analysis_job_status(job["id"], "queued")
+            self._enqueue(job)
+        if pending:
+            print(f"Recovered {len(pending)} analysis job(s) from a previous run")
+
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Cancel the workers. Running jobs stay persisted and resume on next start."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def snapshot(self) -> dict:
+        """Queue depth and worker pool size, for metrics."""
+        return {"depth": self.qsize(), "workers": self.workers, "running": self.running}
+
+    async def submit(
+        self,
+        teacher_id: int,
+        feedback_ids: list[int],
+        context: str,
+        priority: int = 0,
+        wordcloud_format: Optional[str] = None
+    ) -> dict:
+        """
+        Queue an analysis and return its job; wordcloud_format overrides the
+        server's WORDCLOUD_OUTPUT for this analysis.
+
+        A queued or running job with the same teacher, selection, context and
+        wordcloud format is returned instead of creating a duplicate (e.g.
+        retried clicks).
+
+        Raises:
+            AdmissionRejected: if the queue or the teacher's backlog is full
+        """
+        existing = find_active_analysis_job(
+            teacher_id, feedback_ids, context, wordcloud_format, default_format=WORDCLOUD_OUTPUT
+        )
+        if existing:
+            return existing
+
+        self.admission.admit(
+            teacher_id,
+            teacher_pending=count_active_analysis_jobs(teacher_id),
+            queue_depth=self.qsize()
+        )
+
+        job = create_analysis_job(str(uuid.uuid4()), teacher_id, feedback_ids, context, priority, wordcloud_format)
+        self._enqueue(job)
+        return job
+
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[dict]:
+        """Wait until a job is finished (or the timeout expires) and return it."""
+        job = get_analysis_job(job_id)
+        if job and job["status"] in ("queued", "running"):
+            # No await between the status check and registering the event
+            event = self._done_events.setdefault(job_id, asyncio.Event())
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            job = get_analysis_job(job_id)
+        return job
+
+    def _enqueue(self, job: dict):
+        self._queue.put_nowait((-job["priority"], next(self._counter), job["id"]))
+
+    async def _worker(self):
+        while True:
+            _, _, job_id = await self._queue.get()
+            try:
+                await self._run_job(job_id)
+            except AnalysisJobError as e:
+                update_analysis_job_status(job_id, "failed", error=str(e))
+            except Exception as e:
+                print(f"Analysis job {job_id} failed: {e}")
+                update_analysis_job_status(job_id, "failed", error="Erreur lors de l'analyse")
+            finally:
+                self._queue.task_done()
+                event = self._done_events.pop(job_id, None)
+                if event:
+                    event.set()
+
+    async def _run_job(self, job_id: str):
+        job = get_analysis_job(job_id)
+        if not job or job["status"] not in ("queued", "running"):
+            return
+
+        teacher = get_teacher_by_id(job["teacher_id"])
+        if not teacher:
+            raise AnalysisJobError("Enseignant non trouvé")
+        if not teacher.get("is_admin") and teacher["credits"] <= 0:
+            raise AnalysisJobError("Crédits insuffisants. Veuillez recharger votre compte.")
+
+        update_analysis_job_status(job_id, "running")
+        started = time.perf_counter()
+        timings: dict = {}
+
+        with timed_phase(timings, "db_fetch"):
+            feedbacks = get_feedbacks_by_ids_and_teacher(job["feedback_ids"], teacher["id"])
+            # An earlier analysis of part of this collection lets us only process the delta
+            previous = None
+            if feedbacks:
+                previous = find_incremental_base(teacher["id"], job["context"] or "", [fb["id"] for fb in feedbacks])
+        if not feedbacks:
+            raise AnalysisJobError("Aucun feedback trouvé")
+
+        stats: dict = {}
+        summary, wordcloud_base64 = await self.admission.run(
+            teacher["id"],
+            lambda: process_feedback_analysis(
+                feedbacks, job["context"], previous=previous, stats=stats, teacher_id=teacher["id"],
+                output=job.get("wordcloud_format"),
+                # SQLite write: off the event loop, like the renders around it
+                on_thumbnail=lambda thumbnail: asyncio.to_thread(set_analysis_job_thumbnail, job_id, thumbnail)
+            )
+        )
+
+        with timed_phase(timings, "save"):
+            analysis_id = complete_analysis_job(
+                job_id=job_id,
+                teacher_id=teacher["id"],
+                summary=summary,
+                wordcloud_image=wordcloud_base64,
+                feedback_count=len(feedbacks),
+                context=job["context"] or "",
+                charge_credit=not teacher.get("is_admin"),
+                feedback_ids=stats.get("feedback_ids"),
+                term_counts=stats.get("term_counts"),
+                token_counts=stats.get("token_counts"),
+                wordcloud_layout=stats.get("wordcloud_layout"),
+                wordcloud_thumbnail=stats.get("wordcloud_thumbnail")
+            )
+        if analysis_id is None:
+            return
+
+        # Telemetry must never fail the analysis
+        try:
+            timings.update(stats.get("timings", {}))
+            timings["total"] = (time.perf_counter() - started) * 1000
+            usage = stats.get("usage", {})
+            insert_analysis_telemetry(analysis_id, teacher["id"], job_id, {
+                "mode": stats.get("mode"),
+                "feedback_count": len(feedbacks),
+                "processed_feedbacks": stats.get("processed_feedbacks", len(feedbacks)),
+                "timings": timings,
+                "usage": usage,
+                "prompt": stats.get("prompt", {}),
+                "cost_usd": estimate_cost(usage)
+            })
+        except Exception as e:
+            print(f"Telemetry error (non-fatal): {e}")
+
+
+def serialize_job(job: dict) -> dict:
+    """
+    Public view of a job: the wordcloud thumbnail as soon as it is rendered,
+    and the analysis result once completed.
+    """
+    data = {
+        "job_id": job["id"],
+        "status": job["status"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "error": job["error"],
+        "wordcloud_thumbnail": job.get("wordcloud_thumbnail"),
+        "result": None
+    }
+    if job["status"] == "completed" and job["analysis_id"]:
+        analysis = get_analysis_by_id(job["analysis_id"], job["teacher_id"])
+        if analysis:
+            data["result"] = {
+                "analysis_id": analysis["id"],
+                "summary": analysis["summary"],
+                "wordcloud_data": {
+                    "image": analysis["wordcloud_image"] or "",
+                    "layout": analysis["wordcloud_layout"],
+                    "thumbnail": analysis["wordcloud_thumbnail"],
+                    "image_url": f"/api/analyses/{analysis['id']}/wordcloud"
+                }
+            }
+    return data
+
+
+analysis_job_queue = AnalysisJobQueue()
@@ -0,0 +1,30 @@
+from typing import Any, Callable
+
+
+class LazyImports:
+    """
+    Heavy dependencies of a module, imported on first use instead of when the
+    app starts (see benchmark_import.py).
+
+    Each loaded value is bound as a global of the module, so code reading it
+    through get() and tests patching the module attribute see the same object.
+    Install module_getattr as the module's __getattr__ (PEP 562) to keep the
+    names available as module attributes.
+    """
+
+    def __init__(self, module_globals: dict, loaders: dict[str, Callable[[], Any]]):
+        self._globals = module_globals
+        self._loaders = loaders
+
+    def get(self, name: str) -> Any:
+        """The dependency, imported on the first call."""
+        try:
+            return self._globals[name]
+        except KeyError:
+            value = self._globals[name] = self._loaders[name]()
+            return value
+
+    def module_getattr(self, name: str) -> Any:
+        if name in self._loaders:
+            return self.get(name)
+        raise AttributeError(f"module {self._globals['__name__']!r} has no attribute {name!r}")
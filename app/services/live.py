@@ -0,0 +1,172 @@
+import os
+import time
+import asyncio
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+from app.database import feedback_generation, get_max_feedback_id
+from app.services.feedback_terms import count_feedback_tokens
+from app.services.render_pool import render_pool
+from app.services.tokenizer import TokenizerEngine
+
+# Minimum time between two live renders of a teacher's wordcloud (s)
+LIVE_WORDCLOUD_INTERVAL = float(os.getenv("LIVE_WORDCLOUD_INTERVAL", "3"))
+# Live renders running at once across teachers, so analyses keep the render pool
+LIVE_WORDCLOUD_CONCURRENCY = int(os.getenv("LIVE_WORDCLOUD_CONCURRENCY", "1"))
+LIVE_WORDCLOUD_QUALITY = "preview"
+# Comment sent on idle streams so proxies keep them open (s)
+LIVE_WORDCLOUD_KEEPALIVE = 15
+
+
+class _LiveCollection:
+    """Running term totals and last rendered wordcloud of a watched collection."""
+
+    def __init__(self):
+        self.subscribers: set[asyncio.Queue] = set()
+        self.counts: Counter = Counter()
+        self.generation: Optional[int] = None
+        self.max_id = 0
+        # Bumped by each notification; a render catches up with it
+        self.version = 1
+        self.rendered_version = 0
+        self.last_render = 0.0
+        self.frequencies: Optional[dict] = None
+        self.event: Optional[dict] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class LiveWordclouds:
+    """
+    Live preview wordclouds of open collections, pushed to dashboards (SSE).
+
+    Only collections with a subscriber are tracked. Their running term totals
+    are updated from the token bags stored with the feedbacks added since the
+    last render (a reset, i.e. a feedback_generation change, reloads them).
+    One task per teacher re-renders in the preview tier at most once per
+    interval, and only if the frequencies changed; a semaphore bounds renders
+    across teachers. A burst of submissions thus costs one render per
+    interval, whatever its size.
+    """
+
+    def __init__(
+        self,
+        interval: float = LIVE_WORDCLOUD_INTERVAL,
+        concurrency: int = LIVE_WORDCLOUD_CONCURRENCY
+    ):
+        self.interval = max(0.0, interval)
+        self._render_slots = asyncio.Semaphore(max(1, concurrency))
+        self._collections: dict[int, _LiveCollection] = {}
+        self.counters = Counter({"notifications": 0, "renders": 0, "unchanged": 0, "failed": 0})
+
+    def subscribe(self, teacher_id: int) -> asyncio.Queue:
+        """Queue receiving the teacher's wordcloud events, starting with the current one."""
+        collection = self._collections.setdefault(teacher_id, _LiveCollection())
+        # Only the latest event matters: slow clients skip intermediate ones
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        collection.subscribers.add(queue)
+        if collection.event is not None:
+            queue.put_nowait(collection.event)
+        self._schedule(teacher_id, collection)
+        return queue
+
+    def unsubscribe(self, teacher_id: int, queue: asyncio.Queue):
+        """Remove a subscriber; the collection is dropped with its last one."""
+        collection = self._collections.get(teacher_id)
+        if collection is None:
+            return
+        collection.subscribers.discard(queue)
+        if not collection.subscribers:
+            del self._collections[teacher_id]
+            if collection.task is not None:
+                collection.task.cancel()
+
+    def notify(self, teacher_id: Optional[int] = None):
+        """Feedbacks of a teacher (all teachers if None) changed: schedule a render if watched."""
+        if teacher_id is None:
+            collections = list(self._collections.items())
+        elif teacher_id in self._collections:
+            collections = [(teacher_id, self._collections[teacher_id])]
+        else:
+            return
+        for watched_id, collection in collections:
+            self.counters["notifications"] += 1
+            collection.version += 1
+            self._schedule(watched_id, collection)
+
+    def _schedule(self, teacher_id: int, collection: _LiveCollection):
+        if collection.task is None or collection.task.done():
+            collection.task = asyncio.create_task(self._run(teacher_id, collection))
+
+    async def _run(self, teacher_id: int, collection: _LiveCollection):
+        while collection.rendered_version != collection.version and collection.subscribers:
+            wait = collection.last_render + self.interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            version = collection.version
+            try:
+                async with self._render_slots:
+                    frequencies = await asyncio.to_thread(self._update_counts, teacher_id, collection)
+                    changed = frequencies != collection.frequencies
+                    if changed:
+                        image = await render_pool.render(
+                            frequencies, output="png", quality=LIVE_WORDCLOUD_QUALITY
+                        ) if frequencies else None
+            except Exception as e:
+                self.counters["failed"] += 1
+                print(f"Live wordcloud error (non-fatal): {e}")
+                changed = False
+            else:
+                if changed:
+                    self.counters["renders"] += 1
+                    collection.frequencies = frequencies
+                    self._publish(collection, {
+                        "image": image,
+                        "terms": len(frequencies),
+                        "updated_at": datetime.now().isoformat()
+                    })
+                else:
+                    self.counters["unchanged"] += 1
+            collection.last_render = time.monotonic()
+            collection.rendered_version = version
+
+    @staticmethod
+    def _update_counts(teacher_id: int, collection: _LiveCollection) -> dict:
+        """Add the token bags of new feedbacks to the running totals; returns the merged frequencies."""
+        max_id = get_max_feedback_id(teacher_id)
+        generation = feedback_generation()
+        if generation != collection.generation or max_id < collection.max_id:
+            collection.counts = Counter()
+            collection.max_id = 0
+            collection.generation = generation
+        if max_id > collection.max_id:
+            collection.counts.update(count_feedback_tokens(teacher_id, collection.max_id, max_id))
+            collection.max_id = max_id
+        return TokenizerEngine.merge_forms(collection.counts)
+
+    @staticmethod
+    def _publish(collection: _LiveCollection, event: dict):
+        collection.event = event
+        for queue in collection.subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    async def stop(self):
+        """Cancel the pending renders (application shutdown)."""
+        tasks = [c.task for c in self._collections.values() if c.task is not None and not c.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def snapshot(self) -> dict:
+        """Watched collections, subscribers and render counters."""
+        return {
+            "collections": len(self._collections),
+            "subscribers": sum(len(c.subscribers) for c in self._collections.values()),
+            "interval_seconds": self.interval,
+            **self.counters
+        }
+
+
+live_wordclouds = LiveWordclouds()
@@ -1,8 +1,10 @@
 import os
 import io
+import re
 import base64
 from datetime import datetime
 from typing import Optional
+from xml.etree import ElementTree
 
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib.units import cm
@@ -12,50 +14,22 @@ from reportlab.platypus import (
     SimpleDocTemplate, Paragraph, Spacer, Image
 )
 from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from PIL import Image as PILImage
+from reportlab.graphics.shapes import Drawing, Group, Rect, String
+from PIL import Image as PILImage, ImageColor
 
 import arabic_reshaper
 from bidi.algorithm import get_display
+
+from app.services.fonts import get_font_path, get_reportlab_font
+
 # --- Font Handling ---
 
 def find_multilingual_font_path() -> Optional[str]:
     """Find the bundled Tajawal font or fallback to system fonts."""
-    # 1. Primary: Bundled font
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    bundled_font = os.path.join(base_dir, "static", "fonts", "Tajawal-Regular.ttf")
-    if os.path.exists(bundled_font):
-        return bundled_font
-
-    # 2. Secondary: Search common font directories
-    font_dirs = [
-        "/usr/share/fonts",
-        "/usr/local/share/fonts",
-        "/System/Library/Fonts",
-        "/Library/Fonts",
-        os.path.expanduser("~/Library/Fonts"),
-        "/app/data/fonts"
-    ]
-    target_fonts = ["tajawal", "cairo"]
-    for target in target_fonts:
-        for font_dir in font_dirs:
-            if not os.path.isdir(font_dir): continue
-            for root, _, files in os.walk(font_dir):
-                for f in files:
-                    if f.lower().endswith(('.ttf', '.otf')) and target in f.lower():
-                        return os.path.join(root, f)
-    return None
+    return get_font_path()
 
-# Register font if found
-_FONT_PATH = find_multilingual_font_path()
-_FONT_NAME = "Helvetica" # Default fallback
-if _FONT_PATH:
-    try:
-        pdfmetrics.registerFont(TTFont('Multilingual', _FONT_PATH))
-        _FONT_NAME = 'Multilingual'
-    except Exception as e:
-        print(f"Error registering font: {e}")
+# Registered once per process by the font registry
+_FONT_NAME = get_reportlab_font()
 
 def process_multilingual_text(text: str) -> str:
     """Shape Arabic text while preserving Latin text for ReportLab."""
@@ -84,6 +58,54 @@ def process_multilingual_text(text: str) -> str:
         
     return '\n'.join(processed_lines)
 
+_SVG_NS = "{http://www.w3.org/2000/svg}"
+_SVG_TRANSFORM = re.compile(r"translate\(([-\d.]+),\s*([-\d.]+)\)(\s*rotate\(-90\))?")
+
+
+def _svg_color(fill: str) -> colors.Color:
+    """ReportLab colour of an SVG fill attribute."""
+    red, green, blue = ImageColor.getrgb(fill)[:3]
+    return colors.Color(red / 255, green / 255, blue / 255)
+
+
+def wordcloud_svg_drawing(svg: bytes, max_width: float, max_height: float) -> Drawing:
+    """
+    Vector drawing of a wordcloud SVG (as produced by the wordcloud service),
+    scaled to fit max_width x max_height.
+
+    Each text element becomes a ReportLab string: the words stay sharp at any
+    zoom and the PDF only carries the font subset instead of a bitmap.
+    """
+    root = ElementTree.fromstring(svg)
+    width, height = float(root.get("width")), float(root.get("height"))
+    scale = min(max_width / width, max_height / height)
+
+    drawing = Drawing(width * scale, height * scale)
+    background = root.find(f"{_SVG_NS}rect")
+    if background is not None:
+        fill = _svg_color(background.get("fill", "white"))
+        drawing.add(Rect(0, 0, width * scale, height * scale, fillColor=fill, strokeColor=None))
+
+    for text in root.iter(f"{_SVG_NS}text"):
+        match = _SVG_TRANSFORM.match(text.get("transform", ""))
+        if not match or not text.text:
+            continue
+        # SVG positions are baselines from the top; PDF y grows upwards
+        group = Group(String(
+            0, 0, text.text,
+            fontName=_FONT_NAME,
+            fontSize=float(text.get("font-size")),
+            fillColor=_svg_color(text.get("fill", "black")),
+            textAnchor=text.get("text-anchor", "start")
+        ))
+        group.translate(float(match.group(1)) * scale, (height - float(match.group(2))) * scale)
+        if match.group(3):
+            group.rotate(90)
+        group.scale(scale, scale)
+        drawing.add(group)
+    return drawing
+
+
 # --- PDF Generation ---
 
 def create_analysis_pdf(
@@ -96,7 +118,8 @@ def create_analysis_pdf(
     Create a PDF slide with wordcloud on left and analysis on right.
     
     Args:
-        wordcloud_image_base64: Base64 encoded wordcloud image
+        wordcloud_image_base64: Base64 encoded wordcloud image (PNG, or SVG
+            drawn as vectors)
         analysis_text: AI analysis text
         context: Optional context provided by teacher
         title: Document title
@@ -197,25 +220,32 @@ def create_analysis_pdf(
         try:
             img_data = base64.b64decode(wordcloud_image_base64)
             img_buffer = io.BytesIO(img_data)
-            
-            # Get image dimensions
-            pil_img = PILImage.open(img_buffer)
-            img_width, img_height = pil_img.size
-            
-            # Calculate scaling to fit nicely centered
+
             # Let's make it a sensible size (not taking whole page)
             max_img_width = page_width - 4*cm
             max_img_height = (page_height - 10*cm) / 2 # Take about half height at most
-            
-            scale_w = max_img_width / img_width
-            scale_h = max_img_height / img_height
-            scale = min(scale_w, scale_h, 1.0) # Don't upscale
-            
-            final_width = img_width * scale
-            final_height = img_height * scale
-            
-            img_buffer.seek(0)
-            wordcloud_img = Image(img_buffer, width=final_width, height=final_height)
+            if img_data.lstrip().startswith(b"<"):
+                # SVG: vector drawing, free to scale
+                wordcloud_img = wordcloud_svg_drawing(img_data, max_img_width, max_img_height)
+            else:
+                # Get image dimensions
+                pil_img = PILImage.open(img_buffer)
+                img_width, img_height = pil_img.size
+                if pil_img.format not in ("PNG", "JPEG"):
+                    # Dashboard images may be WebP: embed PNG and JPEG only
+                    img_buffer = io.BytesIO()
+                    pil_img.save(img_buffer, format="PNG")
+
+                # Calculate scaling to fit nicely centered
+                scale_w = max_img_width / img_width
+                scale_h = max_img_height / img_height
+                scale = min(scale_w, scale_h, 1.0) # Don't upscale
+
+                final_width = img_width * scale
+                final_height = img_height * scale
+
+                img_buffer.seek(0)
+                wordcloud_img = Image(img_buffer, width=final_width, height=final_height)
             wordcloud_img.hAlign = 'CENTER'
         except Exception as e:
             print(f"Error processing wordcloud image: {e}")
@@ -0,0 +1,207 @@
+import os
+import base64
+import hashlib
+import json
+import threading
+from collections import Counter, OrderedDict
+from typing import Optional
+
+from app.services import wordcloud as wordcloud_service
+from app.services.fonts import get_font_path
+
+# Rendered wordclouds kept in memory (each is a few hundred KB of base64)
+WORDCLOUD_CACHE_SIZE = int(os.getenv("WORDCLOUD_CACHE_SIZE", "64"))
+# Directory of the on-disk cache, which survives restarts; empty disables it
+WORDCLOUD_CACHE_DIR = os.getenv("WORDCLOUD_CACHE_DIR", "wordcloud_cache")
+WORDCLOUD_CACHE_DISK_MAX = int(os.getenv("WORDCLOUD_CACHE_DISK_MAX", "2000"))
+# Bump when the rendering output changes for the same inputs
+RENDER_CACHE_VERSION = 1
+
+# Writes between two prunings of the disk cache
+_PRUNE_EVERY = 50
+
+
+def canonical_frequencies(frequencies: dict, limit: int) -> dict:
+    """
+    The limit most frequent terms, ordered by count then term.
+
+    The layout is deterministic (random_state=42) but depends on the order
+    of equal counts; a canonical order makes equal tables render identically.
+    """
+    items = sorted(Counter(frequencies).items(), key=lambda item: (-item[1], item[0]))
+    return dict(items[:limit])
+
+
+def render_key(frequencies: dict, options: dict) -> str:
+    """
+    Fingerprint of a render: frequency table, render options and renderer settings.
+
+    The output format, quality tier (with its settings) and raster image
+    format (ignored by SVG and layout output) are always resolved, so a
+    render left at the defaults does not share a key with another render
+    after a default changes.
+    """
+    output = options.get("output") or "png"
+    quality = options.get("quality") or wordcloud_service.WORDCLOUD_QUALITY
+    resolved = dict(options, output=output, quality=quality)
+    if output in ("svg", "layout"):
+        resolved.pop("image_format", None)
+    else:
+        resolved["image_format"] = options.get("image_format") or wordcloud_service.WORDCLOUD_IMAGE_FORMAT
+    payload = json.dumps(
+        {
+            "version": RENDER_CACHE_VERSION,
+            "renderer": wordcloud_service.WORDCLOUD_RENDERER,
+            "compress_level": wordcloud_service.WORDCLOUD_PNG_COMPRESS_LEVEL,
+            "image": [
+                wordcloud_service.WORDCLOUD_IMAGE_FORMAT,
+                wordcloud_service.WORDCLOUD_PNG_OPTIMIZE,
+                wordcloud_service.WORDCLOUD_PNG8_COLORS,
+                wordcloud_service.WORDCLOUD_WEBP_QUALITY,
+                wordcloud_service.WORDCLOUD_WEBP_METHOD
+            ],
+            "font": os.path.basename(get_font_path() or ""),
+            "tier": wordcloud_service.WORDCLOUD_QUALITY_TIERS.get(quality),
+            "options": resolved,
+            "frequencies": list(frequencies.items())
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cache_kind(options: dict) -> str:
+    """Kind (file extension) of the cached output of a render with these options."""
+    output = options.get("output")
+    if output == "layout":
+        return "json"
+    if output == "svg":
+        return "svg"
+    image_format = options.get("image_format") or wordcloud_service.WORDCLOUD_IMAGE_FORMAT
+    return "webp" if image_format == "webp" else "png"
+
+
+class RenderCache:
+    """
+    Rendered wordclouds by render_key: an in-memory LRU in front of files,
+    images (kinds "png", "webp" and "svg", base64 in memory) or layout JSON
+    (kind "json").
+
+    The disk tier survives restarts and is pruned to max_disk files, oldest
+    first; files are written atomically, so several app processes can share it.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = WORDCLOUD_CACHE_SIZE,
+        directory: Optional[str] = WORDCLOUD_CACHE_DIR,
+        max_disk: int = WORDCLOUD_CACHE_DISK_MAX
+    ):
+        self.max_entries = max(0, max_entries)
+        self.directory = directory or None
+        self.max_disk = max(1, max_disk)
+        self._entries: OrderedDict[tuple[str, str], str] = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.counters = Counter({"hits": 0, "disk_hits": 0, "misses": 0, "stores": 0})
+
+    def _path(self, key: str, kind: str = "png") -> str:
+        return os.path.join(self.directory, f"{key}.{kind}")
+
+    def get(self, key: str, kind: str = "png") -> Optional[str]:
+        """Cached base64 image (or layout JSON) for key, or None."""
+        with self._lock:
+            image = self._entries.get((key, kind))
+            if image is not None:
+                self._entries.move_to_end((key, kind))
+                self.counters["hits"] += 1
+                return image
+
+        if self.directory:
+            try:
+                with open(self._path(key, kind), "rb") as f:
+                    data = f.read()
+                image = data.decode("utf-8") if kind == "json" else base64.b64encode(data).decode("utf-8")
+                # Pruning removes the least recently used files first
+                os.utime(self._path(key, kind))
+            except OSError:
+                pass
+            else:
+                self._remember((key, kind), image)
+                with self._lock:
+                    self.counters["hits"] += 1
+                    self.counters["disk_hits"] += 1
+                return image
+
+        with self._lock:
+            self.counters["misses"] += 1
+        return None
+
+    def put(self, key: str, image: str, kind: str = "png"):
+        """Store a base64 image (or layout JSON) under key, in memory and on disk."""
+        if not image:
+            return
+        self._remember((key, kind), image)
+        with self._lock:
+            self.counters["stores"] += 1
+        if self.directory:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                # Write then rename, so readers never see a partial file
+                tmp_path = f"{self._path(key, kind)}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(image.encode("utf-8") if kind == "json" else base64.b64decode(image))
+                os.replace(tmp_path, self._path(key, kind))
+                self._writes += 1
+                if self._writes % _PRUNE_EVERY == 0:
+                    self.prune_disk()
+            except OSError as e:
+                print(f"Render cache write error (non-fatal): {e}")
+
+    def _remember(self, key: tuple[str, str], image: str):
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._entries[key] = image
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def prune_disk(self) -> int:
+        """Delete the least recently used files beyond max_disk; returns the number removed."""
+        if not self.directory or not os.path.isdir(self.directory):
+            return 0
+        files = [entry for entry in os.scandir(self.directory) if entry.name.endswith((".png", ".webp", ".svg", ".json"))]
+        if len(files) <= self.max_disk:
+            return 0
+        files.sort(key=lambda entry: entry.stat().st_mtime)
+        removed = 0
+        for entry in files[:len(files) - self.max_disk]:
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def clear(self):
+        """Drop the in-memory entries (disk files are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def snapshot(self) -> dict:
+        """Hit ratio and sizes of the cache."""
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "disk": bool(self.directory),
+                "hit_ratio": round(self.counters["hits"] / lookups, 3) if lookups else None,
+                **self.counters
+            }
+
+
+render_cache = RenderCache()
@@ -0,0 +1,156 @@
+import os
+import asyncio
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from app.services.render_cache import RenderCache, canonical_frequencies, render_key, render_cache, cache_kind
+
+
+def _default_processes() -> int:
+    # Leave one core to the event loop; a single-core host keeps the thread path
+    return max(0, min(4, (os.cpu_count() or 1) - 1))
+
+
+# Worker processes rendering wordclouds; 0 renders in a thread of the app process
+_processes_setting = os.getenv("WORDCLOUD_RENDER_PROCESSES", "auto").lower()
+WORDCLOUD_RENDER_PROCESSES = _default_processes() if _processes_setting == "auto" else int(_processes_setting)
+# Renders after which a worker is replaced, capping fragmentation and font cache growth
+WORDCLOUD_RENDER_MAX_TASKS = int(os.getenv("WORDCLOUD_RENDER_MAX_TASKS", "200"))
+# Terms sent to a worker per render, as a multiple of max_words (the layout only
+# uses the max_words most frequent ones, the margin covers reshaping merges)
+IPC_TERMS_FACTOR = 4
+
+
+def _init_worker():
+    """Load fonts, stopwords and the tokenizer once per worker, then warm the renderer."""
+    from app.services.wordcloud import create_wordcloud_from_frequencies
+    from app.services.tokenizer import get_tokenizer
+
+    get_tokenizer()
+    create_wordcloud_from_frequencies({"feedny": 1}, width=64, height=32)
+
+
+def _render_task(frequencies: dict, options: dict) -> tuple[Optional[str], dict]:
+    """Render in a worker; returns the image and the layout/encode timings."""
+    from app.services.wordcloud import create_wordcloud_from_frequencies
+
+    timings: dict = {}
+    image, _ = create_wordcloud_from_frequencies(frequencies, timings=timings, **options)
+    return image, timings
+
+
+class RenderPool:
+    """
+    Wordcloud rendering off the event loop.
+
+    With processes > 0, renders run in a pool of spawned worker processes
+    (wordcloud layout is GIL-bound, so threads serialise concurrent analyses);
+    workers are recycled after max_tasks renders. With processes == 0, or if
+    the pool breaks, renders run in a thread of the app process.
+
+    With a cache, renders of an already seen frequency table and options skip
+    the layout entirely.
+    """
+
+    def __init__(
+        self,
+        processes: int = WORDCLOUD_RENDER_PROCESSES,
+        max_tasks: int = WORDCLOUD_RENDER_MAX_TASKS,
+        cache: Optional[RenderCache] = None
+    ):
+        self.processes = max(0, processes)
+        self.max_tasks = max(1, max_tasks)
+        self.cache = cache
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.pending = 0
+        self.counters = Counter({"completed": 0, "failed": 0, "thread_fallbacks": 0, "pool_restarts": 0})
+
+    def start(self):
+        """Spawn the worker processes (no-op in thread mode or if already started)."""
+        if self.processes and self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                max_tasks_per_child=self.max_tasks
+            )
+            # Spawn all workers now rather than on the first renders
+            for _ in range(self.processes):
+                self._executor.submit(int)
+
+    def shutdown(self):
+        """Stop the worker processes; the next render starts a new pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def render(self, frequencies: dict, timings: Optional[dict] = None, **options) -> Optional[str]:
+        """
+        Render a wordcloud PNG (base64), an SVG with output="svg", or its
+        layout JSON with output="layout", from word frequencies, in the
+        quality tier given by quality (see WORDCLOUD_QUALITY_TIERS).
+
+        options are passed to create_wordcloud_from_frequencies; layout and
+        encode times (ms) are added to timings (not on cache hits).
+        """
+        if not frequencies:
+            return None
+        max_words = options.get("max_words", 100)
+        frequencies = canonical_frequencies(frequencies, max_words * IPC_TERMS_FACTOR)
+        key = None
+        kind = cache_kind(options)
+        if self.cache is not None:
+            key = render_key(frequencies, options)
+            cached = self.cache.get(key, kind)
+            if cached is not None:
+                return cached
+
+        self.pending += 1
+        try:
+            image, render_timings = await self._run(frequencies, options)
+        except Exception:
+            self.counters["failed"] += 1
+            raise
+        finally:
+            self.pending -= 1
+        self.counters["completed"] += 1
+        if key is not None and image:
+            self.cache.put(key, image, kind)
+        if timings is not None:
+            for phase, ms in render_timings.items():
+                timings[phase] = timings.get(phase, 0.0) + ms
+        return image
+
+    async def _run(self, frequencies: dict, options: dict) -> tuple[Optional[str], dict]:
+        self.start()
+        executor = self._executor
+        if executor is not None:
+            try:
+                return await asyncio.get_running_loop().run_in_executor(executor, _render_task, frequencies, options)
+            except BrokenProcessPool as e:
+                # A worker died (e.g. killed for memory): drop the pool so the next
+                # render starts a new one, and render this one here
+                self.counters["thread_fallbacks"] += 1
+                if self._executor is executor:
+                    print(f"Render pool broken, restarting: {e}")
+                    self.shutdown()
+                    self.counters["pool_restarts"] += 1
+        return await asyncio.to_thread(_render_task, frequencies, options)
+
+    def snapshot(self) -> dict:
+        """Queue depth and counters of the render service."""
+        return {
+            "mode": "processes" if self.processes else "thread",
+            "processes": self.processes,
+            "max_tasks_per_child": self.max_tasks,
+            "pending": self.pending,
+            # Renders waiting for a free worker
+            "queued": max(0, self.pending - self.processes) if self.processes else 0,
+            **self.counters
+        }
+
+
+render_pool = RenderPool(cache=render_cache)
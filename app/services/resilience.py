@@ -0,0 +1,124 @@
+import time
+import random
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class Deadline:
+    """A total time budget shared by every call made on behalf of one request."""
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """
+    Fail fast while an upstream is unhealthy.
+
+    closed -> open after failure_threshold consecutive failures; open ->
+    half_open once reset_timeout has elapsed, letting a single probe through;
+    the probe's outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and self._clock() - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"
+            self._probe_in_flight = False
+        if self.state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = self._clock()
+            self._probe_in_flight = False
+
+    def snapshot(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self.failures}
+
+
+class LatencyTracker:
+    """Sliding window of recent successful latencies, for hedging delays."""
+
+    def __init__(self, window: int = 200):
+        self._samples: deque = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+async def hedged(
+    call: Callable[[], Awaitable[T]],
+    delay: float,
+    is_good: Callable[[T], bool] = lambda result: True
+) -> T:
+    """
+    Run call(); if it has not finished after delay seconds, start a second
+    identical call and return whichever good result arrives first.
+
+    The losing call is cancelled. If neither result is good, the last one to
+    finish is returned (or its exception raised).
+    """
+    first = asyncio.ensure_future(call())
+    done, _ = await asyncio.wait({first}, timeout=delay)
+    if done:
+        return first.result()
+
+    second = asyncio.ensure_future(call())
+    pending = {first, second}
+    last: Optional[asyncio.Future] = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                last = task
+                if not task.exception() and is_good(task.result()):
+                    return task.result()
+        return last.result()
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,56 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+# Analysis phases, in pipeline order, as stored in analysis_telemetry (<phase>_ms)
+PHASES = ("db_fetch", "tokenize", "layout", "encode", "llm", "save", "total")
+
+# DeepSeek pricing in USD per million tokens (cache-miss input, cache-hit input, output)
+DEEPSEEK_PRICE_INPUT = float(os.getenv("DEEPSEEK_PRICE_INPUT", "0.28"))
+DEEPSEEK_PRICE_CACHED_INPUT = float(os.getenv("DEEPSEEK_PRICE_CACHED_INPUT", "0.028"))
+DEEPSEEK_PRICE_OUTPUT = float(os.getenv("DEEPSEEK_PRICE_OUTPUT", "0.42"))
+
+
+@contextmanager
+def timed_phase(timings: Optional[dict], phase: str):
+    """Add the wall time of the block, in ms, to timings[phase] (no-op if timings is None)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[phase] = timings.get(phase, 0.0) + (time.perf_counter() - start) * 1000
+
+
+def estimate_cost(usage: Optional[dict]) -> float:
+    """Estimated cost in USD of the token usage of one analysis."""
+    if not usage:
+        return 0.0
+    cached = usage.get("cached_tokens", 0)
+    uncached = max(0, usage.get("prompt_tokens", 0) - cached)
+    return (
+        uncached * DEEPSEEK_PRICE_INPUT
+        + cached * DEEPSEEK_PRICE_CACHED_INPUT
+        + usage.get("completion_tokens", 0) * DEEPSEEK_PRICE_OUTPUT
+    ) / 1_000_000
+
+
+def summarize_phases(rows: list[dict]) -> dict:
+    """p50/p95/max (ms) per phase over telemetry rows, ignoring phases that did not run."""
+    import numpy as np  # Admin-only path, kept off the startup imports
+
+    summary = {}
+    for phase in PHASES:
+        values = np.array([r[f"{phase}_ms"] for r in rows if r.get(f"{phase}_ms") is not None], dtype=float)
+        if values.size == 0:
+            summary[phase] = {"count": 0, "p50": None, "p95": None, "max": None}
+            continue
+        p50, p95 = np.percentile(values, [50, 95])
+        summary[phase] = {
+            "count": int(values.size),
+            "p50": round(float(p50), 1),
+            "p95": round(float(p95), 1),
+            "max": round(float(values.max()), 1)
+        }
+    return summary
@@ -0,0 +1,210 @@
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Iterable, Optional
+
+from app.services.lazy import LazyImports
+
+ARABIC_RANGE = f"{chr(0x0600)}-{chr(0x06FF)}{chr(0x0750)}-{chr(0x077F)}{chr(0x08A0)}-{chr(0x08FF)}"
+ARABIC_PATTERN = re.compile(f"[{ARABIC_RANGE}]+")
+WORD_PATTERN = re.compile(f"[\\w{ARABIC_RANGE}']+")
+
+# Specific configuration tailored for basic WordCloud use
+RESHAPER_CONFIG = {
+    'delete_harakat': True,
+    'delete_tatweel': True,
+    'support_ligatures': True,
+    'shift_harakat_position': False
+}
+# Distinct words whose display form is kept; a wordcloud shows at most a few hundred
+RESHAPE_CACHE_SIZE = 4096
+
+
+def _load_reshaper():
+    import arabic_reshaper
+    return arabic_reshaper.ArabicReshaper(configuration=RESHAPER_CONFIG)
+
+
+def _load_get_display():
+    from bidi.algorithm import get_display
+    return get_display
+
+
+def _load_stopwords():
+    from stopwordsiso import stopwords
+    return stopwords
+
+
+# Shaping and stopword packages are loaded on first use, off the app's import path
+_lazy = LazyImports(globals(), {
+    "_reshaper": _load_reshaper,
+    "get_display": _load_get_display,
+    "stopwords": _load_stopwords
+})
+__getattr__ = _lazy.module_getattr
+
+
+def detect_has_arabic(text: str) -> bool:
+    """Check if text contains Arabic characters."""
+    return ARABIC_PATTERN.search(text) is not None
+
+
+@lru_cache(maxsize=RESHAPE_CACHE_SIZE)
+def process_arabic_word(word: str) -> str:
+    """Correctly shape and order Arabic words for display in PIL (cached per word)."""
+    if detect_has_arabic(word):
+        return _lazy.get("get_display")(_lazy.get("_reshaper").reshape(word))
+    return word
+
+
+def get_multilingual_stopwords() -> set[str]:
+    """Get combined stopwords for French, English, and Arabic."""
+    combined_stopwords = set()
+    stopwords = _lazy.get("stopwords")
+
+    # Add French stopwords
+    try:
+        combined_stopwords.update(stopwords('fr'))
+    except Exception:
+        combined_stopwords.update([
+            'le', 'la', 'les', 'un', 'une', 'des', 'du', 'de', 'au', 'aux',
+            'il', 'elle', 'on', 'nous', 'vous', 'ils', 'elles', 'je', 'tu',
+            'et', 'ou', 'or', 'mais', 'où', 'dont', 'que', 'qui',
+            'en', 'pour', 'avec', 'sur', 'dans', 'par', 'chez', 'sans',
+            'être', 'avoir', 'ce', 'cette', 'ces', 'cela', 'ça',
+            'très', 'plus', 'moins', 'bien', 'mal', 'non', 'oui', 'si',
+            'tout', 'tous', 'toute', 'toutes'
+        ])
+
+    # Add English stopwords
+    try:
+        combined_stopwords.update(stopwords('en'))
+    except Exception:
+        combined_stopwords.update([
+            'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to',
+            'for', 'of', 'with', 'by', 'from', 'is', 'are', 'was', 'were',
+            'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did',
+            'will', 'would', 'could', 'should', 'may', 'might', 'can',
+            'this', 'that', 'these', 'those', 'it', 'its', 'i', 'you', 'he',
+            'she', 'we', 'they', 'my', 'your', 'his', 'her', 'our', 'their',
+            'very', 'more', 'most', 'some', 'any', 'no', 'not', 'only', 'just'
+        ])
+
+    # Add Arabic stopwords
+    try:
+        combined_stopwords.update(stopwords('ar'))
+    except Exception:
+        combined_stopwords.update([
+            'من', 'إلى', 'على', 'في', 'عن', 'مع', 'هذا', 'هذه', 'ذلك', 'تلك',
+            'التي', 'الذي', 'الذين', 'هو', 'هي', 'هم', 'أنا', 'نحن', 'أنت', 'أنتم',
+            'كان', 'كانت', 'يكون', 'تكون', 'أن', 'إن', 'لا', 'ما', 'لم', 'لن',
+            'و', 'أو', 'ثم', 'بل', 'لكن', 'حتى', 'إذا', 'كل', 'بعض', 'غير',
+            'قد', 'عند', 'بين', 'فوق', 'تحت', 'أمام', 'وراء', 'قبل', 'بعد'
+        ])
+
+    return combined_stopwords
+
+
+class TokenizerEngine:
+    """
+    Word counting for the wordcloud, without the wordcloud package.
+
+    Produces the same counts as WordCloud(collocations=False).process_text
+    with the multilingual word pattern: "'s" suffixes stripped, numbers and
+    stopwords dropped, each word reported in its most common case, and
+    plurals ending in "s" merged into their singular when both occur.
+    """
+
+    def __init__(self, stopword_set: Optional[Iterable[str]] = None):
+        if stopword_set is None:
+            stopword_set = get_multilingual_stopwords()
+        self.stopwords = frozenset(word.lower() for word in stopword_set)
+
+    def tokenize(self, text: str) -> list[str]:
+        """Words of text, in order, without stopwords and numbers."""
+        words = []
+        for word in WORD_PATTERN.findall(text):
+            lower = word.lower()
+            if lower.endswith("'s"):
+                word, lower = word[:-2], lower[:-2]
+            if word and not word.isdigit() and lower not in self.stopwords:
+                words.append(word)
+        return words
+
+    def token_counts(self, text: str) -> Counter:
+        """
+        Counts of each spelling in text, without stopwords and numbers.
+
+        Unlike count_words these are not merged across case and plurals, so
+        they can be summed across texts (e.g. per-feedback bags) and merged
+        once with merge_forms.
+        """
+        counts: Counter = Counter()
+        if not text:
+            return counts
+        # Counting distinct spellings first keeps the per-token work in C
+        for word, count in Counter(WORD_PATTERN.findall(text)).items():
+            lower = word.lower()
+            if lower.endswith("'s"):
+                word, lower = word[:-2], lower[:-2]
+            if word and not word.isdigit() and lower not in self.stopwords:
+                counts[word] += count
+        return counts
+
+    @staticmethod
+    def merge_forms(token_counts: dict[str, int]) -> dict[str, int]:
+        """Merge spelling counts across case and simple plurals."""
+        cases: dict[str, dict[str, int]] = {}
+        for word, count in token_counts.items():
+            case_counts = cases.setdefault(word.lower(), {})
+            case_counts[word] = case_counts.get(word, 0) + count
+
+        # Merge plurals into the singular count (simple cases only)
+        for lower in list(cases):
+            if lower.endswith('s') and not lower.endswith('ss') and lower[:-1] in cases:
+                singular_cases = cases[lower[:-1]]
+                for word, count in cases.pop(lower).items():
+                    singular_cases[word[:-1]] = singular_cases.get(word[:-1], 0) + count
+
+        # Each word is represented by its most common case
+        return {
+            max(case_counts.items(), key=lambda item: item[1])[0]: sum(case_counts.values())
+            for case_counts in cases.values()
+        }
+
+    def count_words(self, text: str) -> dict[str, int]:
+        """Word frequencies of text, merged across case and simple plurals."""
+        return self.merge_forms(self.token_counts(text))
+
+    def ngram_counts(self, texts: Iterable[str], n: int = 2) -> Counter:
+        """
+        Counts of the lower-cased n-grams of consecutive words in each text.
+
+        As for wordcloud collocations, n-grams are taken before stopwords are
+        removed, and those containing a stopword or a number are dropped.
+        """
+        counts: Counter = Counter()
+        for text in texts:
+            words = []
+            for word in WORD_PATTERN.findall(text.lower()):
+                if word.endswith("'s"):
+                    word = word[:-2]
+                # Stopwords and numbers break n-grams
+                words.append(word if word and not word.isdigit() and word not in self.stopwords else None)
+            counts.update(
+                " ".join(gram)
+                for gram in zip(*(words[i:] for i in range(n)))
+                if None not in gram
+            )
+        return counts
+
+
+def top_words(counts: dict[str, int], n: int) -> list[tuple[str, int]]:
+    """The n most frequent terms, ties broken alphabetically."""
+    return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:n]
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer() -> TokenizerEngine:
+    """Process-wide tokenizer, built on first use."""
+    return TokenizerEngine()
@@ -0,0 +1,124 @@
+import os
+import time
+import asyncio
+import inspect
+from typing import Awaitable, Callable, Optional, Union
+
+
+# Prime the analysis pipeline in the background when the app starts
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+# Time allowed to open the DeepSeek connection (s)
+WARMUP_CONNECT_TIMEOUT = float(os.getenv("WARMUP_CONNECT_TIMEOUT", "5"))
+
+WarmupStep = Callable[[], Union[None, Awaitable[None]]]
+
+
+def _warm_fonts():
+    from app.services.fonts import get_font_path, get_pil_font
+
+    if get_font_path():
+        get_pil_font(20)
+
+
+def _warm_tokenizer():
+    from app.services.tokenizer import get_tokenizer
+
+    get_tokenizer()
+
+
+def _warm_wordcloud():
+    """Render a tiny wordcloud in this process (thread renders and PDF exports run here)."""
+    from app.services.wordcloud import create_wordcloud_from_frequencies
+
+    create_wordcloud_from_frequencies({"feedny": 1}, width=64, height=32)
+
+
+def _warm_dedup():
+    import numpy  # noqa: F401
+    import app.services.dedup  # noqa: F401
+
+
+async def _warm_deepseek():
+    from app.services.deepseek import warm_client
+
+    await warm_client(WARMUP_CONNECT_TIMEOUT)
+
+
+DEFAULT_STEPS: dict[str, WarmupStep] = {
+    "fonts": _warm_fonts,
+    "tokenizer": _warm_tokenizer,
+    "wordcloud": _warm_wordcloud,
+    "dedup": _warm_dedup,
+    "deepseek": _warm_deepseek
+}
+
+
+class Warmup:
+    """
+    Background warm-up of the analysis pipeline after startup.
+
+    Fonts, stopwords, the wordcloud renderer and the DeepSeek connection are
+    otherwise initialised lazily inside the first analysis. Synchronous steps
+    run in a thread so the event loop keeps serving /health. A failed step
+    does not block readiness: the lazy path retries it on first use.
+    """
+
+    def __init__(self, steps: Optional[dict[str, WarmupStep]] = None):
+        self.steps = DEFAULT_STEPS if steps is None else steps
+        self.state = "pending"
+        self.results: dict[str, dict] = {}
+        self.duration_ms: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state in ("done", "skipped")
+
+    def start(self, enabled: bool = WARMUP_ON_STARTUP):
+        """Schedule the warm-up on the running loop (no-op if already started)."""
+        if self._task is not None or self.state != "pending":
+            return
+        if not enabled:
+            self.state = "skipped"
+            return
+        self._task = asyncio.create_task(self.run())
+
+    async def run(self):
+        self.state = "running"
+        started = time.perf_counter()
+        for name, step in self.steps.items():
+            step_started = time.perf_counter()
+            try:
+                if inspect.iscoroutinefunction(step):
+                    await step()
+                else:
+                    await asyncio.to_thread(step)
+            except Exception as e:
+                self.results[name] = {"status": "failed", "error": str(e) or type(e).__name__}
+                print(f"Warm-up step {name} failed (non-fatal): {e}")
+            else:
+                self.results[name] = {"status": "ok"}
+            self.results[name]["ms"] = round((time.perf_counter() - step_started) * 1000, 1)
+        self.duration_ms = round((time.perf_counter() - started) * 1000, 1)
+        self.state = "done"
+        print(f"Warm-up done in {self.duration_ms:.0f} ms")
+
+    async def stop(self):
+        """Cancel a warm-up still in progress (application shutdown)."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def snapshot(self) -> dict:
+        """Warm-up state, with the outcome and duration of each step."""
+        return {
+            "state": self.state,
+            "duration_ms": self.duration_ms,
+            "steps": {name: dict(result) for name, result in self.results.items()}
+        }
+
+
+warmup = Warmup()
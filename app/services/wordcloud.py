@@ -1,87 +1,106 @@
+from __future__ import annotations
+
 import os
 import io
+import json
 import base64
-import re
-from typing import Optional
-from stopwordsiso import stopwords
-from wordcloud import WordCloud
-import matplotlib
-import matplotlib.pyplot as plt
-import urllib.request
-import arabic_reshaper
-from bidi.algorithm import get_display
-
-
-# Set backend to Agg to avoid display issues
-matplotlib.use('Agg')
-
-
-def detect_has_arabic(text: str) -> bool:
-    """Check if text contains Arabic characters."""
-    arabic_pattern = re.compile(r'[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF]+')
-    return bool(arabic_pattern.search(text))
-
-
-def process_arabic_word(word: str) -> str:
-    """Correctly shape and order Arabic words for display in PIL."""
-    if detect_has_arabic(word):
-        # Specific configuration tailored for basic WordCloud use
-        reshaper_config = {
-            'delete_harakat': True,
-            'delete_tatweel': True,
-            'support_ligatures': True,
-            'shift_harakat_position': False
-        }
-        reshaped = arabic_reshaper.ArabicReshaper(configuration=reshaper_config).reshape(word)
-        return get_display(reshaped)
-    return word
-
-
-def get_multilingual_stopwords() -> set[str]:
-    """Get combined stopwords for French, English, and Arabic."""
-    combined_stopwords = set()
-    
-    # Add French stopwords
-    try:
-        combined_stopwords.update(stopwords('fr'))
-    except Exception:
-        combined_stopwords.update([
-            'le', 'la', 'les', 'un', 'une', 'des', 'du', 'de', 'au', 'aux',
-            'il', 'elle', 'on', 'nous', 'vous', 'ils', 'elles', 'je', 'tu',
-            'et', 'ou', 'or', 'mais', 'où', 'dont', 'que', 'qui',
-            'en', 'pour', 'avec', 'sur', 'dans', 'par', 'chez', 'sans',
-            'être', 'avoir', 'ce', 'cette', 'ces', 'cela', 'ça',
-            'très', 'plus', 'moins', 'bien', 'mal', 'non', 'oui', 'si',
-            'tout', 'tous', 'toute', 'toutes'
-        ])
-    
-    # Add English stopwords
+import threading
+from functools import lru_cache
+from xml.sax import saxutils
+from typing import TYPE_CHECKING, Optional
+
+from app.services.fonts import discover_font, get_font_path, get_pil_font
+from app.services.lazy import LazyImports
+from app.services.telemetry import timed_phase
+# Re-exported for callers that used the wordcloud helpers directly
+from app.services.tokenizer import (
+    detect_has_arabic,
+    process_arabic_word,
+    get_multilingual_stopwords,
+    get_tokenizer
+)
+
+if TYPE_CHECKING:
+    from PIL import Image
+    from wordcloud import WordCloud
+
+
+def _load_wordcloud():
+    from wordcloud import WordCloud
+    return WordCloud
+
+
+def _load_pyplot():
     try:
-        combined_stopwords.update(stopwords('en'))
-    except Exception:
-        combined_stopwords.update([
-            'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to',
-            'for', 'of', 'with', 'by', 'from', 'is', 'are', 'was', 'were',
-            'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did',
-            'will', 'would', 'could', 'should', 'may', 'might', 'can',
-            'this', 'that', 'these', 'those', 'it', 'its', 'i', 'you', 'he',
-            'she', 'we', 'they', 'my', 'your', 'his', 'her', 'our', 'their',
-            'very', 'more', 'most', 'some', 'any', 'no', 'not', 'only', 'just'
-        ])
-    
-    # Add Arabic stopwords
+        import matplotlib
+        # Set backend to Agg to avoid display issues
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:  # Only needed by the matplotlib renderer
+        return None
+    return plt
+
+
+def _load_font_subset():
     try:
-        combined_stopwords.update(stopwords('ar'))
-    except Exception:
-        combined_stopwords.update([
-            'من', 'إلى', 'على', 'في', 'عن', 'مع', 'هذا', 'هذه', 'ذلك', 'تلك',
-            'التي', 'الذي', 'الذين', 'هو', 'هي', 'هم', 'أنا', 'نحن', 'أنت', 'أنتم',
-            'كان', 'كانت', 'يكون', 'تكون', 'أن', 'إن', 'لا', 'ما', 'لم', 'لن',
-            'و', 'أو', 'ثم', 'بل', 'لكن', 'حتى', 'إذا', 'كل', 'بعض', 'غير',
-            'قد', 'عند', 'بين', 'فوق', 'تحت', 'أمام', 'وراء', 'قبل', 'بعد'
-        ])
-    
-    return combined_stopwords
+        from fontTools import subset as font_subset
+    except ImportError:  # Without it, SVG wordclouds reference the font by name
+        return None
+    return font_subset
+
+
+# wordcloud (with numpy and matplotlib), matplotlib and fontTools take most of
+# the app's import time: they are loaded on first render
+_lazy = LazyImports(globals(), {
+    "WordCloud": _load_wordcloud,
+    "plt": _load_pyplot,
+    "font_subset": _load_font_subset,
+    "_FONT_PATH": get_font_path
+})
+__getattr__ = _lazy.module_getattr
+
+# "pil" encodes the wordcloud bitmap directly; "matplotlib" is the former
+# figure-based path, kept as a fallback
+WORDCLOUD_RENDERER = os.getenv("WORDCLOUD_RENDERER", "pil").lower()
+# zlib level of the PNG (0-9): lower is faster, higher is smaller
+WORDCLOUD_PNG_COMPRESS_LEVEL = int(os.getenv("WORDCLOUD_PNG_COMPRESS_LEVEL", "6"))
+# Encoding of raster wordclouds: "png" (full colour), "png8" (palette of
+# WORDCLOUD_PNG8_COLORS, near lossless as clouds have few colours) or "webp";
+# dashboard images and PNGs rendered for PDFs are configured separately
+# (see benchmark_render.py for sizes and encode times)
+WORDCLOUD_IMAGE_FORMATS = ("png", "png8", "webp")
+WORDCLOUD_IMAGE_FORMAT = os.getenv("WORDCLOUD_IMAGE_FORMAT", "png8").lower()
+WORDCLOUD_PDF_IMAGE_FORMAT = os.getenv("WORDCLOUD_PDF_IMAGE_FORMAT", "png").lower()
+# Exhaustive zlib search: a few percent smaller PNGs, several times slower
+WORDCLOUD_PNG_OPTIMIZE = os.getenv("WORDCLOUD_PNG_OPTIMIZE", "false").lower() in ("1", "true", "yes")
+WORDCLOUD_PNG8_COLORS = int(os.getenv("WORDCLOUD_PNG8_COLORS", "64"))
+# WebP quality 0-100 (100 is lossless) and effort 0-6 (higher is smaller and slower)
+WORDCLOUD_WEBP_QUALITY = int(os.getenv("WORDCLOUD_WEBP_QUALITY", "75"))
+WORDCLOUD_WEBP_METHOD = int(os.getenv("WORDCLOUD_WEBP_METHOD", "4"))
+WORDCLOUD_TITLE = "Nuage de mots"
+# "png" ships a rendered image; "svg" a vector image with the font subset
+# embedded; "layout" ships the computed layout as JSON, drawn by the browser
+# (a PNG is rendered from it only for PDF export)
+WORDCLOUD_OUTPUTS = ("png", "svg", "layout")
+WORDCLOUD_OUTPUT = os.getenv("WORDCLOUD_OUTPUT", "png").lower()
+LAYOUT_VERSION = 1
+# Smallest word drawn, in pixels of the rendered image
+WORDCLOUD_MIN_FONT_SIZE = 10
+# Layout cost grows with canvas area and with the font sizes tried per word.
+# A tier lays out on a canvas downscaled by layout_scale, rasterised back at
+# scale times the requested size; font_step > 1 caps the placement attempts
+# per word and max_words caps the words placed (see benchmark_quality.py).
+WORDCLOUD_QUALITY_TIERS = {
+    # Dashboards: about 4x faster layout, fewer and coarser-sized words
+    "preview": {"layout_scale": 2, "scale": 1, "max_words": 60, "font_step": 2, "compress_level": 1},
+    "standard": {"layout_scale": 1, "scale": 1, "max_words": None, "font_step": 1, "compress_level": None},
+    # PDFs: full layout, rasterised at twice the resolution
+    "print": {"layout_scale": 1, "scale": 2, "max_words": None, "font_step": 1, "compress_level": None}
+}
+WORDCLOUD_QUALITY = os.getenv("WORDCLOUD_QUALITY", "standard").lower()
+
+# pyplot keeps global figure state, which is not safe across threads
+_pyplot_lock = threading.Lock()
 
 
 def get_french_stopwords() -> set[str]:
@@ -90,118 +109,339 @@ def get_french_stopwords() -> set[str]:
 
 
 def find_multilingual_font() -> Optional[str]:
-    """Find the bundled Tajawal font or fallback to system fonts."""
-    # 1. Primary: Bundled font
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    bundled_font = os.path.join(base_dir, "static", "fonts", "Tajawal-Regular.ttf")
-    if os.path.exists(bundled_font):
-        return bundled_font
-
-    # 2. Secondary: Search common font directories native to system
-    font_dirs = [
-        "/usr/share/fonts",
-        "/usr/local/share/fonts",
-        "/System/Library/Fonts",
-        "/Library/Fonts",
-        os.path.expanduser("~/Library/Fonts"),
-        os.path.expanduser("~/.local/share/fonts")
+    """Find the bundled Tajawal font or fallback to system fonts (uncached scan)."""
+    return discover_font()
+
+
+def extract_word_counts(text: str) -> dict[str, int]:
+    """
+    Count words in text, stopwords removed, with the shared tokenizer engine.
+
+    Spellings are merged across case and plurals, so these counts are not
+    additive across texts: sum extract_token_counts instead, then merge once.
+    """
+    if not text or not text.strip():
+        return {}
+    return get_tokenizer().count_words(text)
+
+
+def extract_token_counts(text: str) -> dict[str, int]:
+    """
+    Per-spelling counts of text, additive across texts: extract_word_counts of
+    several texts is merge_forms of the sum of their token counts.
+    """
+    return get_tokenizer().token_counts(text)
+
+
+@lru_cache(maxsize=8)
+def _title_font(size: int):
+    """Bundled font for the title, or PIL's default font if it is missing."""
+    try:
+        return get_pil_font(size)
+    except OSError:
+        from PIL import ImageFont
+        return ImageFont.load_default()
+
+
+def _encode_image_pil(
+    wordcloud: WordCloud,
+    compress_level: Optional[int] = None,
+    image_format: Optional[str] = None
+) -> bytes:
+    """Image of the wordcloud bitmap under a centred title, encoded with PIL only."""
+    return _compose_image(wordcloud.to_image(), compress_level, image_format)
+
+
+def _encode_raster(image: Image.Image, compress_level: Optional[int] = None, image_format: Optional[str] = None) -> bytes:
+    """Encode an image in one of WORDCLOUD_IMAGE_FORMATS (WORDCLOUD_IMAGE_FORMAT if None)."""
+    from PIL import Image
+
+    image_format = image_format or WORDCLOUD_IMAGE_FORMAT
+    buffer = io.BytesIO()
+    if image_format == "webp":
+        if WORDCLOUD_WEBP_QUALITY >= 100:
+            image.save(buffer, format="WEBP", lossless=True, method=WORDCLOUD_WEBP_METHOD)
+        else:
+            image.save(buffer, format="WEBP", quality=WORDCLOUD_WEBP_QUALITY, method=WORDCLOUD_WEBP_METHOD)
+        return buffer.getvalue()
+
+    if image_format == "png8":
+        image = image.quantize(colors=WORDCLOUD_PNG8_COLORS, method=Image.Quantize.FASTOCTREE)
+    elif image_format != "png":
+        raise ValueError(f"Unknown wordcloud image format: {image_format}")
+    image.save(
+        buffer,
+        format="PNG",
+        compress_level=WORDCLOUD_PNG_COMPRESS_LEVEL if compress_level is None else compress_level,
+        optimize=WORDCLOUD_PNG_OPTIMIZE
+    )
+    return buffer.getvalue()
+
+
+def _compose_image(
+    cloud: Image.Image,
+    compress_level: Optional[int] = None,
+    image_format: Optional[str] = None
+) -> bytes:
+    """Paste a wordcloud bitmap under a centred title and encode it (see _encode_raster)."""
+    from PIL import Image, ImageDraw
+
+    font = _title_font(max(12, cloud.height // 20))
+    left, top, right, bottom = font.getbbox(WORDCLOUD_TITLE)
+    margin = font.size // 2
+    title_height = bottom + 2 * margin
+
+    canvas = Image.new("RGB", (cloud.width + 2 * margin, cloud.height + title_height + margin), "white")
+    ImageDraw.Draw(canvas).text(
+        ((canvas.width - (right - left)) // 2, margin), WORDCLOUD_TITLE, font=font, fill="black"
+    )
+    canvas.paste(cloud, (margin, title_height))
+    return _encode_raster(canvas, compress_level, image_format)
+
+
+def quality_tier(quality: Optional[str]) -> dict:
+    """Settings of a quality tier (WORDCLOUD_QUALITY if None); raises ValueError if unknown."""
+    quality = quality or WORDCLOUD_QUALITY
+    if quality not in WORDCLOUD_QUALITY_TIERS:
+        raise ValueError(f"Unknown wordcloud quality: {quality}")
+    return WORDCLOUD_QUALITY_TIERS[quality]
+
+
+def _placed_words(wordcloud: WordCloud):
+    """
+    (word, font_size, x, y, orientation, colour) of each laid out word, in
+    pixels of the rendered image: like WordCloud.to_image, the layout is
+    scaled by wordcloud.scale.
+    """
+    scale = wordcloud.scale
+    for (word, _), font_size, (y, x), orientation, color in wordcloud.layout_:
+        yield word, int(font_size * scale), int(x * scale), int(y * scale), orientation, color
+
+
+def wordcloud_layout(wordcloud: WordCloud, words: Optional[dict[str, str]] = None) -> dict:
+    """
+    Compact, JSON-serialisable layout of a generated wordcloud.
+
+    Each word is [text, font_size, x, y, rotated, colour]: (x, y) is the
+    top-left corner of its box, rotated words read bottom to top. words maps
+    the display forms used for the layout back to the original words, which
+    the browser shapes itself.
+    """
+    from PIL import ImageColor
+
+    words = words or {}
+    return {
+        "v": LAYOUT_VERSION,
+        "width": int(wordcloud.width * wordcloud.scale),
+        "height": int(wordcloud.height * wordcloud.scale),
+        "background": wordcloud.background_color,
+        "title": WORDCLOUD_TITLE,
+        "words": [
+            [
+                words.get(word, word),
+                font_size,
+                x,
+                y,
+                1 if orientation is not None else 0,
+                "#%02x%02x%02x" % ImageColor.getrgb(color)
+            ]
+            for word, font_size, x, y, orientation, color in _placed_words(wordcloud)
+        ]
+    }
+
+
+def render_layout_png(
+    layout: dict,
+    compress_level: Optional[int] = None,
+    scale: float = 1,
+    image_format: Optional[str] = None
+) -> str:
+    """
+    Base64 image (WORDCLOUD_IMAGE_FORMAT unless image_format is given) of a
+    stored layout, drawn like WordCloud.to_image (no layout computation), for
+    PDF export of client-side rendered wordclouds; scale multiplies the
+    resolution (see the "print" quality tier).
+    """
+    from PIL import Image, ImageDraw, ImageFont
+
+    cloud = Image.new(
+        "RGB", (int(layout["width"] * scale), int(layout["height"] * scale)), layout.get("background", "white")
+    )
+    draw = ImageDraw.Draw(cloud)
+    for word, font_size, x, y, rotated, color in layout["words"]:
+        font = ImageFont.TransposedFont(
+            get_pil_font(int(font_size * scale)),
+            orientation=Image.ROTATE_90 if rotated else None
+        )
+        draw.text((int(x * scale), int(y * scale)), process_arabic_word(word), fill=color, font=font)
+    return base64.b64encode(_compose_image(cloud, compress_level, image_format)).decode('utf-8')
+
+
+def _svg_font_face(font_path: str, characters: set[str]) -> str:
+    """@font-face rule embedding the subset of a font covering characters (WOFF)."""
+    from fontTools.ttLib import TTFont
+
+    font_subset = _lazy.get("font_subset")
+    font = TTFont(font_path)
+    options = font_subset.Options()
+    options.flavor = "woff"
+    subsetter = font_subset.Subsetter(options)
+    subsetter.populate(text="".join(characters))
+    subsetter.subset(font)
+    font.flavor = "woff"
+    buffer = io.BytesIO()
+    font.save(buffer)
+    data = base64.b64encode(buffer.getvalue()).decode("ascii")
+    return f'@font-face{{font-family:wordcloud;src:url("data:font/woff;base64,{data}")format("woff");}}'
+
+
+def _encode_svg(wordcloud: WordCloud) -> bytes:
+    """
+    SVG of the wordcloud under a centred title, laid out like _compose_image,
+    with the font subset embedded so it renders the same everywhere.
+
+    Baselines are computed as PIL draws the layout (WordCloud.to_svg offsets
+    some words from their box), and words are in display form (Arabic already
+    shaped and in visual order), so bidi reordering is disabled.
+    """
+    from PIL import ImageColor
+
+    cloud_width, cloud_height = int(wordcloud.width * wordcloud.scale), int(wordcloud.height * wordcloud.scale)
+    title_font = _title_font(max(12, cloud_height // 20))
+    left, top, right, bottom = title_font.getbbox(WORDCLOUD_TITLE)
+    margin = title_font.size // 2
+    title_height = bottom + 2 * margin
+    width, height = cloud_width + 2 * margin, cloud_height + title_height + margin
+
+    texts = [
+        f'<text transform="translate({width / 2:g},{margin + title_font.getmetrics()[0]})" '
+        f'font-size="{title_font.size}" fill="#000000" text-anchor="middle">'
+        f'{saxutils.escape(WORDCLOUD_TITLE)}</text>'
     ]
-    
-    target_fonts = ["tajawal", "cairo", "notosansarabic"]
-    for target in target_fonts:
-        for font_dir in font_dirs:
-            if not os.path.isdir(font_dir):
-                continue
-            for root, dirs, files in os.walk(font_dir):
-                for f in files:
-                    if f.lower().endswith(('.ttf', '.otf')) and target in f.lower():
-                        return os.path.join(root, f)
-    
-    return None
-
-
-# Cache the font path at module load
-_FONT_PATH = find_multilingual_font()
-if _FONT_PATH:
-    # Get just the filename for cleaner logging
-    font_name = os.path.basename(_FONT_PATH)
-    print(f"✅ Multilingual font loaded: {font_name} from {os.path.dirname(_FONT_PATH)}")
-else:
-    print("❌ CRITICAL: No hybrid font found! Arabic/Latin MIX will fail.")
+    for word, font_size, x, y, orientation, color in _placed_words(wordcloud):
+        font = get_pil_font(font_size, wordcloud.font_path)
+        ascent = font.getmetrics()[0]
+        # WordCloud pastes the glyph mask (the text's bounding box) at the position
+        word_left, word_top, word_right, _ = font.getbbox(word)
+        x, y = x + margin, y + title_height
+        if orientation is not None:
+            # Rotated words read bottom to top
+            transform = f"translate({x + ascent - word_top},{y + word_right}) rotate(-90)"
+        else:
+            transform = f"translate({x - word_left},{y + ascent - word_top})"
+        texts.append(
+            f'<text transform="{transform}" font-size="{font_size}" '
+            f'fill="{"#%02x%02x%02x" % ImageColor.getrgb(color)}">{saxutils.escape(word)}</text>'
+        )
 
+    font_family = "sans-serif"
+    font_face = ""
+    if _lazy.get("font_subset") is not None and wordcloud.font_path:
+        font_family = "wordcloud"
+        characters = set(WORDCLOUD_TITLE) | {char for (word, _), *_ in wordcloud.layout_ for char in word}
+        font_face = _svg_font_face(wordcloud.font_path, characters)
+    svg = (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}">'
+        f'<style>{font_face}text{{font-family:{font_family};direction:ltr;unicode-bidi:bidi-override;white-space:pre}}</style>'
+        f'<rect width="100%" height="100%" fill="#ffffff"/>'
+        + "\n".join(texts)
+        + "</svg>"
+    )
+    return svg.encode("utf-8")
 
-def create_wordcloud(
-    text: str,
+
+def _encode_png_matplotlib(wordcloud: WordCloud) -> bytes:
+    """PNG of the wordcloud drawn in a matplotlib figure (fallback renderer)."""
+    plt = _lazy.get("plt")
+    with _pyplot_lock:
+        fig, ax = plt.subplots(figsize=(10, 5), dpi=100)
+        try:
+            ax.imshow(wordcloud, interpolation='bilinear')
+            ax.axis('off')
+            ax.set_title(WORDCLOUD_TITLE, fontsize=14, pad=20, color='black')
+
+            # Save to buffer
+            buffer = io.BytesIO()
+            plt.savefig(buffer, format='png', bbox_inches='tight', facecolor='white', dpi=100)
+        finally:
+            plt.close(fig)
+    return buffer.getvalue()
+
+
+def create_wordcloud_from_frequencies(
+    frequencies: dict[str, float],
     width: int = 800,
     height: int = 400,
     max_words: int = 100,
     prefer_horizontal: float = 0.9,
-    colormap: str = 'tab20'
+    colormap: str = 'tab20',
+    timings: Optional[dict] = None,
+    output: str = "png",
+    quality: Optional[str] = None,
+    image_format: Optional[str] = None
 ) -> tuple[Optional[str], dict]:
     """
-    Create a wordcloud from text with multi-language support (French, English, Arabic).
+    Render a wordcloud from precomputed word frequencies.
+
+    If timings is given, the layout and image encoding times (ms) are added
+    to it. output="svg" encodes a vector image instead of a PNG; with
+    output="layout", no image is encoded: the layout is returned as JSON (see
+    wordcloud_layout) in place of the image. quality is a key of
+    WORDCLOUD_QUALITY_TIERS (defaults to WORDCLOUD_QUALITY); width and height
+    are the size of the rendered wordcloud whatever the tier. Raster images
+    are encoded in image_format (defaults to WORDCLOUD_IMAGE_FORMAT; the
+    matplotlib renderer always produces PNGs).
 
     Returns:
-        Tuple of (base64_encoded_image, word_frequencies_dict)
+        Tuple of (base64_encoded_image or layout JSON, word_frequencies_dict)
     """
-    if not text or not text.strip():
+    if not frequencies:
         return None, {}
 
     try:
-        # Get multi-language stopwords
-        stopwords_set = get_multilingual_stopwords()
-
-        # Construct regex dynamically to safely extract words
-        arabic_range = f"{chr(0x0600)}-{chr(0x06FF)}{chr(0x0750)}-{chr(0x077F)}{chr(0x08A0)}-{chr(0x08FF)}"
-        regex_pattern = f"[\\w{arabic_range}']+"
-
-        # Instead of directly feeding text, we process the text using WordCloud's default logic
-        # to extract words and frequencies.
-        wc_base = WordCloud(
-            stopwords=stopwords_set,
-            regexp=regex_pattern,
-            collocations=False
-        )
-        base_frequencies = wc_base.process_text(text)
-        
-        # Now we reshape/bidi only the extracted words, which handles right-to-left layout correctly
-        # and translates raw Arabic chars into presentation forms supported by the font.
-        reshaped_frequencies = {}
-        for word, freq in base_frequencies.items():
-            reshaped_word = process_arabic_word(word)
-            reshaped_frequencies[reshaped_word] = freq
-
-        # Create wordcloud with reshaped frequencies
-        wordcloud = WordCloud(
-            width=width,
-            height=height,
-            background_color='white',
-            max_words=max_words,
-            colormap=colormap,
-            prefer_horizontal=prefer_horizontal,
-            relative_scaling=0.5,
-            min_font_size=10,
-            random_state=42,
-            font_path=_FONT_PATH
-        ).generate_from_frequencies(reshaped_frequencies)
+        tier = quality_tier(quality)
+        layout_scale = tier["layout_scale"]
+        with timed_phase(timings, "layout"):
+            # Now we reshape/bidi only the extracted words, which handles right-to-left layout correctly
+            # and translates raw Arabic chars into presentation forms supported by the font.
+            reshaped_frequencies = {}
+            original_words = {}
+            for word, freq in frequencies.items():
+                reshaped_word = process_arabic_word(word)
+                reshaped_frequencies[reshaped_word] = freq
+                original_words[reshaped_word] = word
+
+            # Create wordcloud with reshaped frequencies
+            wordcloud = _lazy.get("WordCloud")(
+                width=max(1, width // layout_scale),
+                height=max(1, height // layout_scale),
+                scale=layout_scale * tier["scale"],
+                background_color='white',
+                max_words=min(max_words, tier["max_words"] or max_words),
+                colormap=colormap,
+                prefer_horizontal=prefer_horizontal,
+                relative_scaling=0.5,
+                min_font_size=max(1, WORDCLOUD_MIN_FONT_SIZE // layout_scale),
+                font_step=tier["font_step"],
+                random_state=42,
+                font_path=get_font_path()
+            ).generate_from_frequencies(reshaped_frequencies)
 
         # Get word frequencies back (optional, but requested by API)
         word_frequencies = wordcloud.words_
 
-        # Convert to base64 image
-        fig, ax = plt.subplots(figsize=(10, 5), dpi=100)
-        ax.imshow(wordcloud, interpolation='bilinear')
-        ax.axis('off')
-        ax.set_title('Nuage de mots', fontsize=14, pad=20, color='black')
-
-        # Save to buffer
-        buffer = io.BytesIO()
-        plt.savefig(buffer, format='png', bbox_inches='tight', facecolor='white', dpi=100)
-        buffer.seek(0)
-        plt.close(fig)
+        if output == "layout":
+            layout = wordcloud_layout(wordcloud, original_words)
+            return json.dumps(layout, ensure_ascii=False, separators=(",", ":")), word_frequencies
 
-        # Encode to base64
-        image_base64 = base64.b64encode(buffer.read()).decode('utf-8')
+        with timed_phase(timings, "encode"):
+            if output == "svg":
+                image = _encode_svg(wordcloud)
+            elif WORDCLOUD_RENDERER == "matplotlib" and _lazy.get("plt") is not None:
+                image = _encode_png_matplotlib(wordcloud)
+            else:
+                image = _encode_image_pil(wordcloud, tier["compress_level"], image_format)
+            image_base64 = base64.b64encode(image).decode('utf-8')
 
         return image_base64, word_frequencies
 
@@ -210,12 +450,58 @@ def create_wordcloud(
         return None, {}
 
 
+def create_wordcloud(
+    text: str,
+    width: int = 800,
+    height: int = 400,
+    max_words: int = 100,
+    prefer_horizontal: float = 0.9,
+    colormap: str = 'tab20',
+    timings: Optional[dict] = None,
+    output: str = "png",
+    quality: Optional[str] = None,
+    image_format: Optional[str] = None
+) -> tuple[Optional[str], dict]:
+    """
+    Create a wordcloud from text with multi-language support (French, English, Arabic).
+
+    The text is tokenised, then rendered by create_wordcloud_from_frequencies
+    with the same options (timings, output, quality and image_format).
+
+    Returns:
+        Tuple of (base64_encoded_image or layout JSON, word_frequencies_dict)
+    """
+    if not text or not text.strip():
+        return None, {}
+
+    try:
+        return create_wordcloud_from_frequencies(
+            extract_word_counts(text),
+            width=width,
+            height=height,
+            max_words=max_words,
+            prefer_horizontal=prefer_horizontal,
+            colormap=colormap,
+            timings=timings,
+            output=output,
+            quality=quality,
+            image_format=image_format
+        )
+    except Exception as e:
+        print(f"Error creating wordcloud: {e}")
+        return None, {}
+
+
 def get_top_words(text: str, n: int = 10) -> list[tuple[str, float]]:
     """
-    Get top N words from text with their frequencies.
+    Get top N words from text with their frequencies, relative to the most
+    frequent word (the scale of the wordcloud's word frequencies).
 
     Returns:
         List of (word, frequency) tuples
     """
-    _, word_frequencies = create_wordcloud(text)
-    return sorted(word_frequencies.items(), key=lambda x: x[1], reverse=True)[:n]
+    counts = extract_word_counts(text)
+    if not counts:
+        return []
+    top = sorted(counts.items(), key=lambda x: x[1], reverse=True)[:n]
+    return [(word, count / top[0][1]) for word, count in top]
@@ -3,6 +3,9 @@ import sys
 from unittest.mock import patch, MagicMock
 
 # Import dependencies safely. They might be mocked by conftest if missing.
+import arabic_reshaper
+from bidi.algorithm import get_display
+
 from app.services.wordcloud import process_arabic_word
 
 def test_process_arabic_word_empty_string():
@@ -14,42 +17,30 @@ def test_process_arabic_word_non_arabic():
     assert process_arabic_word("bonjour") == "bonjour"
     assert process_arabic_word("!@#$%") == "!@#$%"
 
-@patch('app.services.wordcloud.arabic_reshaper.ArabicReshaper')
-@patch('app.services.wordcloud.get_display')
-def test_process_arabic_word_arabic(mock_get_display, mock_arabic_reshaper):
+def test_process_arabic_word_arabic():
     word = "مرحبا"
 
-    mock_reshaper_instance = MagicMock()
-    mock_arabic_reshaper.return_value = mock_reshaper_instance
-    mock_reshaper_instance.reshape.return_value = "reshaped_word"
-    mock_get_display.return_value = "bidi_word"
-
-    result = process_arabic_word(word)
-
-    # Verify the config was passed correctly based on the actual source code
-    mock_arabic_reshaper.assert_called_once_with(configuration={
+    expected = get_display(arabic_reshaper.ArabicReshaper(configuration={
         'delete_harakat': True,
         'delete_tatweel': True,
         'support_ligatures': True,
         'shift_harakat_position': False
-    })
+    }).reshape(word))
 
-    mock_reshaper_instance.reshape.assert_called_once_with(word)
-    mock_get_display.assert_called_once_with("reshaped_word")
-    assert result == "bidi_word"
+    assert process_arabic_word(word) == expected
 
-@patch('app.services.wordcloud.arabic_reshaper.ArabicReshaper')
-@patch('app.services.wordcloud.get_display')
-def test_process_arabic_word_mixed(mock_get_display, mock_arabic_reshaper):
+@patch('app.services.tokenizer._reshaper')
+@patch('app.services.tokenizer.get_display')
+def test_process_arabic_word_mixed(mock_get_display, mock_reshaper):
     word = "helloمرحبا"
+    process_arabic_word.cache_clear()
 
-    mock_reshaper_instance = MagicMock()
-    mock_arabic_reshaper.return_value = mock_reshaper_instance
-    mock_reshaper_instance.reshape.return_value = "reshaped_word"
+    mock_reshaper.reshape.return_value = "reshaped_word"
     mock_get_display.return_value = "bidi_word"
 
     result = process_arabic_word(word)
+    process_arabic_word.cache_clear()
 
-    mock_reshaper_instance.reshape.assert_called_once_with(word)
+    mock_reshaper.reshape.assert_called_once_with(word)
     mock_get_display.assert_called_once_with("reshaped_word")
     assert result == "bidi_word"
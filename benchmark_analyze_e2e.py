@@ -0,0 +1,148 @@
+"""
+End-to-end benchmark of POST /api/analyze against the local LLM stub.
+
+Starts llm_stub_server in replay mode and the real app under uvicorn, both
+on localhost, then has N concurrent teachers submit analyses and poll their
+job until completion. Everything after the HTTP request is real: admission,
+job queue, database, wordcloud, prompt building, DeepSeek client and JSON
+parsing. No network access is needed.
+
+    python benchmark_analyze_e2e.py --concurrency 8 --requests 4 --feedbacks 300
+    python benchmark_analyze_e2e.py --recordings llm_recordings.jsonl --rpm 120 --error-rate 0.05
+"""
+import os
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import statistics
+
+import httpx
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="End-to-end /api/analyze benchmark against the LLM stub")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent teachers")
+    parser.add_argument("--requests", type=int, default=3, help="Analyses per teacher")
+    parser.add_argument("--feedbacks", type=int, default=200, help="Feedbacks per analysis")
+    parser.add_argument("--recordings", default=None, help="Recordings file to replay (synthetic latency otherwise)")
+    parser.add_argument("--rpm", type=int, default=0, help="Stub rate limit in requests per minute")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of stub responses that are 503")
+    parser.add_argument("--time-scale", type=float, default=0.2, help="Multiply stub latencies")
+    parser.add_argument("--workers", type=int, default=4, help="ANALYSIS_WORKERS")
+    parser.add_argument("--max-concurrent", type=int, default=4, help="ANALYSIS_MAX_CONCURRENT")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+ARGS = parse_args()
+
+# App configuration is read at import time, so it must be set before importing it
+os.environ["DEEPSEEK_API_KEY"] = "benchmark"
+os.environ["ANALYSIS_WORKERS"] = str(ARGS.workers)
+os.environ["ANALYSIS_MAX_CONCURRENT"] = str(ARGS.max_concurrent)
+os.environ["ANALYSIS_MAX_PER_TEACHER"] = str(max(3, ARGS.requests))
+
+from app import database  # noqa: E402
+from app.auth import create_access_token  # noqa: E402
+from app.services import deepseek  # noqa: E402
+from app.services.feedback_terms import token_bag  # noqa: E402
+from llm_stub_server import LLMStub, ServerThread, create_stub_app  # noqa: E402
+
+WORDS = ["cours", "clair", "rapide", "exercices", "exemples", "prof", "intéressant", "difficile",
+         "pratique", "examen", "TP", "très", "bien", "trop", "long", "موضوع", "شرح", "جيد"]
+
+
+def seed_teachers(count: int, feedbacks: int, credits: int, rng: random.Random) -> list[dict]:
+    teachers = []
+    for t in range(count):
+        email = f"bench{t}@example.com"
+        teacher_id = database.create_teacher(f"Bench {t}", email, "x", f"BN{t:03d}")
+        database.add_credits(teacher_id, credits)
+        texts = [" ".join(rng.choices(WORDS, k=rng.randint(4, 30))) for _ in range(feedbacks)]
+        ids = [
+            database.insert_feedback(text, f"dev{t}-{i}", rng.randint(1, 10), teacher_id, token_counts=token_bag(text))
+            for i, text in enumerate(texts)
+        ]
+        teachers.append({"id": teacher_id, "token": create_access_token({"sub": email}), "feedback_ids": ids})
+    return teachers
+
+
+async def teacher_session(base_url: str, teacher: dict, requests: int, latencies: list, outcomes: dict):
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0, cookies={"access_token": teacher["token"]}) as client:
+        for n in range(requests):
+            start = time.perf_counter()
+            response = await client.post("/api/analyze", json={
+                "feedback_ids": teacher["feedback_ids"],
+                "context": f"Séance {n}"
+            })
+            if response.status_code != 202:
+                outcomes[f"http_{response.status_code}"] = outcomes.get(f"http_{response.status_code}", 0) + 1
+                await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+                continue
+            status_url = response.json()["status_url"]
+            while True:
+                job = (await client.get(status_url)).json()
+                if job["status"] in ("completed", "failed"):
+                    break
+                await asyncio.sleep(0.1)
+            latencies.append(time.perf_counter() - start)
+            ai_ok = job["status"] == "completed" and "n'est pas disponible" not in (job["result"] or {}).get("summary", "")
+            key = "ok" if ai_ok else ("fallback" if job["status"] == "completed" else "failed")
+            outcomes[key] = outcomes.get(key, 0) + 1
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def run(app_url: str, stub_url: str, teachers: list[dict]):
+    latencies: list[float] = []
+    outcomes: dict = {}
+    start = time.perf_counter()
+    await asyncio.gather(*(teacher_session(app_url, t, ARGS.requests, latencies, outcomes) for t in teachers))
+    wall = time.perf_counter() - start
+
+    async with httpx.AsyncClient() as client:
+        stub_stats = (await client.get(f"{stub_url}/stats")).json()
+
+    print(f"teachers={len(teachers)} analyses/teacher={ARGS.requests} feedbacks/analysis={ARGS.feedbacks}")
+    print(f"wall time        : {wall:.2f}s")
+    if latencies:
+        print(f"throughput       : {len(latencies) / wall:.2f} analyses/s")
+        print(f"latency p50/p95  : {statistics.median(latencies):.2f}s / {percentile(latencies, 95):.2f}s (max {max(latencies):.2f}s)")
+    print(f"outcomes         : {outcomes}")
+    print(f"stub             : {stub_stats}")
+
+
+def main():
+    rng = random.Random(ARGS.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DATABASE_URL = os.path.join(tmp, "benchmark.db")
+        database.init_db()
+        teachers = seed_teachers(ARGS.concurrency, ARGS.feedbacks, ARGS.requests, rng)
+
+        stub = LLMStub(
+            mode="replay",
+            recordings_path=ARGS.recordings,
+            rpm=ARGS.rpm,
+            error_rate=ARGS.error_rate,
+            time_scale=ARGS.time_scale,
+            seed=ARGS.seed
+        )
+        stub_server = ServerThread(create_stub_app(stub)).start()
+        deepseek.DEEPSEEK_BASE_URL = stub_server.base_url
+
+        from app.main import app
+        app_server = ServerThread(app).start()
+        try:
+            asyncio.run(run(app_server.base_url, stub_server.base_url, teachers))
+        finally:
+            app_server.stop()
+            stub_server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Prompt-size reduction and cost of near-duplicate collapsing.
+
+Generates classes with the repetitive wording typical of student feedback
+(short stock phrases, accents and punctuation variations, emojis) mixed with
+free-form answers, and reports prompt tokens with and without collapsing.
+
+A second table times classes of near-distinct answers that share most of
+their vocabulary: they collapse little but fill the LSH buckets, which is
+the worst case for candidate verification (it should grow about linearly).
+"""
+import time
+import random
+
+from app.services.deepseek import _build_feedback_lines
+
+STOCK = [
+    "Très bien", "très bien !", "Tres bien", "C'était clair", "c'était très clair",
+    "Bon cours", "Super cours 👍", "👍", "👍👍", "Rien à signaler", "RAS",
+    "Trop rapide", "Le cours était trop rapide", "le cours était un peu rapide",
+    "Pas assez d'exemples", "Plus d'exemples svp", "Merci !", "merci",
+    "ممتاز", "شكرا", "Good class", "Very clear"
+]
+TOPICS = ["les matrices", "la récursivité", "les pointeurs", "le TP 3", "l'examen", "les graphes"]
+FREE = [
+    "J'ai eu du mal avec {t}, il faudrait revoir ce point.",
+    "Pourriez-vous donner plus d'exercices sur {t} ?",
+    "La partie sur {t} était passionnante.",
+    "Je n'ai pas compris {t}, surtout la fin.",
+]
+
+
+def make_class(n: int, free_ratio: float, seed: int = 0) -> tuple[list[str], list[int]]:
+    rng = random.Random(seed)
+    feedbacks = []
+    for _ in range(n):
+        if rng.random() < free_ratio:
+            text = rng.choice(FREE).format(t=rng.choice(TOPICS))
+        else:
+            text = rng.choice(STOCK)
+        feedbacks.append(text)
+    return feedbacks, [rng.randint(1, 10) for _ in range(n)]
+
+
+OVERLAP_WORDS = ("cours clair rapide exercices exemples prof intéressant difficile pratique examen TP "
+                 "très bien trop long séance slides rythme questions projet groupe").split()
+
+
+def make_overlapping_class(n: int, seed: int = 0) -> tuple[list[str], list[int]]:
+    """Free-form answers drawn from one small vocabulary: many overlapping, few identical."""
+    rng = random.Random(seed)
+    feedbacks = [" ".join(rng.choices(OVERLAP_WORDS, k=rng.randint(5, 25))) for _ in range(n)]
+    return feedbacks, [rng.randint(1, 10) for _ in range(n)]
+
+
+if __name__ == "__main__":
+    print(f"{'feedbacks':>10} {'free-form':>10} {'lines':>7} {'tokens':>8} {'dedup':>8} {'saved':>7} {'ms':>7}")
+    for n in (30, 200, 5000):
+        for free_ratio in (0.2, 0.5):
+            feedbacks, emotions = make_class(n, free_ratio)
+            start = time.perf_counter()
+            lines, stats = _build_feedback_lines(feedbacks, emotions, dedup=True)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"{n:>10} {free_ratio:>10.0%} {len(lines):>7} {stats['feedback_tokens_before']:>8} "
+                  f"{stats['feedback_tokens_after']:>8} {stats['reduction_pct']:>6}% {elapsed:>7.1f}")
+
+    print(f"\n{'overlapping':>11} {'lines':>7} {'saved':>7} {'ms':>8} {'µs/feedback':>12}")
+    for n in (200, 1000, 5000):
+        feedbacks, emotions = make_overlapping_class(n)
+        start = time.perf_counter()
+        lines, stats = _build_feedback_lines(feedbacks, emotions, dedup=True)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{n:>11} {len(lines):>7} {stats['reduction_pct']:>6}% {elapsed:>8.1f} {elapsed * 1000 / n:>12.0f}")
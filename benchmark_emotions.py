@@ -0,0 +1,94 @@
+"""
+Benchmark of the /api/emotions computation over 1M feedbacks.
+
+Measures the cold load (the per-day aggregate + NumPy), a cached hit, the
+reload after new feedbacks arrive, each stage of the cold path separately,
+and the GROUP BY over the raw feedbacks that the aggregate replaces.
+"""
+import os
+import time
+import random
+import tempfile
+
+import numpy as np
+
+from app import database
+from app.services.emotions import compute_emotion_stats, daily_histograms, rows_to_columns, emotion_stats_cache
+
+ROWS = 1_000_000
+TEACHER_ID = 1
+
+
+def seed(rows: int):
+    rng = random.Random(42)
+    start = time.mktime((2024, 9, 1, 8, 0, 0, 0, 0, -1))
+    with database.get_db() as conn:
+        conn.executemany(
+            "INSERT INTO feedbacks (content, device_id, created_at, emotion, teacher_id) VALUES (?, ?, ?, ?, ?)",
+            (
+                ("fb", f"dev{i}", time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(start + i * 30)),
+                 min(10, max(1, int(rng.gauss(6.5, 2)))), TEACHER_ID)
+                for i in range(rows)
+            )
+        )
+        conn.commit()
+
+
+def timed(label: str, func, repeat: int = 1):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        durations.append(time.perf_counter() - start)
+    print(f"{label:<34} {min(durations) * 1000:>9.2f} ms")
+    return result
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DATABASE_URL = os.path.join(tmp, "emotions.db")
+        database.init_db()
+        print(f"Seeding {ROWS:,} feedbacks...")
+        seed(ROWS)
+
+        stats = timed("cold (aggregate + NumPy)", lambda: emotion_stats_cache.get(TEACHER_ID))
+        timed("cached", lambda: emotion_stats_cache.get(TEACHER_ID), repeat=20)
+        timed("last 30 days (cached histograms)", lambda: emotion_stats_cache.get(TEACHER_ID, max_days=30))
+
+        for i in range(100):
+            database.insert_feedback("nouveau", f"new{i}", 9, TEACHER_ID)
+        timed("after 100 new feedbacks (reload)", lambda: emotion_stats_cache.get(TEACHER_ID))
+
+        rows = timed("aggregate query only", lambda: database.get_feedback_emotion_counts(TEACHER_ID))
+        columns = timed("rows -> NumPy columns", lambda: rows_to_columns(rows))
+        daily = timed("daily histograms", lambda: daily_histograms(*columns), repeat=5)
+        timed("stats from daily histograms", lambda: compute_emotion_stats(*daily), repeat=5)
+
+        # Reference: aggregating the raw feedbacks on each cold load
+        def group_by():
+            with database.get_db() as conn:
+                return conn.execute(
+                    """SELECT emotion, CAST(julianday(created_at) - 2440587.5 AS INTEGER) AS day, COUNT(*)
+                       FROM feedbacks
+                       WHERE teacher_id = ? AND emotion BETWEEN 1 AND 10 AND created_at IS NOT NULL
+                       GROUP BY day, emotion""",
+                    (TEACHER_ID,)
+                ).fetchall()
+        timed("GROUP BY over 1M feedbacks", group_by)
+
+        # Reference: the per-row dict approach used for the prompt average
+        with database.get_db() as conn:
+            emotions = [row[0] for row in conn.execute("SELECT emotion FROM feedbacks WHERE teacher_id = ?", (TEACHER_ID,))]
+
+        def python_loop():
+            feedbacks = [{"emotion": int(e)} for e in emotions]
+            values = [fb["emotion"] for fb in feedbacks if fb["emotion"] is not None]
+            return sum(values) / len(values)
+        timed("Python loop (mean only)", python_loop)
+
+        print(f"total={stats['total']:,} mean={stats['mean']} p50={stats['percentiles']['p50']} days={len(stats['by_day'])}")
+        assert np.isclose(stats["mean"], python_loop(), atol=0.01)
+
+
+if __name__ == "__main__":
+    main()
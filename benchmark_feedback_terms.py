@@ -0,0 +1,59 @@
+"""
+Benchmark of wordcloud term counting for an analysis: tokenising the
+selected feedback texts versus aggregating their stored token bags.
+
+Also reports the cost moved to insert time (import with token bags).
+"""
+import os
+import time
+import tempfile
+
+from app import database
+from app.services.feedback_terms import count_feedback_terms, token_bag
+from app.services.wordcloud import extract_word_counts
+from benchmark_tokenizer import make_feedbacks
+
+FEEDBACKS = 10_000
+TEACHER_ID = 1
+
+
+def timed(label: str, func, repeat: int = 3):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        durations.append(time.perf_counter() - start)
+    print(f"{label:<48} {min(durations) * 1000:>9.2f} ms")
+    return result
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DATABASE_URL = os.path.join(tmp, "terms.db")
+        database.init_db()
+        texts = make_feedbacks(FEEDBACKS)
+        timed(f"import {FEEDBACKS:,} feedbacks with token bags",
+              lambda: database.import_feedbacks(
+                  [{"content": t, "teacher_id": TEACHER_ID, "token_counts": token_bag(t)} for t in texts]
+              ), repeat=1)
+        timed("single insert_feedback with token bag",
+              lambda: database.insert_feedback(texts[0], "dev", 5, TEACHER_ID, token_counts=token_bag(texts[0])), repeat=20)
+
+        with database.get_db() as conn:
+            ids = [row[0] for row in conn.execute("SELECT id FROM feedbacks WHERE teacher_id = ?", (TEACHER_ID,))]
+
+        for size in (1_000, len(ids)):
+            selection = ids[:size]
+
+            def tokenise():
+                feedbacks = database.get_feedbacks_by_ids_and_teacher(selection, TEACHER_ID)
+                return extract_word_counts(" ".join(fb["content"] for fb in feedbacks))
+
+            expected = timed(f"{size:>6,} feedbacks: fetch texts + tokenise", tokenise)
+            counts = timed(f"{size:>6,} feedbacks: aggregate token bags",
+                           lambda: count_feedback_terms(selection, TEACHER_ID))
+            assert counts == expected
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark of multilingual font resolution at import time, when the bundled
+font is missing (e.g. a slim image relying on system fonts).
+
+Builds a font tree the size of Debian's fonts-noto-core + fonts-noto-extra,
+then compares the previous behaviour (wordcloud.py and pdf.py each walking
+the font directories at import) with the font registry, cold (one walk,
+result cached on disk) and warm (restart: directory mtimes only).
+"""
+import os
+import time
+import tempfile
+
+from app.services import fonts
+
+PACKAGES = 40
+FILES_PER_PACKAGE = 150
+
+
+def build_tree(root: str):
+    for package in range(PACKAGES):
+        directory = os.path.join(root, "truetype", f"noto{package:02d}")
+        os.makedirs(directory)
+        for i in range(FILES_PER_PACKAGE):
+            open(os.path.join(directory, f"NotoSerif{package:02d}-{i}.ttf"), "wb").close()
+    # Only match, at the end of the walk
+    directory = os.path.join(root, "truetype", "zz-arabic")
+    os.makedirs(directory)
+    open(os.path.join(directory, "NotoSansArabic-Regular.ttf"), "wb").close()
+
+
+def timed(label: str, func, repeat: int = 5):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        durations.append(time.perf_counter() - start)
+    print(f"{label:<48} {min(durations) * 1000:>8.2f} ms")
+    return result
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, "fonts")
+        build_tree(root)
+        cache_file = os.path.join(tmp, "font_cache.json")
+        fonts.BUNDLED_FONT = os.path.join(tmp, "missing.ttf")
+        print(f"{PACKAGES * FILES_PER_PACKAGE + 1:,} font files in {PACKAGES + 1} packages")
+
+        def cold():
+            if os.path.exists(cache_file):
+                os.remove(cache_file)
+            return fonts.resolve_font([root], cache_file=cache_file)
+
+        def legacy():
+            # Each module walked the whole tree once per target font name
+            found = None
+            for targets in (fonts.TARGET_FONTS, fonts.TARGET_FONTS[:2]):
+                for target in targets:
+                    found = found or fonts.discover_font([root], (target,))
+            return found
+
+        legacy = timed("legacy: wordcloud.py + pdf.py walks (5)", legacy)
+        cold_path = timed("registry: cold start (one walk, cache write)", cold)
+        warm_path = timed("registry: restart (cached, mtimes only)",
+                          lambda: fonts.resolve_font([root], cache_file=cache_file))
+        assert legacy == cold_path == warm_path
+
+        if os.path.isdir("/usr/share/fonts"):
+            timed("this host /usr/share/fonts: one walk",
+                  lambda: fonts.discover_font(["/usr/share/fonts"]), repeat=3)
+            host_cache = os.path.join(tmp, "host_cache.json")
+            fonts.resolve_font(["/usr/share/fonts"], cache_file=host_cache)
+            timed("this host /usr/share/fonts: cached",
+                  lambda: fonts.resolve_font(["/usr/share/fonts"], cache_file=host_cache))
+        print(f"resolved: {os.path.basename(warm_path)}")
+
+
+if __name__ == "__main__":
+    main()
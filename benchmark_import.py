@@ -0,0 +1,73 @@
+"""
+Benchmark of the app's import time, parsed from `python -X importtime`.
+
+Imports app.main in fresh interpreters, as a container start does, and
+reports the total and the slowest top-level packages. For comparison, the
+same import followed by the heavy dependencies that used to be imported
+eagerly (wordcloud, matplotlib, numpy, stopwordsiso, shaping, resend)
+shows what lazy loading saves. tests/test_import_time.py enforces the
+budget and that none of them is imported at startup.
+"""
+import re
+import sys
+import subprocess
+
+RUNS = 5
+# Budget for `import app.main` (ms), most of it FastAPI and pydantic
+IMPORT_TIME_BUDGET_MS = 1500
+# Loaded on first use (or by the warm-up), never at startup
+LAZY_MODULES = (
+    "wordcloud", "matplotlib", "numpy", "PIL", "fontTools", "stopwordsiso",
+    "arabic_reshaper", "bidi", "resend", "reportlab"
+)
+EAGER_IMPORTS = "wordcloud, matplotlib.pyplot, numpy, stopwordsiso, arabic_reshaper, bidi.algorithm, resend"
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_profile(statement: str = "import app.main") -> dict[str, tuple[int, int, int]]:
+    """{module: (self_us, cumulative_us, depth)} for a fresh interpreter running statement."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True, text=True, check=True
+    )
+    profile = {}
+    for match in _LINE.finditer(result.stderr):
+        profile[match.group(4)] = (int(match.group(1)), int(match.group(2)), len(match.group(3)) // 2)
+    return profile
+
+
+def total_ms(profile: dict) -> float:
+    """Import time of the statement: the sum of the top-level imports."""
+    return sum(cumulative for _, cumulative, depth in profile.values() if depth == 0) / 1000
+
+
+def lazy_modules_imported(profile: dict) -> list[str]:
+    return sorted(name for name in profile if name.split(".")[0] in LAZY_MODULES)
+
+
+def best_of(statement: str, runs: int = RUNS) -> tuple[float, dict]:
+    profiles = [import_profile(statement) for _ in range(runs)]
+    best = min(profiles, key=total_ms)
+    return total_ms(best), best
+
+
+def main():
+    eager_ms, _ = best_of(f"import app.main, {EAGER_IMPORTS}")
+    lazy_ms, profile = best_of("import app.main")
+
+    print(f"import app.main (lazy dependencies)       {lazy_ms:>8.1f} ms   budget {IMPORT_TIME_BUDGET_MS} ms")
+    print(f"import app.main + former eager imports    {eager_ms:>8.1f} ms")
+    print(f"saved at startup                          {eager_ms - lazy_ms:>8.1f} ms")
+
+    print("\nslowest packages imported by app.main:")
+    packages = [(cumulative, name) for name, (_, cumulative, depth) in profile.items() if depth <= 1]
+    for cumulative, name in sorted(packages, reverse=True)[:10]:
+        print(f"  {name:<36} {cumulative / 1000:>8.1f} ms")
+
+    leaked = lazy_modules_imported(profile)
+    print(f"\nlazy modules imported at startup: {', '.join(leaked) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Offline benchmark of single-prompt vs map-reduce summarisation.
+
+The DeepSeek HTTP call is replaced by a stub LLM that models a hosted model's
+latency: prefill and per-token decode both slow down as the context grows,
+requests beyond the context window are rejected, and a call that cannot finish
+within the client's deadline times out. Independent requests are served in
+parallel, so the numbers reflect how each mode scales with the number of
+selected feedbacks.
+"""
+import time
+import random
+import asyncio
+from unittest.mock import patch
+
+from app.services import deepseek
+from app.services.deepseek import analyze_feedbacks, estimate_tokens
+
+# Stub latency model
+BASE_LATENCY = 0.4                 # Queueing and network round trip, seconds
+PREFILL_TOKENS_PER_SECOND = 2500   # Prompt processing speed on a short context
+DECODE_TOKENS_PER_SECOND = 60      # Generation speed on a short context
+ATTENTION_TOKENS = 16000           # Prefill cost per token doubles at this context size
+KV_TOKENS = 32000                  # Decode cost per token doubles at this context size
+STUB_CONTEXT_TOKENS = 64000
+
+WORDS = ["cours", "clair", "rapide", "exercices", "exemples", "prof", "intéressant",
+         "difficile", "pratique", "examen", "TP", "très", "bien", "trop", "long"]
+
+calls: list[int] = []
+
+
+def stub_latency(prompt_tokens: int, completion_tokens: int) -> float:
+    """Seconds the stub LLM takes to answer a prompt with completion_tokens of output."""
+    prefill = prompt_tokens / PREFILL_TOKENS_PER_SECOND * (1 + prompt_tokens / ATTENTION_TOKENS)
+    decode = completion_tokens / DECODE_TOKENS_PER_SECOND * (1 + prompt_tokens / KV_TOKENS)
+    return BASE_LATENCY + prefill + decode
+
+
+async def stub_post_chat_completion(client, payload, deadline=None, usage=None):
+    prompt = "".join(m["content"] for m in payload["messages"])
+    prompt_tokens = estimate_tokens(prompt)
+    calls.append(prompt_tokens)
+    if prompt_tokens > STUB_CONTEXT_TOKENS:
+        return None  # Context window exceeded
+    # Summaries use their whole output budget
+    latency = stub_latency(prompt_tokens, payload["max_tokens"])
+    remaining = deadline.remaining() if deadline else deepseek.DEEPSEEK_TIMEOUT_BUDGET
+    if latency > remaining:
+        await asyncio.sleep(max(0.0, remaining))
+        return None  # Client timeout
+    await asyncio.sleep(latency)
+    return "- " + " ".join(random.choices(WORDS, k=40))
+
+
+def make_feedbacks(n: int) -> tuple[list[str], list[int]]:
+    rng = random.Random(42)
+    feedbacks = [" ".join(rng.choices(WORDS, k=rng.randint(5, 25))) for _ in range(n)]
+    emotions = [rng.randint(1, 10) for _ in range(n)]
+    return feedbacks, emotions
+
+
+async def run(n: int, mode: str) -> tuple[float, bool]:
+    feedbacks, emotions = make_feedbacks(n)
+    calls.clear()
+    start = time.perf_counter()
+    summary = await analyze_feedbacks(feedbacks, "Benchmark", emotions=emotions, mode=mode)
+    return time.perf_counter() - start, summary is not None
+
+
+async def main():
+    with patch.object(deepseek, "DEEPSEEK_API_KEY", "benchmark"), \
+            patch.object(deepseek, "_post_chat_completion", stub_post_chat_completion):
+        print(f"{'feedbacks':>10} {'mode':>11} {'calls':>6} {'max prompt':>11} {'seconds':>8} {'ok':>4}")
+        for n in (200, 1000, 5000):
+            for mode in ("single", "map_reduce", "auto"):
+                duration, ok = await run(n, mode)
+                print(f"{n:>10} {mode:>11} {len(calls):>6} {max(calls, default=0):>11} {duration:>8.2f} {str(ok):>4}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
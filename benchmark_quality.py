@@ -0,0 +1,73 @@
+"""
+Benchmark of the wordcloud quality tiers: latency against visual quality.
+
+Each tier renders the same frequency table (after a warm-up render); quality
+is reported as the words placed, the smallest word drawn, the share of the
+canvas covered by text, and the output resolution and size.
+"""
+import io
+import json
+import base64
+import random
+
+from PIL import Image
+
+from app.services import wordcloud as wc
+
+RENDERS = 5
+# The analyze flow feels instant below this
+PREVIEW_BUDGET_MS = 200
+
+VOCABULARY = ("cours exercices professeur clair rapide exemples devoirs examen projet "
+              "groupe séance tableau slides labs teacher examples lecture homework "
+              "الدرس التمارين الأستاذ واضح الأمثلة الامتحان").split()
+
+
+def build_frequencies() -> dict:
+    rng = random.Random(42)
+    return {f"{rng.choice(VOCABULARY)}{i}": rng.randint(1, 200) for i in range(150)}
+
+
+def measure(quality: str, frequencies: dict) -> dict:
+    """Best-of-RENDERS timings of a tier, with quality metrics of its output."""
+    wc.create_wordcloud_from_frequencies(frequencies, quality=quality)  # Warm fonts and imports
+    best = None
+    for _ in range(RENDERS):
+        timings = {}
+        image, _ = wc.create_wordcloud_from_frequencies(frequencies, timings=timings, quality=quality)
+        if best is None or sum(timings.values()) < sum(best.values()):
+            best = timings
+
+    layout = json.loads(wc.create_wordcloud_from_frequencies(frequencies, output="layout", quality=quality)[0])
+    png = base64.b64decode(image)
+    pixels = Image.open(io.BytesIO(png)).convert("L")
+    width, height = pixels.size
+    ink = sum(pixels.histogram()[:250]) / (width * height)
+    return {
+        "quality": quality,
+        "layout_ms": best["layout"],
+        "encode_ms": best["encode"],
+        "total_ms": best["layout"] + best["encode"],
+        "words": len(layout["words"]),
+        "min_font": min(word[1] for word in layout["words"]),
+        "coverage": ink,
+        "resolution": f"{width}x{height}",
+        "kib": len(png) / 1024
+    }
+
+
+def main():
+    frequencies = build_frequencies()
+    print(f"{'tier':<10} {'layout':>9} {'encode':>9} {'total':>9} {'words':>6} {'min px':>7} "
+          f"{'ink':>6} {'resolution':>11} {'size':>9}")
+    for quality in wc.WORDCLOUD_QUALITY_TIERS:
+        row = measure(quality, frequencies)
+        print(f"{row['quality']:<10} {row['layout_ms']:>6.0f} ms {row['encode_ms']:>6.0f} ms "
+              f"{row['total_ms']:>6.0f} ms {row['words']:>6} {row['min_font']:>7} {row['coverage']:>6.1%} "
+              f"{row['resolution']:>11} {row['kib']:>5.0f} KiB")
+        if quality == "preview" and row["total_ms"] > PREVIEW_BUDGET_MS:
+            print(f"  preview above the {PREVIEW_BUDGET_MS} ms budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark of the wordcloud encoding step: matplotlib and PIL PNGs, palette
+PNGs, WebP and SVG.
+
+The layout is computed once; each renderer then encodes it repeatedly,
+sequentially and from several threads (as asyncio.to_thread does under
+concurrent analyses), reporting latency and output size.
+"""
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from app.services import wordcloud as wc
+
+RENDERS = 20
+THREADS = 4
+
+VOCABULARY = ("cours exercices professeur clair rapide exemples devoirs examen projet "
+              "groupe séance tableau slides labs teacher examples lecture homework "
+              "الدرس التمارين الأستاذ واضح الأمثلة الامتحان").split()
+
+
+def build_layout():
+    rng = random.Random(42)
+    frequencies = {f"{rng.choice(VOCABULARY)}{i}": rng.randint(1, 200) for i in range(150)}
+    return wc.WordCloud(
+        width=800, height=400, background_color='white', max_words=100, colormap='tab20',
+        relative_scaling=0.5, min_font_size=10, random_state=42, font_path=wc._FONT_PATH
+    ).generate_from_frequencies(frequencies)
+
+
+@contextmanager
+def settings(**values):
+    """Temporarily override wordcloud module settings (e.g. WORDCLOUD_WEBP_QUALITY)."""
+    previous = {name: getattr(wc, name) for name in values}
+    for name, value in values.items():
+        setattr(wc, name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(wc, name, value)
+
+
+def bench(label: str, encode, layout):
+    encode(layout)  # Warm fonts and imports
+    start = time.perf_counter()
+    for _ in range(RENDERS):
+        png = encode(layout)
+    sequential = (time.perf_counter() - start) / RENDERS
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(THREADS) as pool:
+        list(pool.map(lambda _: encode(layout), range(RENDERS)))
+    threaded = (time.perf_counter() - start) / RENDERS
+
+    print(f"{label:<28} {sequential * 1000:>8.1f} ms/render  "
+          f"{threaded * 1000:>8.1f} ms/render with {THREADS} threads  {len(png) / 1024:>6.1f} KiB")
+
+
+def main():
+    layout = build_layout()
+    bench("matplotlib (savefig)", wc._encode_png_matplotlib, layout)
+    for level in (1, 6, 9):
+        bench(f"PIL png level={level}", lambda l, level=level: wc._encode_image_pil(l, level, "png"), layout)
+    with settings(WORDCLOUD_PNG_OPTIMIZE=True):
+        bench("PIL png optimize", lambda l: wc._encode_image_pil(l, image_format="png"), layout)
+    for colors in (32, 64, 256):
+        with settings(WORDCLOUD_PNG8_COLORS=colors):
+            bench(f"PIL png8 {colors} colours", lambda l: wc._encode_image_pil(l, image_format="png8"), layout)
+    for quality in (75, 90, 100):
+        label = "lossless" if quality == 100 else f"quality={quality}"
+        with settings(WORDCLOUD_WEBP_QUALITY=quality):
+            bench(f"PIL webp {label}", lambda l: wc._encode_image_pil(l, image_format="webp"), layout)
+    bench("SVG (embedded font subset)", wc._encode_svg, layout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Benchmark of concurrent wordcloud renders: thread path versus process pool.
+
+Renders CONCURRENT wordclouds at once, as concurrent analyses do, and
+reports the wall time and the render pool snapshot. Process workers only
+help with more than one CPU; on a single core they measure the IPC overhead.
+"""
+import os
+import time
+import random
+import asyncio
+
+from app.services.render_pool import RenderPool
+
+CONCURRENT = 8
+PROCESSES = max(2, min(4, (os.cpu_count() or 1) - 1))
+
+VOCABULARY = ("cours exercices professeur clair rapide exemples devoirs examen projet "
+              "groupe séance tableau slides labs teacher examples lecture homework "
+              "الدرس التمارين الأستاذ واضح الأمثلة الامتحان").split()
+
+
+def make_frequencies(seed: int) -> dict:
+    rng = random.Random(seed)
+    return {f"{rng.choice(VOCABULARY)}{i}": rng.randint(1, 200) for i in range(1000)}
+
+
+async def bench(label: str, pool: RenderPool):
+    pool.start()
+    await pool.render(make_frequencies(0))  # Workers spawned and warmed
+    batches = [make_frequencies(seed) for seed in range(1, CONCURRENT + 1)]
+
+    start = time.perf_counter()
+    await asyncio.gather(*(pool.render(frequencies) for frequencies in batches))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed * 1000:>8.0f} ms for {CONCURRENT} renders "
+          f"({elapsed / CONCURRENT * 1000:.0f} ms/render)  {pool.snapshot()}")
+    pool.shutdown()
+
+
+async def main():
+    print(f"{os.cpu_count()} CPU(s)")
+    await bench("thread", RenderPool(processes=0))
+    await bench(f"process pool ({PROCESSES} workers)", RenderPool(processes=PROCESSES))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+"""
+Benchmark of wordcloud word counting on 10k mixed-script feedbacks.
+
+Compares the previous path (stopword set rebuilt, fresh WordCloud and
+process_text per call, a new ArabicReshaper per word) with the shared
+TokenizerEngine and the cached reshaper, and checks both give the same counts.
+"""
+import re
+import time
+import random
+
+import arabic_reshaper
+from bidi.algorithm import get_display
+from wordcloud import WordCloud
+
+from app.services.tokenizer import (
+    ARABIC_RANGE,
+    RESHAPER_CONFIG,
+    TokenizerEngine,
+    get_multilingual_stopwords,
+    process_arabic_word
+)
+
+FEEDBACKS = 10_000
+
+FRENCH = ("le cours était très clair mais les exercices sont trop longs et le rythme rapide "
+          "j'ai bien aimé les exemples du prof Les TP sont utiles pour comprendre 2024").split()
+ENGLISH = ("the lecture was great but the slides were confusing and the teacher's examples "
+           "helped me understand Examples labs").split()
+ARABIC = "الدرس كان واضحا جدا لكن التمارين صعبة والأستاذ شرح الأمثلة بطريقة ممتازة".split()
+
+
+def make_feedbacks(n: int) -> list[str]:
+    rng = random.Random(42)
+    feedbacks = []
+    for _ in range(n):
+        words = []
+        for vocabulary in rng.sample([FRENCH, ENGLISH, ARABIC], rng.randint(1, 3)):
+            words.extend(rng.choices(vocabulary, k=rng.randint(4, 12)))
+        feedbacks.append(" ".join(words))
+    return feedbacks
+
+
+def legacy_counts(text: str) -> dict:
+    return WordCloud(
+        stopwords=get_multilingual_stopwords(),
+        regexp=f"[\\w{ARABIC_RANGE}']+",
+        collocations=False
+    ).process_text(text)
+
+
+def legacy_reshape(word: str) -> str:
+    if re.compile(r'[؀-ۿݐ-ݿࢠ-ࣿ]+').search(word):
+        return get_display(arabic_reshaper.ArabicReshaper(configuration=RESHAPER_CONFIG).reshape(word))
+    return word
+
+
+def timed(label: str, func, repeat: int = 3):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        durations.append(time.perf_counter() - start)
+    print(f"{label:<44} {min(durations) * 1000:>9.2f} ms")
+    return result
+
+
+def main():
+    feedbacks = make_feedbacks(FEEDBACKS)
+    text = " ".join(feedbacks)
+    print(f"{FEEDBACKS:,} feedbacks, {len(text.split()):,} tokens")
+
+    engine = timed("engine construction (once per process)", TokenizerEngine, repeat=1)
+    expected = timed("legacy: WordCloud.process_text", lambda: legacy_counts(text))
+    counts = timed("engine: count_words", lambda: engine.count_words(text))
+    assert counts == expected, "tokenizer counts differ from WordCloud.process_text"
+
+    # Per-feedback counting (first 1k feedbacks), one call per feedback
+    timed("legacy: per feedback (1k calls)", lambda: [legacy_counts(fb) for fb in feedbacks[:1000]], repeat=1)
+    timed("engine: per feedback (1k calls)", lambda: [engine.count_words(fb) for fb in feedbacks[:1000]], repeat=1)
+
+    top = sorted(counts, key=counts.get, reverse=True)[:100]
+    timed("legacy: reshape top words", lambda: [legacy_reshape(w) for w in top])
+    process_arabic_word.cache_clear()
+    timed("engine: reshape top words (cold)", lambda: [process_arabic_word(w) for w in top], repeat=1)
+    timed("engine: reshape top words (cached)", lambda: [process_arabic_word(w) for w in top])
+    assert [process_arabic_word(w) for w in top] == [legacy_reshape(w) for w in top]
+
+    print(f"distinct words={len(counts)}; counts and display forms identical to the legacy path")
+
+
+if __name__ == "__main__":
+    main()
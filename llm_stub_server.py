@@ -0,0 +1,385 @@
+"""
+OpenAI-compatible stand-in for the DeepSeek chat completions API.
+
+Record real exchanges once, then replay them offline with realistic timing:
+
+    # Proxy to DEEPSEEK_BASE_URL and append every exchange to the recordings file
+    python llm_stub_server.py record --recordings llm_recordings.jsonl
+
+    # Answer from the recordings, with rate limiting and injected errors
+    python llm_stub_server.py replay --recordings llm_recordings.jsonl --rpm 300 --error-rate 0.02
+
+Replay picks the recording whose request matches exactly (same messages,
+model and max_tokens), or else the one with the closest prompt size.
+Latency is drawn from the recorded time-to-first-token and per-token decode
+times, so the distribution (tails included) follows the real API. Without
+recordings, a log-normal latency model and generated text are used.
+
+Point the app at it with DEEPSEEK_BASE_URL=http://127.0.0.1:<port>.
+Tests run it in-process (create_stub_app, ServerThread) and script faults
+request by request through LLMStub.faults.
+Recordings only store a hash of the prompts, never the feedbacks themselves.
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import hashlib
+import argparse
+import threading
+from typing import Optional
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.services.deepseek import estimate_tokens
+
+# Synthetic latency model, used when no recording is available (seconds)
+SYNTHETIC_TTFT_MEDIAN = 0.8
+SYNTHETIC_TTFT_SIGMA = 0.5
+SYNTHETIC_PREFILL_PER_TOKEN = 0.00005
+SYNTHETIC_DECODE_PER_TOKEN = 0.025
+TOKENS_PER_STREAM_CHUNK = 4
+
+SYNTHETIC_WORDS = [
+    "Les", "étudiants", "apprécient", "le", "rythme", "du", "cours", "mais", "demandent",
+    "plus", "d'exemples", "pratiques", "et", "une", "meilleure", "clarté", "sur", "les", "exercices."
+]
+
+
+def request_key(payload: dict) -> str:
+    """Stable hash of what determines the answer: model, messages and max_tokens."""
+    material = json.dumps(
+        [payload.get("model"), payload.get("messages"), payload.get("max_tokens")],
+        ensure_ascii=False,
+        sort_keys=True
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def prompt_tokens_of(payload: dict) -> int:
+    return sum(estimate_tokens(m.get("content", "")) for m in payload.get("messages", []))
+
+
+class RateLimiter:
+    """Token bucket over requests per minute; returns the wait before a slot frees up."""
+
+    def __init__(self, rpm: int, clock=time.monotonic):
+        self.rpm = rpm
+        self._clock = clock
+        self._tokens = float(rpm)
+        self._updated = clock()
+
+    def acquire(self) -> float:
+        if self.rpm <= 0:
+            return 0.0
+        now = self._clock()
+        self._tokens = min(self.rpm, self._tokens + (now - self._updated) * self.rpm / 60)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) * 60 / self.rpm
+
+
+class LLMStub:
+    """State shared by the record and replay handlers."""
+
+    def __init__(
+        self,
+        mode: str = "replay",
+        recordings_path: Optional[str] = None,
+        upstream_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        rpm: int = 0,
+        error_rate: float = 0.0,
+        time_scale: float = 1.0,
+        seed: Optional[int] = None
+    ):
+        self.mode = mode
+        self.recordings_path = recordings_path
+        self.upstream_url = (upstream_url or os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com")).rstrip("/")
+        self.api_key = api_key or os.getenv("DEEPSEEK_API_KEY", "")
+        self.limiter = RateLimiter(rpm)
+        self.error_rate = error_rate
+        self.time_scale = time_scale
+        self.rng = random.Random(seed)
+        # Scripted faults, one entry consumed per request (then requests behave normally):
+        #   ("status", code[, headers])  error response, e.g. 429 with Retry-After
+        #   ("slow", seconds)            answer after an extra delay
+        self.faults: list[tuple] = []
+        self.recordings: list[dict] = []
+        self.by_key: dict[str, dict] = {}
+        self.stats = {
+            "requests": 0, "exact_hits": 0, "nearest_hits": 0, "synthetic": 0,
+            "rate_limited": 0, "injected_errors": 0, "recorded": 0
+        }
+        if recordings_path and os.path.exists(recordings_path):
+            with open(recordings_path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._add_recording(json.loads(line))
+
+    def _add_recording(self, recording: dict):
+        self.recordings.append(recording)
+        self.by_key[recording["key"]] = recording
+
+    # -- replay ---------------------------------------------------------
+
+    def pick(self, payload: dict) -> Optional[dict]:
+        recording = self.by_key.get(request_key(payload))
+        if recording:
+            self.stats["exact_hits"] += 1
+            return recording
+        if not self.recordings:
+            self.stats["synthetic"] += 1
+            return None
+        self.stats["nearest_hits"] += 1
+        target = prompt_tokens_of(payload)
+        return min(self.recordings, key=lambda r: abs(r["prompt_tokens"] - target))
+
+    def timing(self, payload: dict) -> tuple[float, float]:
+        """(time to first token, seconds per generated token), already scaled."""
+        if self.recordings:
+            # Bootstrap from the recorded distribution so tails are preserved
+            sample = self.rng.choice(self.recordings)
+            ttft = sample["ttft_s"]
+            per_token = sample["decode_s_per_token"]
+        else:
+            ttft = self.rng.lognormvariate(0, SYNTHETIC_TTFT_SIGMA) * SYNTHETIC_TTFT_MEDIAN
+            ttft += prompt_tokens_of(payload) * SYNTHETIC_PREFILL_PER_TOKEN
+            per_token = SYNTHETIC_DECODE_PER_TOKEN * self.rng.uniform(0.8, 1.25)
+        return ttft * self.time_scale, per_token * self.time_scale
+
+    def synthetic_content(self, max_tokens: int) -> str:
+        words = []
+        while estimate_tokens(" ".join(words)) < max_tokens * 0.6:
+            words.append(self.rng.choice(SYNTHETIC_WORDS))
+        return "- " + " ".join(words)
+
+    # -- record ---------------------------------------------------------
+
+    async def record(self, client: httpx.AsyncClient, payload: dict) -> tuple[int, dict]:
+        """Forward to the real API (streamed, to measure first-token time) and store the exchange."""
+        upstream = {**payload, "stream": True, "stream_options": {"include_usage": True}}
+        started = time.monotonic()
+        ttft = None
+        parts: list[str] = []
+        usage: dict = {}
+        async with client.stream(
+            "POST",
+            f"{self.upstream_url}/chat/completions",
+            headers={"Content-Type": "application/json", "Authorization": f"Bearer {self.api_key}"},
+            json=upstream
+        ) as response:
+            if response.status_code != 200:
+                body = await response.aread()
+                return response.status_code, {"error": {"message": body.decode("utf-8", "replace")}}
+            async for line in response.aiter_lines():
+                if not line.startswith("data: ") or line == "data: [DONE]":
+                    continue
+                chunk = json.loads(line[6:])
+                if chunk.get("usage"):
+                    usage = chunk["usage"]
+                for choice in chunk.get("choices", []):
+                    delta = choice.get("delta", {}).get("content")
+                    if delta:
+                        if ttft is None:
+                            ttft = time.monotonic() - started
+                        parts.append(delta)
+        total = time.monotonic() - started
+        content = "".join(parts)
+        completion_tokens = usage.get("completion_tokens") or estimate_tokens(content)
+        ttft = ttft if ttft is not None else total
+        recording = {
+            "key": request_key(payload),
+            "model": payload.get("model"),
+            "max_tokens": payload.get("max_tokens"),
+            "prompt_tokens": usage.get("prompt_tokens") or prompt_tokens_of(payload),
+            "completion_tokens": completion_tokens,
+            "ttft_s": round(ttft, 4),
+            "decode_s_per_token": round(max(0.0, total - ttft) / max(1, completion_tokens), 5),
+            "content": content,
+            "usage": usage
+        }
+        self._add_recording(recording)
+        self.stats["recorded"] += 1
+        if self.recordings_path:
+            with open(self.recordings_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(recording, ensure_ascii=False) + "\n")
+        return 200, completion_body(payload, content, recording["prompt_tokens"], completion_tokens)
+
+
+def completion_body(payload: dict, content: str, prompt_tokens: int, completion_tokens: int) -> dict:
+    return {
+        "id": f"chatcmpl-stub-{random.getrandbits(48):x}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": payload.get("model", "deepseek-chat"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+    }
+
+
+def _split_stream_chunks(content: str) -> list[str]:
+    words = content.split(" ")
+    step = TOKENS_PER_STREAM_CHUNK
+    return [" ".join(words[i:i + step]) + (" " if i + step < len(words) else "") for i in range(0, len(words), step)]
+
+
+def create_stub_app(stub: LLMStub) -> FastAPI:
+    app = FastAPI(title="LLM stub")
+    state = {"client": None}
+
+    @app.on_event("shutdown")
+    async def close_upstream():
+        if state["client"] is not None:
+            await state["client"].aclose()
+
+    @app.get("/stats")
+    async def stats():
+        return {**stub.stats, "mode": stub.mode, "recordings": len(stub.recordings)}
+
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        stub.stats["requests"] += 1
+
+        fault = stub.faults.pop(0) if stub.faults else ("ok",)
+        if fault[0] == "status":
+            stub.stats["injected_errors"] += 1
+            headers = fault[2] if len(fault) > 2 else None
+            return JSONResponse({"error": {"message": "Injected error"}}, status_code=fault[1], headers=headers)
+        if fault[0] == "slow":
+            await asyncio.sleep(fault[1])
+
+        wait = stub.limiter.acquire()
+        if wait > 0:
+            stub.stats["rate_limited"] += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}},
+                status_code=429,
+                headers={"Retry-After": f"{wait:.2f}"}
+            )
+        if stub.error_rate and stub.rng.random() < stub.error_rate:
+            stub.stats["injected_errors"] += 1
+            return JSONResponse({"error": {"message": "Injected upstream error"}}, status_code=503)
+
+        if stub.mode == "record":
+            if state["client"] is None:
+                state["client"] = httpx.AsyncClient(timeout=120.0)
+            status, body = await stub.record(state["client"], payload)
+            return JSONResponse(body, status_code=status)
+
+        recording = stub.pick(payload)
+        max_tokens = payload.get("max_tokens") or 500
+        content = recording["content"] if recording else stub.synthetic_content(max_tokens)
+        prompt_tokens = prompt_tokens_of(payload)
+        completion_tokens = min(max_tokens, estimate_tokens(content))
+        ttft, per_token = stub.timing(payload)
+
+        if not payload.get("stream"):
+            await asyncio.sleep(ttft + per_token * completion_tokens)
+            return completion_body(payload, content, prompt_tokens, completion_tokens)
+
+        async def events():
+            await asyncio.sleep(ttft)
+            created = int(time.time())
+            for piece in _split_stream_chunks(content):
+                chunk = {
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": payload.get("model", "deepseek-chat"),
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]
+                }
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                await asyncio.sleep(per_token * TOKENS_PER_STREAM_CHUNK)
+            final = {
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": payload.get("model", "deepseek-chat"),
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens
+                }
+            }
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class ServerThread:
+    """Run an ASGI app under uvicorn in a daemon thread (benchmarks, tests)."""
+
+    def __init__(self, app, port: Optional[int] = None):
+        self.port = port or free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self._server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="error"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def start(self, timeout: float = 10):
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError("Server did not start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        self._server.should_exit = True
+        self._thread.join(timeout=10)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("--recordings", default="llm_recordings.jsonl")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rpm", type=int, default=0, help="Requests per minute before 429 (0 = unlimited)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Multiply replayed latencies (0.1 = 10x faster)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.mode == "record" and not os.getenv("DEEPSEEK_API_KEY"):
+        sys.exit("DEEPSEEK_API_KEY is required to record")
+
+    stub = LLMStub(
+        mode=args.mode,
+        recordings_path=args.recordings,
+        rpm=args.rpm,
+        error_rate=args.error_rate,
+        time_scale=args.time_scale,
+        seed=args.seed
+    )
+    print(f"LLM stub ({args.mode}, {len(stub.recordings)} recordings) on http://127.0.0.1:{args.port}")
+    uvicorn.run(create_stub_app(stub), host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
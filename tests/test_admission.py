@@ -0,0 +1,66 @@
+import asyncio
+import pytest
+
+from app.services.admission import AnalysisAdmission, AdmissionRejected
+
+
+@pytest.mark.asyncio
+async def test_global_and_per_teacher_concurrency_limits():
+    admission = AnalysisAdmission(max_concurrent=2, teacher_concurrency=1)
+    running = {"total": 0, "peak": 0, "teacher_1": 0, "teacher_1_peak": 0}
+
+    def make_analysis(teacher_id):
+        async def analysis():
+            running["total"] += 1
+            running["peak"] = max(running["peak"], running["total"])
+            if teacher_id == 1:
+                running["teacher_1"] += 1
+                running["teacher_1_peak"] = max(running["teacher_1_peak"], running["teacher_1"])
+            await asyncio.sleep(0.02)
+            running["total"] -= 1
+            if teacher_id == 1:
+                running["teacher_1"] -= 1
+            return teacher_id
+        return analysis
+
+    await asyncio.gather(*(
+        admission.run(teacher_id, make_analysis(teacher_id))
+        for teacher_id in [1, 1, 1, 2, 3, 4]
+    ))
+
+    assert running["peak"] == 2
+    assert running["teacher_1_peak"] == 1
+    assert admission.counters["completed"] == 6
+    assert admission.snapshot()["running"] == 0
+
+
+@pytest.mark.asyncio
+async def test_failure_is_counted_and_raised():
+    admission = AnalysisAdmission()
+
+    async def failing():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        await admission.run(1, failing)
+
+    assert admission.counters["failed"] == 1
+    assert admission.snapshot()["inflight_teachers"] == 0
+
+
+def test_admit_rejects_when_queue_full():
+    admission = AnalysisAdmission(max_queued=5)
+    admission.admit(1, queue_depth=4)
+    with pytest.raises(AdmissionRejected) as excinfo:
+        admission.admit(1, queue_depth=5)
+    assert excinfo.value.retry_after >= 1
+    assert admission.counters["rejected_queue_full"] == 1
+
+
+def test_admit_rejects_over_teacher_limit():
+    admission = AnalysisAdmission(max_per_teacher=2)
+    admission.admit(1, teacher_pending=1)
+    with pytest.raises(AdmissionRejected):
+        admission.admit(1, teacher_pending=2)
+    admission.admit(2, teacher_pending=0)
+    assert admission.counters["rejected_teacher_limit"] == 1
@@ -0,0 +1,109 @@
+import pytest
+from unittest.mock import patch
+
+from app.services import analysis
+from app.services.analysis import AI_UNAVAILABLE_MESSAGE, process_feedback_analysis
+
+
+def make_feedbacks(n):
+    return [{"id": i, "content": f"cours {i}", "emotion": 5} for i in range(1, n + 1)]
+
+
+@pytest.fixture
+def fake_services():
+    """Replace the LLM and the wordcloud rendering, recording their inputs."""
+    calls = {"llm": [], "tokenized": [], "rendered": []}
+
+    async def fake_analyze(feedbacks, context, emotions=None, previous_summary=None, previous_count=0, stats=None):
+        calls["llm"].append({"feedbacks": feedbacks, "previous_summary": previous_summary, "previous_count": previous_count})
+        if stats is not None:
+            stats.update({"raw_lines": len(feedbacks), "prompt_lines": 1, "raw_chars": 40, "prompt_chars": 10})
+        return "nouveau résumé"
+
+    def fake_counts(text):
+        calls["tokenized"].append(text)
+        return {"cours": len(text.split()) // 2}
+
+    async def fake_render(frequencies, timings=None, **options):
+        calls["rendered"].append(dict(frequencies))
+        return "aW1n"
+
+    with patch.object(analysis, "analyze_feedbacks", side_effect=fake_analyze), \
+            patch.object(analysis, "extract_token_counts", side_effect=fake_counts), \
+            patch.object(analysis.render_pool, "render", side_effect=fake_render):
+        yield calls
+
+
+@pytest.mark.asyncio
+async def test_full_analysis_returns_watermark(fake_services):
+    stats = {}
+    summary, image = await process_feedback_analysis(make_feedbacks(3), "Cours", stats=stats)
+
+    assert (summary, image) == ("nouveau résumé", "aW1n")
+    assert stats["mode"] == "full"
+    assert stats["feedback_ids"] == [1, 2, 3]
+    assert stats["term_counts"] == {"cours": 3}
+    assert stats["prompt"] == {"raw_lines": 3, "prompt_lines": 1, "raw_chars": 40, "prompt_chars": 10}
+    assert fake_services["llm"][0]["previous_summary"] is None
+
+
+@pytest.mark.asyncio
+async def test_thumbnail_is_rendered_before_the_full_wordcloud(fake_services):
+    received = []
+    stats = {}
+
+    async def on_thumbnail(thumbnail):
+        # The full-size wordcloud is not rendered yet
+        received.append((thumbnail, len(fake_services["rendered"])))
+
+    await process_feedback_analysis(make_feedbacks(3), "Cours", stats=stats, on_thumbnail=on_thumbnail)
+
+    assert received == [("aW1n", 1)]
+    assert len(fake_services["rendered"]) == 2
+    assert stats["wordcloud_thumbnail"] == "aW1n"
+
+
+@pytest.mark.asyncio
+async def test_incremental_analysis_only_processes_new_feedbacks(fake_services):
+    previous = {"id": 7, "summary": "ancien résumé", "feedback_ids": [1, 2, 3], "token_counts": {"cours": 3, "prof": 1}}
+    stats = {}
+
+    await process_feedback_analysis(make_feedbacks(4), "Cours", previous=previous, stats=stats)
+
+    llm_call = fake_services["llm"][0]
+    assert llm_call["feedbacks"] == ["cours 4"]
+    assert llm_call["previous_summary"] == "ancien résumé"
+    assert llm_call["previous_count"] == 3
+    assert fake_services["tokenized"] == ["cours 4"]
+    # Term counts of the new feedbacks are merged into the stored ones
+    assert fake_services["rendered"][0] == {"cours": 4, "prof": 1}
+    assert stats["mode"] == "incremental"
+    assert stats["base_analysis_id"] == 7
+    assert stats["feedback_ids"] == [1, 2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_incremental_without_new_feedbacks_reuses_summary(fake_services):
+    previous = {"id": 7, "summary": "ancien résumé", "feedback_ids": [1, 2], "token_counts": {"cours": 2}}
+
+    summary, _ = await process_feedback_analysis(make_feedbacks(2), "Cours", previous=previous)
+
+    assert summary == "ancien résumé"
+    assert fake_services["llm"] == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("previous", [
+    # Delta larger than ANALYSIS_INCREMENTAL_MAX_RATIO of the collection
+    {"id": 1, "summary": "s", "feedback_ids": [1], "token_counts": {"cours": 1}},
+    # Previous AI summary was unavailable
+    {"id": 1, "summary": AI_UNAVAILABLE_MESSAGE, "feedback_ids": [1, 2, 3], "token_counts": {"cours": 3}},
+    # Previous analysis covered a feedback that is no longer selected
+    {"id": 1, "summary": "s", "feedback_ids": [1, 2, 3, 9], "token_counts": {"cours": 3}},
+])
+async def test_falls_back_to_full_analysis(fake_services, previous):
+    stats = {}
+    await process_feedback_analysis(make_feedbacks(4), "Cours", previous=previous, stats=stats)
+
+    assert stats["mode"] == "full"
+    assert len(fake_services["llm"][0]["feedbacks"]) == 4
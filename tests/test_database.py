@@ -307,7 +307,9 @@ def test_analysis_history():
     history = database.get_analysis_history(t_id)
     assert len(history) == 1
     assert history[0]["summary"] == "Summary"
-    assert history[0]["wordcloud_image"] == "img.png"
+    # Full images are not listed, only fetched per analysis
+    assert "wordcloud_image" not in history[0]
+    assert database.get_analysis_by_id(a_id, t_id)["wordcloud_image"] == "img.png"
     assert history[0]["feedback_count"] == 10
     assert history[0]["context"] == "Context"
 
@@ -0,0 +1,56 @@
+from app.services.dedup import normalize_feedback, group_feedbacks
+
+
+def test_normalize_feedback():
+    assert normalize_feedback("  Très   BIEN !!! ") == "tres bien"
+    assert normalize_feedback("C'était trèèès clair") == "c etait tres clair"
+    assert normalize_feedback("👍👍👍") == "👍"
+    assert normalize_feedback("مُمْتَاز") == "ممتاز"
+
+
+def test_group_exact_duplicates_keeps_most_common_wording():
+    groups = group_feedbacks(["très bien", "Très bien", "Très bien !", "Très bien"])
+    assert len(groups) == 1
+    assert groups[0]["text"] == "Très bien"
+    assert groups[0]["count"] == 4
+
+
+def test_group_near_duplicates():
+    feedbacks = [
+        "Le cours était trop rapide",
+        "le cours etait trop rapide!!",
+        "Le cours était trop rapid",
+        "Les exercices étaient utiles"
+    ]
+    groups = group_feedbacks(feedbacks, [4, 3, 4, 8])
+    assert [g["count"] for g in groups] == [3, 1]
+    assert groups[0]["emotions"] == {4: 2, 3: 1}
+    assert groups[1]["text"] == "Les exercices étaient utiles"
+
+
+def test_negation_is_never_merged():
+    groups = group_feedbacks(["C'était clair", "Ce n'était pas clair", "clair", "pas clair"])
+    texts = {g["text"] for g in groups}
+    assert "clair" in texts and "pas clair" in texts
+
+
+def test_groups_follow_first_appearance_and_cover_every_feedback():
+    feedbacks = ["b", "a", "b", "c", "a", "a"]
+    groups = group_feedbacks(feedbacks, threshold=1.0)
+    assert [g["text"] for g in groups] == ["b", "a", "c"]
+    assert sum(g["count"] for g in groups) == len(feedbacks)
+
+
+def test_empty_input():
+    assert group_feedbacks([]) == []
+
+
+def test_large_buckets_still_group_near_duplicates():
+    # Beyond LARGE_BUCKET members, buckets only get star pairs
+    variants = [f"Le cours était trop rapide {'!' * (i % 3)} séance {i}" for i in range(200)]
+    feedbacks = ["Le cours était trop rapide"] + variants + ["Les exercices étaient utiles"]
+    groups = group_feedbacks(feedbacks, threshold=0.6)
+
+    assert groups[0]["count"] > 150
+    assert groups[-1]["text"] == "Les exercices étaient utiles"
+
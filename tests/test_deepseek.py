@@ -0,0 +1,223 @@
+import asyncio
+import pytest
+
+from app.services import deepseek
+from app.services.deepseek import (
+    estimate_tokens,
+    _chunk_lines,
+    _format_feedback_lines,
+    _build_feedback_lines,
+    _generate_prompts,
+    _record_usage,
+    analyze_feedbacks
+)
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """Replace the HTTP call with a recorder that tracks peak concurrency."""
+    state = {"calls": [], "in_flight": 0, "peak": 0}
+
+    async def fake_post(client, payload, deadline=None, usage=None):
+        state["calls"].append(payload)
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        await asyncio.sleep(0.01)
+        state["in_flight"] -= 1
+        return f"summary {len(state['calls'])}"
+
+    monkeypatch.setattr(deepseek, "DEEPSEEK_API_KEY", "test-key")
+    monkeypatch.setattr(deepseek, "DEEPSEEK_DEDUP", False)
+    monkeypatch.setattr(deepseek, "_post_chat_completion", fake_post)
+    return state
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+    # Arabic characters are two bytes in UTF-8
+    assert estimate_tokens("مرحبا") == 3
+
+
+def test_chunk_lines_respects_budget():
+    lines = [f"- feedback numéro {i}\n" for i in range(200)]
+    chunks = _chunk_lines(lines, 50)
+
+    assert sum(len(c) for c in chunks) == 200
+    assert [line for chunk in chunks for line in chunk] == lines
+    for chunk in chunks:
+        assert sum(estimate_tokens(line) for line in chunk) <= 50
+
+
+def test_chunk_lines_oversized_line_gets_own_chunk():
+    lines = ["- court\n", "- " + "x" * 400 + "\n", "- court\n"]
+    chunks = _chunk_lines(lines, 20)
+    assert len(chunks) == 3
+
+
+def test_format_feedback_lines_with_emotions():
+    lines = _format_feedback_lines(["Bien", "Pas clair"], [7, None])
+    assert lines == ["- Bien [État émotionnel: heureux]\n", "- Pas clair\n"]
+
+
+def test_generate_prompts_contains_emotion_summary():
+    _, user_prompt = _generate_prompts(["A", "B"], "Cours 1", [4, 8])
+    assert "Contexte: Cours 1" in user_prompt
+    assert "Moyenne 6.0/10 sur 2 réponses" in user_prompt
+
+
+@pytest.mark.asyncio
+async def test_analyze_feedbacks_auto_uses_single_prompt_for_small_selection(fake_llm):
+    summary = await analyze_feedbacks(["Très bien", "Trop rapide"], "Cours", mode="auto")
+
+    assert summary == "summary 1"
+    assert len(fake_llm["calls"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_analyze_feedbacks_map_reduce(fake_llm, monkeypatch):
+    monkeypatch.setattr(deepseek, "DEEPSEEK_CHUNK_TOKENS", 100)
+    monkeypatch.setattr(deepseek, "DEEPSEEK_MAP_CONCURRENCY", 3)
+    feedbacks = [f"Le cours numéro {i} était intéressant" for i in range(100)]
+
+    summary = await analyze_feedbacks(feedbacks, "Cours", emotions=[5] * 100, mode="map_reduce")
+
+    assert summary is not None
+    assert fake_llm["peak"] <= 3
+    # Every feedback is sent exactly once across the map prompts
+    map_prompts = [c["messages"][1]["content"] for c in fake_llm["calls"][:-1]]
+    assert sum(p.count("Le cours numéro") for p in map_prompts) >= 100
+    # The final call is the reduce step, with the global emotion summary
+    reduce_prompt = fake_llm["calls"][-1]["messages"][1]["content"]
+    assert "Synthèses partielles" in reduce_prompt
+    assert "Moyenne 5.0/10 sur 100 réponses" in reduce_prompt
+    assert fake_llm["calls"][-1]["max_tokens"] == 500
+
+
+@pytest.mark.asyncio
+async def test_analyze_feedbacks_auto_switches_to_map_reduce(fake_llm, monkeypatch):
+    monkeypatch.setattr(deepseek, "DEEPSEEK_CONTEXT_TOKENS", 200)
+    monkeypatch.setattr(deepseek, "DEEPSEEK_CHUNK_TOKENS", 100)
+    feedbacks = [f"Le cours numéro {i} était intéressant" for i in range(50)]
+
+    await analyze_feedbacks(feedbacks, "Cours")
+
+    assert len(fake_llm["calls"]) > 2
+
+
+@pytest.mark.asyncio
+async def test_map_reduce_tolerates_partial_failures(fake_llm, monkeypatch):
+    monkeypatch.setattr(deepseek, "DEEPSEEK_CHUNK_TOKENS", 100)
+    calls = []
+
+    async def flaky_post(client, payload, deadline=None, usage=None):
+        calls.append(payload)
+        if len(calls) == 1:
+            return None
+        return "ok"
+
+    monkeypatch.setattr(deepseek, "_post_chat_completion", flaky_post)
+    feedbacks = [f"Le cours numéro {i} était intéressant" for i in range(50)]
+
+    assert await analyze_feedbacks(feedbacks, "Cours", mode="map_reduce") == "ok"
+
+
+@pytest.mark.asyncio
+async def test_analyze_feedbacks_without_api_key(monkeypatch):
+    monkeypatch.setattr(deepseek, "DEEPSEEK_API_KEY", "")
+    assert await analyze_feedbacks(["A"], "Cours") is None
+
+
+def test_build_feedback_lines_collapses_duplicates():
+    feedbacks = ["Très bien", "très bien !", "Tres bien", "Trop rapide", "Pas clair"]
+    lines, stats = _build_feedback_lines(feedbacks, [7, 7, 9, 3, None], dedup=True)
+
+    assert lines[0] == "- Très bien (×3) [États émotionnels: heureux×2, ravi×1]\n"
+    assert lines[1] == "- Trop rapide [État émotionnel: déçu]\n"
+    assert lines[2] == "- Pas clair\n"
+    assert stats["feedbacks"] == 5
+    assert stats["prompt_lines"] == 3
+    assert stats["feedback_tokens_after"] < stats["feedback_tokens_before"]
+    assert stats["reduction_pct"] > 0
+
+
+def test_build_feedback_lines_without_dedup():
+    lines, stats = _build_feedback_lines(["A", "A"], None, dedup=False)
+    assert lines == ["- A\n", "- A\n"]
+    assert stats["reduction_pct"] == 0.0
+
+
+@pytest.mark.asyncio
+async def test_analyze_feedbacks_reports_prompt_stats(fake_llm, monkeypatch):
+    monkeypatch.setattr(deepseek, "DEEPSEEK_DEDUP", True)
+    stats = {}
+    await analyze_feedbacks(["Très bien"] * 20 + ["Trop rapide"], "Cours", stats=stats)
+
+    prompt = fake_llm["calls"][0]["messages"][1]["content"]
+    assert prompt.count("Très bien") == 1
+    assert "(×20)" in prompt
+    assert stats["raw_lines"] == 21
+    assert stats["prompt_lines"] == 2
+    assert stats["prompt_chars"] < stats["raw_chars"]
+    assert stats["mode"] == "single"
+
+
+@pytest.mark.asyncio
+async def test_prompt_building_does_not_block_the_event_loop(fake_llm, monkeypatch):
+    import time
+
+    build = deepseek._build_feedback_lines
+
+    def slow_build(*args):
+        time.sleep(0.2)
+        return build(*args)
+
+    monkeypatch.setattr(deepseek, "_build_feedback_lines", slow_build)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    await analyze_feedbacks(["Très bien"], "Cours")
+    task.cancel()
+
+    assert ticks >= 10
+
+
+@pytest.mark.asyncio
+async def test_analyze_feedbacks_updates_previous_summary(fake_llm):
+    await analyze_feedbacks(["Trop rapide"], "Cours", previous_summary="Résumé existant", previous_count=40)
+
+    prompt = fake_llm["calls"][0]["messages"][1]["content"]
+    assert "Synthèse précédente (40 feedbacks déjà analysés)" in prompt
+    assert "Résumé existant" in prompt
+    assert "Trop rapide" in prompt
+    assert "Mets à jour la synthèse précédente" in prompt
+
+
+@pytest.mark.asyncio
+async def test_map_reduce_update_keeps_previous_summary(fake_llm, monkeypatch):
+    monkeypatch.setattr(deepseek, "DEEPSEEK_CHUNK_TOKENS", 100)
+    feedbacks = [f"Le cours numéro {i} était intéressant" for i in range(50)]
+
+    await analyze_feedbacks(feedbacks, "Cours", mode="map_reduce", previous_summary="Résumé existant", previous_count=10)
+
+    reduce_prompt = fake_llm["calls"][-1]["messages"][1]["content"]
+    assert "Résumé existant" in reduce_prompt
+    assert "50 nouveaux feedbacks" in reduce_prompt
+
+
+def test_record_usage_accumulates_tokens():
+    usage = {}
+    _record_usage(usage, {"model": "deepseek-chat", "usage": {
+        "prompt_tokens": 100, "completion_tokens": 20, "prompt_cache_hit_tokens": 60}})
+    _record_usage(usage, {"usage": {
+        "prompt_tokens": 50, "completion_tokens": 10, "prompt_tokens_details": {"cached_tokens": 5}}})
+    _record_usage(usage, {})
+
+    assert usage == {"calls": 3, "prompt_tokens": 150, "completion_tokens": 30, "cached_tokens": 65, "model": "deepseek-chat"}
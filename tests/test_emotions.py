@@ -0,0 +1,143 @@
+import numpy as np
+import pytest
+
+from app import database
+from app.services.emotions import (
+    EmotionStatsCache,
+    compute_emotion_stats,
+    daily_histograms
+)
+
+
+@pytest.fixture
+def test_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DATABASE_URL", str(tmp_path / "test_emotions.db"))
+    database.init_db()
+
+
+def insert(day: str, emotion, teacher_id=1):
+    with database.get_db() as conn:
+        conn.execute(
+            "INSERT INTO feedbacks (content, device_id, created_at, emotion, teacher_id) VALUES (?, ?, ?, ?, ?)",
+            ("fb", "dev", f"{day} 10:00:00", emotion, teacher_id)
+        )
+        conn.commit()
+
+
+def test_stats_match_numpy_reference():
+    rng = np.random.default_rng(0)
+    emotions = rng.integers(1, 11, size=5000)
+    days = rng.integers(19000, 19030, size=5000)
+
+    stats = compute_emotion_stats(*daily_histograms(emotions, days))
+
+    assert stats["total"] == 5000
+    assert stats["mean"] == pytest.approx(emotions.mean(), abs=0.01)
+    assert stats["std"] == pytest.approx(emotions.std(), abs=0.01)
+    assert stats["histogram"]["3"] == int((emotions == 3).sum())
+    for p in (10, 25, 50, 75, 90):
+        assert stats["percentiles"][f"p{p}"] == int(np.percentile(emotions, p, method="inverted_cdf"))
+    assert sum(day["count"] for day in stats["by_day"]) == 5000
+
+
+def test_by_day_and_moving_average():
+    emotions = np.array([2, 4, 10, 8, 0, 11])
+    days = np.array([19000, 19000, 19002, 19002, 19001, 19001])  # Out-of-range emotions are ignored
+
+    stats = compute_emotion_stats(*daily_histograms(emotions, days), window=2)
+
+    assert [d["date"] for d in stats["by_day"]] == ["2022-01-08", "2022-01-10"]
+    assert [d["mean"] for d in stats["by_day"]] == [3.0, 9.0]
+    assert stats["by_day"][0]["histogram"][1] == 1
+    # Weighted by answers over the last 2 collection days
+    assert [m["mean"] for m in stats["moving_average"]] == [3.0, 6.0]
+
+    limited = compute_emotion_stats(*daily_histograms(emotions, days), window=2, max_days=1)
+    assert [d["date"] for d in limited["by_day"]] == ["2022-01-10"]
+    # Every statistic covers the kept days; the moving average still looks back
+    assert limited["total"] == 2
+    assert limited["mean"] == 9.0
+    assert limited["histogram"]["2"] == 0
+    assert [m["mean"] for m in limited["moving_average"]] == [6.0]
+
+
+def test_weighted_histograms_match_individual_answers():
+    emotions = np.array([2, 4, 2, 9])
+    days = np.array([19000, 19000, 19000, 19003])
+
+    aggregated = daily_histograms(np.array([2, 4, 9]), np.array([19000, 19000, 19003]), np.array([2, 1, 1]))
+
+    first_day, counts = daily_histograms(emotions, days)
+    assert aggregated[0] == first_day
+    assert np.array_equal(aggregated[1], counts)
+
+
+def test_empty_stats():
+    stats = compute_emotion_stats(*daily_histograms(np.array([], dtype=np.int64), np.array([], dtype=np.int64)))
+    assert stats["total"] == 0
+    assert stats["mean"] is None
+    assert stats["by_day"] == []
+
+
+def test_aggregate_follows_feedback_writes(test_db):
+    insert("2024-10-01", 4)
+    insert("2024-10-01", 4)
+    insert("2024-10-02", None)
+    insert("2024-10-02", 9, teacher_id=2)
+    database.import_feedbacks([{"content": "fb", "created_at": "2024-10-03 09:00:00", "emotion": 7, "teacher_id": 1}])
+
+    assert sorted(database.get_feedback_emotion_counts(1)) == [(4, 19997, 2), (7, 19999, 1)]
+    assert database.get_feedback_emotion_counts(2) == [(9, 19998, 1)]
+
+    with database.get_db() as conn:
+        conn.execute("UPDATE feedbacks SET emotion = 5 WHERE emotion = 7")
+        conn.commit()
+    assert sorted(database.get_feedback_emotion_counts(1)) == [(4, 19997, 2), (5, 19999, 1)]
+
+    database.reset_database(1)
+    assert database.get_feedback_emotion_counts(1) == []
+    assert database.get_feedback_emotion_counts(2) == [(9, 19998, 1)]
+
+
+def test_aggregate_is_filled_for_existing_feedbacks(test_db):
+    insert("2024-10-01", 4)
+    with database.get_db() as conn:
+        # A database from before the aggregate existed
+        conn.execute("DROP TRIGGER feedbacks_emotion_insert")
+        conn.execute("DELETE FROM emotion_daily")
+        conn.commit()
+    insert("2024-10-01", 6)
+
+    database.init_db()
+
+    assert sorted(database.get_feedback_emotion_counts(1)) == [(4, 19997, 1), (6, 19997, 1)]
+
+
+def test_cache_reloads_after_new_feedbacks(test_db):
+    insert("2024-10-01", 4)
+    insert("2024-10-01", 6)
+    insert("2024-10-02", None)
+    insert("2024-10-02", 9, teacher_id=2)
+    cache = EmotionStatsCache()
+
+    first = cache.get(1)
+    assert first["total"] == 2
+    assert first["mean"] == 5.0
+    assert cache.get(1) is first  # Cached until feedback changes
+
+    insert("2024-10-03", 8)
+    second = cache.get(1)
+
+    assert second["total"] == 3
+    assert [d["date"] for d in second["by_day"]] == ["2024-10-01", "2024-10-03"]
+
+
+def test_cache_reloads_after_reset(test_db):
+    insert("2024-10-01", 4)
+    cache = EmotionStatsCache()
+    assert cache.get(1)["total"] == 1
+
+    database.reset_database(1)
+    assert cache.get(1)["total"] == 0
+    insert("2024-10-05", 7)
+    assert cache.get(1)["mean"] == 7.0
@@ -0,0 +1,180 @@
+import ast
+import inspect
+
+import pytest
+
+from app import database
+from app.services import analysis
+from app.services.feedback_terms import count_feedback_terms, token_bag
+from app.services.wordcloud import extract_word_counts
+
+
+@pytest.fixture(autouse=True)
+def test_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DATABASE_URL", str(tmp_path / "test_feedback_terms.db"))
+    database.init_db()
+
+
+TEXTS = [
+    "Le cours était clair, les exemples aussi",
+    "Exemple utile mais exercices trop longs 2024",
+    "The teacher's examples helped",
+    "الدرس كان واضحا والأمثلة ممتازة الدرس",
+    "Cours cours COURS",
+]
+
+
+def bag(feedback_id):
+    with database.get_db() as conn:
+        return dict(conn.execute(
+            """SELECT t.term, ft.count FROM feedback_terms ft JOIN terms t ON t.id = ft.term_id
+               WHERE ft.feedback_id = ?""",
+            (feedback_id,)
+        ).fetchall())
+
+
+def test_insert_stores_token_bag():
+    content = "Cours cours, exercices 12 le prof"
+    feedback_id = database.insert_feedback(content, "dev", 5, 1, token_counts=token_bag(content))
+
+    assert bag(feedback_id) == {"Cours": 1, "cours": 1, "exercices": 1, "prof": 1}
+
+
+def test_database_does_not_import_services():
+    imported = set()
+    for node in ast.walk(ast.parse(inspect.getsource(database))):
+        if isinstance(node, ast.ImportFrom):
+            imported.add(node.module or "")
+        elif isinstance(node, ast.Import):
+            imported.update(alias.name for alias in node.names)
+
+    assert not [module for module in imported if module.startswith("app.")]
+
+
+def test_aggregate_matches_tokenising_the_selection():
+    ids = [database.insert_feedback(text, f"dev{i}", 5, 1) for i, text in enumerate(TEXTS)]
+    database.insert_feedback("cours d'un autre prof", "other", 5, 2)
+
+    counts = count_feedback_terms(ids, teacher_id=1)
+
+    assert counts == extract_word_counts(" ".join(TEXTS))
+    # Feedbacks of another teacher are never counted
+    assert count_feedback_terms(ids, teacher_id=2) == {}
+    assert count_feedback_terms(ids[:1], teacher_id=1) == extract_word_counts(TEXTS[0])
+
+
+def test_import_and_legacy_rows_are_indexed():
+    database.import_feedbacks([
+        {"content": "Séance utile", "teacher_id": 1, "created_at": "2024-10-01 10:00:00",
+         "token_counts": token_bag("Séance utile")},
+        {"content": "Séances trop courtes", "teacher_id": 1, "token_counts": token_bag("Séances trop courtes")},
+    ])
+    with database.get_db() as conn:
+        # A feedback written before token bags existed
+        conn.execute("INSERT INTO feedbacks (content, device_id, teacher_id) VALUES ('Séance calme', 'old', 1)")
+        conn.commit()
+        ids = [row[0] for row in conn.execute("SELECT id FROM feedbacks ORDER BY id")]
+        assert [row[0] for row in conn.execute("SELECT terms_indexed FROM feedbacks ORDER BY id")] == [1, 1, 0]
+
+    counts = count_feedback_terms(ids, teacher_id=1)
+
+    assert counts == {"Séance": 3, "utile": 1, "courtes": 1, "calme": 1}
+    assert bag(ids[2]) == {"Séance": 1, "calme": 1}
+
+
+def test_reset_removes_token_bags():
+    keep = database.insert_feedback("cours", "dev1", 5, 2, token_counts=token_bag("cours"))
+    database.insert_feedback("exercices", "dev2", 5, 1, token_counts=token_bag("exercices"))
+
+    database.reset_database(1)
+
+    with database.get_db() as conn:
+        assert [row[0] for row in conn.execute("SELECT feedback_id FROM feedback_terms")] == [keep]
+
+
+@pytest.mark.asyncio
+async def test_analysis_uses_stored_token_bags(monkeypatch):
+    ids = [database.insert_feedback(text, f"dev{i}", 5, 1) for i, text in enumerate(TEXTS)]
+    feedbacks = database.get_feedbacks_by_ids_and_teacher(ids, 1)
+    rendered = []
+
+    async def fake_render(frequencies, timings=None, **options):
+        rendered.append(dict(frequencies))
+        return "aW1n"
+
+    async def fake_analyze(*args, **kwargs):
+        return "résumé"
+
+    monkeypatch.setattr(analysis.render_pool, "render", fake_render)
+    monkeypatch.setattr(analysis, "analyze_feedbacks", fake_analyze)
+    monkeypatch.setattr(analysis, "extract_token_counts", lambda text: pytest.fail("texts re-tokenised"))
+
+    await analysis.process_feedback_analysis(feedbacks, "Cours", teacher_id=1)
+
+    assert rendered[0] == extract_word_counts(" ".join(TEXTS))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("teacher_id", [1, None])
+async def test_incremental_counts_match_a_full_analysis(monkeypatch, teacher_id):
+    # The second batch has forms that only merge with those of the first one
+    later = ["Exemples clairs, exercice long", "cours CLAIR"]
+    first_ids = [database.insert_feedback(text, f"dev{i}", 5, 1) for i, text in enumerate(TEXTS)]
+    later_ids = [database.insert_feedback(text, f"new{i}", 5, 1) for i, text in enumerate(later)]
+    first = database.get_feedbacks_by_ids_and_teacher(first_ids, 1)
+    everything = database.get_feedbacks_by_ids_and_teacher(first_ids + later_ids, 1)
+    rendered = []
+
+    async def fake_render(frequencies, timings=None, **options):
+        rendered.append(dict(frequencies))
+        return "aW1n"
+
+    async def fake_analyze(*args, **kwargs):
+        return "résumé"
+
+    monkeypatch.setattr(analysis.render_pool, "render", fake_render)
+    monkeypatch.setattr(analysis, "analyze_feedbacks", fake_analyze)
+
+    base = {}
+    await analysis.process_feedback_analysis(first, "Cours", stats=base, teacher_id=teacher_id)
+    previous = {"id": 1, "summary": "résumé", "feedback_ids": base["feedback_ids"], "token_counts": base["token_counts"]}
+    incremental = {}
+    await analysis.process_feedback_analysis(everything, "Cours", previous=previous, stats=incremental, teacher_id=teacher_id)
+    full = {}
+    await analysis.process_feedback_analysis(everything, "Cours", stats=full, teacher_id=teacher_id)
+
+    assert incremental["mode"] == "incremental"
+    assert rendered[-3] == rendered[-1] == extract_word_counts(" ".join(TEXTS + later))
+    assert incremental["token_counts"] == full["token_counts"]
+    assert incremental["term_counts"] == full["term_counts"]
+
+
+def test_scope_collection_and_selected_feedbacks():
+    first = database.insert_feedback("cours clair", "dev1", 5, 1)
+    database.insert_feedback("cours rapide", "dev2", 5, 1)
+    database.toggle_feedback_inclusion(first)
+
+    assert count_feedback_terms(None, 1) == {"cours": 2, "clair": 1, "rapide": 1}
+    assert count_feedback_terms(None, 1, selected_only=True) == {"cours": 1, "clair": 1}
+    assert count_feedback_terms([], 1) == {}
+    assert database.get_feedback_contents(1, selected_only=True) == ["cours clair"]
+
+
+@pytest.mark.asyncio
+async def test_top_words_endpoint():
+    from fastapi import HTTPException
+    from app.main import get_top_words_endpoint
+
+    ids = [database.insert_feedback(text, f"dev{i}", 5, 1) for i, text in enumerate(TEXTS)]
+    teacher = {"id": 1}
+
+    result = await get_top_words_endpoint(n=2, ngram=1, ids=None, selected=False, teacher=teacher)
+    assert result["words"] == [{"term": "cours", "count": 4}, {"term": "Exemple", "count": 2}]
+
+    result = await get_top_words_endpoint(n=5, ngram=2, ids=f"{ids[3]},{ids[4]}", selected=False, teacher=teacher)
+    assert result["ngram"] == 2
+    assert {"term": "cours cours", "count": 2} in result["words"]
+
+    with pytest.raises(HTTPException) as exc:
+        await get_top_words_endpoint(n=5, ngram=1, ids="1,x", selected=False, teacher=teacher)
+    assert exc.value.status_code == 400
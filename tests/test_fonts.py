@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+from app.services import fonts
+
+
+@pytest.fixture
+def font_tree(tmp_path, monkeypatch):
+    """System-like font directories, without the bundled font."""
+    monkeypatch.setattr(fonts, "BUNDLED_FONT", str(tmp_path / "missing.ttf"))
+    root = tmp_path / "fonts"
+    for package in ("dejavu", "noto"):
+        (root / "truetype" / package).mkdir(parents=True)
+        for i in range(20):
+            (root / "truetype" / package / f"{package.capitalize()}Sans-{i}.ttf").write_bytes(b"")
+    (root / "truetype" / "noto" / "NotoSansArabic-Regular.ttf").write_bytes(b"")
+    return root
+
+
+def test_scan_result_is_cached_on_disk(font_tree, tmp_path, monkeypatch):
+    cache_file = str(tmp_path / "font_cache.json")
+    expected = str(font_tree / "truetype" / "noto" / "NotoSansArabic-Regular.ttf")
+
+    assert fonts.resolve_font([str(font_tree)], cache_file=cache_file) == expected
+
+    def no_walk(*args, **kwargs):
+        raise AssertionError("font directories walked despite the cache")
+
+    monkeypatch.setattr(fonts.os, "walk", no_walk)
+    assert fonts.resolve_font([str(font_tree)], cache_file=cache_file) == expected
+
+
+def test_cache_is_invalidated_by_new_font_package(font_tree, tmp_path):
+    cache_file = str(tmp_path / "font_cache.json")
+    assert fonts.resolve_font([str(font_tree)], targets=("cairo",), cache_file=cache_file) is None
+
+    (font_tree / "truetype" / "cairo").mkdir()
+    (font_tree / "truetype" / "cairo" / "Cairo-Regular.ttf").write_bytes(b"")
+    # The new package directory changes the mtime of truetype/
+    os.utime(font_tree / "truetype", (0, 1))
+
+    found = fonts.resolve_font([str(font_tree)], targets=("cairo",), cache_file=cache_file)
+    assert found == str(font_tree / "truetype" / "cairo" / "Cairo-Regular.ttf")
+
+
+def test_bundled_font_skips_the_scan(tmp_path, monkeypatch):
+    monkeypatch.setattr(fonts, "discover_font", lambda *args: pytest.fail("scanned"))
+    assert fonts.resolve_font(cache_file=str(tmp_path / "font_cache.json")) == fonts.BUNDLED_FONT
+    assert not (tmp_path / "font_cache.json").exists()
+
+
+def test_loaded_fonts_are_shared():
+    assert fonts.get_pil_font(24) is fonts.get_pil_font(24)
+    assert fonts.get_pil_font(24).size == 24
+    assert fonts.get_reportlab_font() == fonts.get_reportlab_font() == fonts.REPORTLAB_FONT_NAME
@@ -0,0 +1,9 @@
+from benchmark_import import IMPORT_TIME_BUDGET_MS, best_of, lazy_modules_imported
+
+
+def test_app_import_is_lazy_and_within_budget():
+    total_ms, profile = best_of("import app.main", runs=3)
+
+    # Heavy dependencies load on first use, not when the container starts
+    assert lazy_modules_imported(profile) == []
+    assert total_ms < IMPORT_TIME_BUDGET_MS
@@ -0,0 +1,352 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from app import database
+from app.services import jobs
+from app.services.jobs import AnalysisJobQueue, serialize_job
+from app.services.admission import AnalysisAdmission, AdmissionRejected
+
+
+@pytest.fixture(autouse=True)
+def test_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DATABASE_URL", str(tmp_path / "test_jobs.db"))
+    database.init_db()
+
+
+@pytest.fixture
+def teacher():
+    teacher_id = database.create_teacher("Prof", "prof@example.com", "hash", "PROF1")
+    ids = [database.insert_feedback(f"Feedback {i}", f"dev{i}", 5, teacher_id) for i in range(3)]
+    return {"id": teacher_id, "feedback_ids": ids}
+
+
+async def fake_analysis(feedbacks, context=None, **kwargs):
+    await asyncio.sleep(0.01)
+    return f"Résumé de {len(feedbacks)} feedbacks", "aW1n"
+
+
+@pytest.mark.asyncio
+async def test_job_completes_and_charges_credit(teacher):
+    queue = AnalysisJobQueue(workers=1, admission=AnalysisAdmission())
+    with patch.object(jobs, "process_feedback_analysis", side_effect=fake_analysis):
+        await queue.start()
+        job = await queue.submit(teacher["id"], teacher["feedback_ids"], "Cours 1")
+        assert job["status"] == "queued"
+
+        done = await queue.wait(job["id"], timeout=5)
+        await queue.stop()
+
+    assert done["status"] == "completed"
+    assert database.get_teacher_by_id(teacher["id"])["credits"] == 2
+
+    view = serialize_job(done)
+    assert view["result"]["summary"] == "Résumé de 3 feedbacks"
+    assert view["result"]["wordcloud_data"]["image"] == "aW1n"
+    assert len(database.get_analysis_history(teacher["id"])) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_job_does_not_charge_credit(teacher):
+    async def broken_analysis(feedbacks, context=None, **kwargs):
+        raise RuntimeError("boom")
+
+    queue = AnalysisJobQueue(workers=1, admission=AnalysisAdmission())
+    with patch.object(jobs, "process_feedback_analysis", side_effect=broken_analysis):
+        await queue.start()
+        job = await queue.submit(teacher["id"], teacher["feedback_ids"], "Cours 1")
+        done = await queue.wait(job["id"], timeout=5)
+        await queue.stop()
+
+    assert done["status"] == "failed"
+    assert done["error"]
+    assert database.get_teacher_by_id(teacher["id"])["credits"] == 3
+    assert database.get_analysis_history(teacher["id"]) == []
+
+
+@pytest.mark.asyncio
+async def test_duplicate_submission_returns_active_job(teacher):
+    queue = AnalysisJobQueue(workers=1, admission=AnalysisAdmission())
+    # Workers not started: jobs stay queued
+    queue._queue = asyncio.PriorityQueue()
+    first = await queue.submit(teacher["id"], teacher["feedback_ids"], "Cours 1")
+    second = await queue.submit(teacher["id"], list(reversed(teacher["feedback_ids"])), "Cours 1")
+    other = await queue.submit(teacher["id"], teacher["feedback_ids"], "Cours 2")
+
+    assert second["id"] == first["id"]
+    assert other["id"] != first["id"]
+
+
+@pytest.mark.asyncio
+async def test_duplicate_submission_matches_the_wordcloud_format(teacher, monkeypatch):
+    monkeypatch.setattr(jobs, "WORDCLOUD_OUTPUT", "png")
+    queue = AnalysisJobQueue(workers=1, admission=AnalysisAdmission(max_per_teacher=5))
+    queue._queue = asyncio.PriorityQueue()
+    default = await queue.submit(teacher["id"], teacher["feedback_ids"], "Cours 1")
+    png = await queue.submit(teacher["id"], teacher["feedback_ids"], "Cours 1", wordcloud_format="png")
+    svg = await queue.submit(teacher["id"], teacher["feedback_ids"], "Cours 1", wordcloud_format="svg")
+    layout = await queue.submit(teacher["id"], teacher["feedback_ids"], "Cours 1", wordcloud_format="layout")
+
+    # No format means the server default
+    assert png["id"] == default["id"]
+    assert len({default["id"], svg["id"], layout["id"]}) == 3
+    assert svg["wordcloud_format"] == "svg"
+
+
+@pytest.mark.asyncio
+async def test_jobs_with_the_same_key_each_store_their_own_watermark(teacher):
+    calls = []
+
+    async def watermarked_analysis(feedbacks, context=None, stats=None, **kwargs):
+        calls.append(context)
+        await asyncio.sleep(0.01)
+        stats.update({"feedback_ids": [fb["id"] for fb in feedbacks], "token_counts": {"feedback": len(feedbacks)}, "term_counts": {"feedback": len(feedbacks)}})
+        return "ok", "aW1n"
+
+    # Two persisted jobs for one selection (e.g. created before a restart) are both recovered
+    for job_id in ("job-a", "job-b"):
+        database.create_analysis_job(job_id, teacher["id"], teacher["feedback_ids"], "Cours 1")
+    queue = AnalysisJobQueue(workers=2, admission=AnalysisAdmission(teacher_concurrency=2))
+    with patch.object(jobs, "process_feedback_analysis", side_effect=watermarked_analysis):
+        await queue.start()
+        # A new request for the same selection joins an active job instead of running again
+        joined = await queue.submit(teacher["id"], teacher["feedback_ids"], "Cours 1")
+        done = [await queue.wait(job_id, timeout=5) for job_id in ("job-a", "job-b")]
+        await queue.stop()
+
+    assert joined["id"] in ("job-a", "job-b")
+    assert calls == ["Cours 1", "Cours 1"]
+    assert [job["status"] for job in done] == ["completed", "completed"]
+    for job in done:
+        assert database.get_analysis_term_counts(job["analysis_id"], teacher["id"]) == {"feedback": 3}
+    assert database.find_incremental_base(teacher["id"], "Cours 1", teacher["feedback_ids"]) is not None
+
+
+@pytest.mark.asyncio
+async def test_queue_full(teacher):
+    queue = AnalysisJobQueue(workers=1, admission=AnalysisAdmission(max_queued=1))
+    queue._queue = asyncio.PriorityQueue()
+    await queue.submit(teacher["id"], teacher["feedback_ids"], "Cours 1")
+    with pytest.raises(AdmissionRejected) as excinfo:
+        await queue.submit(teacher["id"], teacher["feedback_ids"], "Cours 2")
+    assert excinfo.value.retry_after >= 1
+
+
+@pytest.mark.asyncio
+async def test_teacher_backlog_limit(teacher):
+    queue = AnalysisJobQueue(workers=1, admission=AnalysisAdmission(max_per_teacher=2))
+    queue._queue = asyncio.PriorityQueue()
+    await queue.submit(teacher["id"], teacher["feedback_ids"], "Cours 1")
+    await queue.submit(teacher["id"], teacher["feedback_ids"], "Cours 2")
+    with pytest.raises(AdmissionRejected):
+        await queue.submit(teacher["id"], teacher["feedback_ids"], "Cours 3")
+    # A retried click on an active job is not a new job, so it is not rejected
+    again = await queue.submit(teacher["id"], teacher["feedback_ids"], "Cours 1")
+    assert again["status"] == "queued"
+
+
+@pytest.mark.asyncio
+async def test_priority_then_fifo_order(teacher):
+    order = []
+
+    async def recording_analysis(feedbacks, context=None, **kwargs):
+        order.append(context)
+        return "ok", ""
+
+    queue = AnalysisJobQueue(workers=1, admission=AnalysisAdmission())
+    queue._queue = asyncio.PriorityQueue()
+    low_1 = await queue.submit(teacher["id"], teacher["feedback_ids"], "low 1")
+    low_2 = await queue.submit(teacher["id"], teacher["feedback_ids"], "low 2")
+    high = await queue.submit(teacher["id"], teacher["feedback_ids"], "high", priority=5)
+
+    queue._queue = None  # start() rebuilds the queue from the database
+    with patch.object(jobs, "process_feedback_analysis", side_effect=recording_analysis):
+        await queue.start()
+        for job in (low_1, low_2, high):
+            await queue.wait(job["id"], timeout=5)
+        await queue.stop()
+
+    assert order == ["high", "low 1", "low 2"]
+
+
+@pytest.mark.asyncio
+async def test_interrupted_job_is_recovered_on_restart(teacher):
+    job = database.create_analysis_job("job-1", teacher["id"], teacher["feedback_ids"], "Cours 1")
+    database.update_analysis_job_status(job["id"], "running")
+
+    queue = AnalysisJobQueue(workers=1, admission=AnalysisAdmission())
+    with patch.object(jobs, "process_feedback_analysis", side_effect=fake_analysis):
+        await queue.start()
+        done = await queue.wait("job-1", timeout=5)
+        await queue.stop()
+
+    assert done["status"] == "completed"
+    assert database.get_teacher_by_id(teacher["id"])["credits"] == 2
+
+
+def test_complete_analysis_job_is_idempotent(teacher):
+    database.create_analysis_job("job-2", teacher["id"], teacher["feedback_ids"], "Cours 1")
+    first = database.complete_analysis_job("job-2", teacher["id"], "s", "", 3, "Cours 1")
+    second = database.complete_analysis_job("job-2", teacher["id"], "s", "", 3, "Cours 1")
+
+    assert first is not None
+    assert second is None
+    assert database.get_teacher_by_id(teacher["id"])["credits"] == 2
+
+
+def test_find_incremental_base(teacher):
+    ids = teacher["feedback_ids"]
+    database.create_analysis_job("job-3", teacher["id"], ids[:2], "Cours 1")
+    analysis_id = database.complete_analysis_job(
+        "job-3", teacher["id"], "s", "", 2, "Cours 1",
+        feedback_ids=ids[:2], token_counts={"cours": 2}
+    )
+
+    base = database.find_incremental_base(teacher["id"], "Cours 1", ids)
+    assert base["id"] == analysis_id
+    assert base["feedback_ids"] == sorted(ids[:2])
+    assert base["token_counts"] == {"cours": 2}
+
+    # A different collection or a selection that dropped analysed feedbacks has no base
+    assert database.find_incremental_base(teacher["id"], "Cours 2", ids) is None
+    assert database.find_incremental_base(teacher["id"], "Cours 1", ids[1:]) is None
+
+
+def test_get_analysis_term_counts(teacher):
+    ids = teacher["feedback_ids"]
+    database.create_analysis_job("job-4", teacher["id"], ids, "Cours 1")
+    analysis_id = database.complete_analysis_job(
+        "job-4", teacher["id"], "s", "", 3, "Cours 1", feedback_ids=ids, term_counts={"cours": 3, "été": 1}
+    )
+    legacy_id = database.save_analysis(teacher["id"], "s", "aW1n", 3, "Cours 1")
+
+    assert database.get_analysis_term_counts(analysis_id, teacher["id"]) == {"cours": 3, "été": 1}
+    assert database.get_analysis_term_counts(legacy_id, teacher["id"]) == {}
+    assert database.get_analysis_term_counts(analysis_id, teacher["id"] + 1) is None
+
+
+@pytest.mark.asyncio
+async def test_job_passes_previous_analysis(teacher):
+    seen = []
+
+    async def recording_analysis(feedbacks, context=None, previous=None, stats=None, **kwargs):
+        seen.append(previous)
+        stats.update({"feedback_ids": [fb["id"] for fb in feedbacks], "token_counts": {"feedback": len(feedbacks)}, "term_counts": {"feedback": len(feedbacks)}})
+        return "ok", ""
+
+    queue = AnalysisJobQueue(workers=1, admission=AnalysisAdmission())
+    with patch.object(jobs, "process_feedback_analysis", side_effect=recording_analysis):
+        await queue.start()
+        first = await queue.submit(teacher["id"], teacher["feedback_ids"][:2], "Cours 1")
+        await queue.wait(first["id"], timeout=5)
+        second = await queue.submit(teacher["id"], teacher["feedback_ids"], "Cours 1")
+        await queue.wait(second["id"], timeout=5)
+        await queue.stop()
+
+    assert seen[0] is None
+    assert seen[1]["feedback_ids"] == sorted(teacher["feedback_ids"][:2])
+
+
+@pytest.mark.asyncio
+async def test_job_passes_requested_wordcloud_format(teacher):
+    outputs = []
+
+    async def recording_analysis(feedbacks, context=None, output=None, **kwargs):
+        outputs.append(output)
+        return "ok", "PHN2Zz4="
+
+    queue = AnalysisJobQueue(workers=1, admission=AnalysisAdmission())
+    with patch.object(jobs, "process_feedback_analysis", side_effect=recording_analysis):
+        await queue.start()
+        first = await queue.submit(teacher["id"], teacher["feedback_ids"], "Cours 1", wordcloud_format="svg")
+        await queue.wait(first["id"], timeout=5)
+        second = await queue.submit(teacher["id"], teacher["feedback_ids"], "Cours 2")
+        await queue.wait(second["id"], timeout=5)
+        await queue.stop()
+
+    # Without a requested format the server default applies
+    assert outputs == ["svg", None]
+
+
+@pytest.mark.asyncio
+async def test_job_records_telemetry(teacher):
+    async def measured_analysis(feedbacks, context=None, previous=None, stats=None, **kwargs):
+        stats.update({
+            "mode": "full",
+            "processed_feedbacks": len(feedbacks),
+            "timings": {"tokenize": 2.0, "llm": 40.0},
+            "usage": {"calls": 2, "prompt_tokens": 1000, "completion_tokens": 200, "cached_tokens": 0},
+            "prompt": {"raw_lines": 3, "prompt_lines": 2, "raw_chars": 120, "prompt_chars": 80}
+        })
+        return "ok", "aW1n"
+
+    queue = AnalysisJobQueue(workers=1, admission=AnalysisAdmission())
+    with patch.object(jobs, "process_feedback_analysis", side_effect=measured_analysis):
+        await queue.start()
+        job = await queue.submit(teacher["id"], teacher["feedback_ids"], "Cours 1")
+        await queue.wait(job["id"], timeout=5)
+        await queue.stop()
+
+    rows = database.get_analysis_telemetry()
+    assert len(rows) == 1
+    row = rows[0]
+    assert row["analysis_id"] == database.get_analysis_history(teacher["id"])[0]["id"]
+    assert row["job_id"] == job["id"]
+    assert row["feedback_count"] == 3
+    assert row["llm_ms"] == 40.0
+    assert row["db_fetch_ms"] is not None and row["save_ms"] is not None
+    assert row["total_ms"] >= row["save_ms"]
+    assert row["llm_calls"] == 2
+    assert (row["raw_lines"], row["prompt_lines"], row["raw_chars"], row["prompt_chars"]) == (3, 2, 120, 80)
+    assert row["cost_usd"] > 0
+
+
+@pytest.mark.asyncio
+async def test_job_stores_wordcloud_layout(teacher):
+    async def layout_analysis(feedbacks, context=None, stats=None, **kwargs):
+        stats["wordcloud_layout"] = '{"v":1,"width":800,"height":400,"words":[["cours",40,10,20,0,"#112233"]]}'
+        return "ok", ""
+
+    queue = AnalysisJobQueue(workers=1, admission=AnalysisAdmission())
+    with patch.object(jobs, "process_feedback_analysis", side_effect=layout_analysis):
+        await queue.start()
+        job = await queue.submit(teacher["id"], teacher["feedback_ids"], "Cours 1")
+        done = await queue.wait(job["id"], timeout=5)
+        await queue.stop()
+
+    wordcloud_data = serialize_job(done)["result"]["wordcloud_data"]
+    assert wordcloud_data["image"] == ""
+    assert wordcloud_data["layout"]["words"] == [["cours", 40, 10, 20, 0, "#112233"]]
+    assert database.get_analysis_history(teacher["id"])[0]["wordcloud_layout"]["width"] == 800
+
+
+@pytest.mark.asyncio
+async def test_thumbnail_is_visible_before_the_job_completes(teacher):
+    release = asyncio.Event()
+    views = []
+
+    async def progressive_analysis(feedbacks, context=None, stats=None, on_thumbnail=None, **kwargs):
+        await on_thumbnail("dGh1bWI=")
+        views.append(serialize_job(database.get_analysis_job(job["id"])))
+        await release.wait()
+        stats["wordcloud_thumbnail"] = "dGh1bWI="
+        return "ok", "aW1n"
+
+    queue = AnalysisJobQueue(workers=1, admission=AnalysisAdmission())
+    with patch.object(jobs, "process_feedback_analysis", side_effect=progressive_analysis):
+        await queue.start()
+        job = await queue.submit(teacher["id"], teacher["feedback_ids"], "Cours 1")
+        while not views:
+            await asyncio.sleep(0.01)
+        release.set()
+        done = await queue.wait(job["id"], timeout=5)
+        await queue.stop()
+
+    assert views[0]["status"] == "running"
+    assert views[0]["wordcloud_thumbnail"] == "dGh1bWI="
+    wordcloud_data = serialize_job(done)["result"]["wordcloud_data"]
+    assert wordcloud_data["thumbnail"] == "dGh1bWI="
+    assert wordcloud_data["image_url"] == f"/api/analyses/{done['analysis_id']}/wordcloud"
+    # The history lists thumbnails, full images are fetched from the image endpoint
+    history = database.get_analysis_history(teacher["id"])
+    assert history[0]["wordcloud_thumbnail"] == "dGh1bWI=" and "wordcloud_image" not in history[0]
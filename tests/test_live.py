@@ -0,0 +1,105 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from app import database
+from app.services import live
+from app.services.live import LiveWordclouds
+from app.services.wordcloud import extract_word_counts
+
+
+@pytest.fixture(autouse=True)
+def test_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DATABASE_URL", str(tmp_path / "test_live.db"))
+    database.init_db()
+
+
+@pytest.fixture
+def renders():
+    """Replace the render pool, recording the frequencies rendered."""
+    rendered = []
+
+    async def fake_render(frequencies, timings=None, **options):
+        rendered.append((dict(frequencies), options))
+        return f"img{len(rendered)}"
+
+    with patch.object(live.render_pool, "render", side_effect=fake_render):
+        yield rendered
+
+
+async def next_event(queue):
+    return await asyncio.wait_for(queue.get(), timeout=2)
+
+
+@pytest.mark.asyncio
+async def test_first_subscriber_gets_the_collection_wordcloud(renders):
+    database.insert_feedback("Le cours était clair", "dev1", 5, 1)
+    database.insert_feedback("cours d'un autre prof", "dev2", 5, 2)
+    service = LiveWordclouds(interval=0)
+
+    event = await next_event(service.subscribe(1))
+
+    assert event["image"] == "img1"
+    assert renders[0] == (extract_word_counts("Le cours était clair"), {"output": "png", "quality": "preview"})
+
+
+@pytest.mark.asyncio
+async def test_submission_burst_costs_one_render_per_interval(renders):
+    service = LiveWordclouds(interval=0.2)
+    queue = service.subscribe(1)
+    assert (await next_event(queue))["image"] is None  # Empty collection
+
+    for i in range(20):
+        database.insert_feedback(f"cours numéro {i} exercices", f"dev{i}", 5, 1)
+        service.notify(1)
+    event = await next_event(queue)
+
+    assert event["image"] == "img1"
+    assert len(renders) == 1
+    assert renders[0][0] == extract_word_counts(" ".join(f"cours numéro {i} exercices" for i in range(20)))
+
+
+@pytest.mark.asyncio
+async def test_unchanged_frequencies_are_not_rendered(renders):
+    database.insert_feedback("cours clair", "dev1", 5, 1)
+    service = LiveWordclouds(interval=0)
+    queue = service.subscribe(1)
+    await next_event(queue)
+
+    # Only stopwords: the frequencies do not change
+    database.insert_feedback("le la les", "dev2", 5, 1)
+    service.notify(1)
+    await service._collections[1].task
+
+    assert len(renders) == 1
+    assert service.counters["unchanged"] == 1
+    assert queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_reset_clears_the_running_totals(renders):
+    database.insert_feedback("cours clair", "dev1", 5, 1)
+    service = LiveWordclouds(interval=0)
+    queue = service.subscribe(1)
+    await next_event(queue)
+
+    database.reset_database(1)
+    database.insert_feedback("exercices", "dev2", 5, 1)
+    service.notify(1)
+    await next_event(queue)
+
+    assert renders[-1][0] == {"exercices": 1}
+
+
+@pytest.mark.asyncio
+async def test_unwatched_collections_are_not_tracked(renders):
+    service = LiveWordclouds(interval=0)
+    service.notify(1)
+    assert service.snapshot()["collections"] == 0
+
+    queue = service.subscribe(1)
+    await next_event(queue)
+    service.unsubscribe(1, queue)
+
+    assert service.snapshot()["collections"] == 0
+    assert len(renders) == 0  # Empty collection: nothing to render
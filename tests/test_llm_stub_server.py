@@ -0,0 +1,112 @@
+import json
+import httpx
+import pytest
+
+from llm_stub_server import LLMStub, RateLimiter, create_stub_app, request_key
+
+
+def payload(content="Bonjour", max_tokens=50, stream=False):
+    return {
+        "model": "deepseek-chat",
+        "messages": [{"role": "system", "content": "sys"}, {"role": "user", "content": content}],
+        "max_tokens": max_tokens,
+        "stream": stream
+    }
+
+
+def recording(key, prompt_tokens, content):
+    return {
+        "key": key, "model": "deepseek-chat", "max_tokens": 50, "prompt_tokens": prompt_tokens,
+        "completion_tokens": 5, "ttft_s": 0.01, "decode_s_per_token": 0.0, "content": content, "usage": {}
+    }
+
+
+@pytest.fixture
+def recordings_file(tmp_path):
+    path = tmp_path / "recordings.jsonl"
+    rows = [
+        recording(request_key(payload("Bonjour")), 5, "réponse enregistrée"),
+        recording("other", 2000, "réponse longue")
+    ]
+    path.write_text("\n".join(json.dumps(r) for r in rows) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def client_for(stub):
+    return httpx.AsyncClient(app=create_stub_app(stub), base_url="http://stub")
+
+
+@pytest.mark.asyncio
+async def test_replay_exact_then_nearest(recordings_file):
+    stub = LLMStub(recordings_path=recordings_file, seed=1)
+    async with client_for(stub) as client:
+        exact = (await client.post("/chat/completions", json=payload("Bonjour"))).json()
+        nearest = (await client.post("/chat/completions", json=payload("x" * 8000))).json()
+
+    assert exact["choices"][0]["message"]["content"] == "réponse enregistrée"
+    assert nearest["choices"][0]["message"]["content"] == "réponse longue"
+    assert exact["usage"]["total_tokens"] == exact["usage"]["prompt_tokens"] + exact["usage"]["completion_tokens"]
+    assert stub.stats["exact_hits"] == 1
+    assert stub.stats["nearest_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_synthetic_response_without_recordings():
+    stub = LLMStub(time_scale=0, seed=1)
+    async with client_for(stub) as client:
+        body = (await client.post("/chat/completions", json=payload(max_tokens=40))).json()
+
+    assert body["choices"][0]["message"]["content"].startswith("- ")
+    assert 0 < body["usage"]["completion_tokens"] <= 40
+
+
+@pytest.mark.asyncio
+async def test_streaming_chunks_and_usage():
+    stub = LLMStub(time_scale=0, seed=1)
+    async with client_for(stub) as client:
+        response = await client.post("/chat/completions", json=payload(stream=True))
+
+    events = [line[6:] for line in response.text.splitlines() if line.startswith("data: ")]
+    assert events[-1] == "[DONE]"
+    chunks = [json.loads(e) for e in events[:-1]]
+    text = "".join(c["choices"][0]["delta"].get("content", "") for c in chunks)
+    assert text.startswith("- ")
+    assert chunks[-1]["usage"]["completion_tokens"] > 0
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_and_injected_errors():
+    stub = LLMStub(rpm=1, time_scale=0, seed=1)
+    async with client_for(stub) as client:
+        first = await client.post("/chat/completions", json=payload())
+        second = await client.post("/chat/completions", json=payload())
+    assert first.status_code == 200
+    assert second.status_code == 429
+    assert float(second.headers["Retry-After"]) > 0
+
+    stub = LLMStub(error_rate=1.0, time_scale=0, seed=1)
+    async with client_for(stub) as client:
+        assert (await client.post("/chat/completions", json=payload())).status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_scripted_faults_then_normal_answers():
+    stub = LLMStub(time_scale=0, seed=1)
+    stub.faults = [("status", 429, {"Retry-After": "0.5"}), ("status", 500)]
+    async with client_for(stub) as client:
+        responses = [await client.post("/chat/completions", json=payload()) for _ in range(3)]
+
+    assert [r.status_code for r in responses] == [429, 500, 200]
+    assert responses[0].headers["Retry-After"] == "0.5"
+    assert stub.faults == []
+    assert stub.stats["injected_errors"] == 2
+
+
+def test_rate_limiter_refills():
+    now = [0.0]
+    limiter = RateLimiter(60, clock=lambda: now[0])
+    for _ in range(60):
+        assert limiter.acquire() == 0
+    assert limiter.acquire() == pytest.approx(1.0)
+    now[0] = 1.0
+    assert limiter.acquire() == 0
@@ -57,3 +57,98 @@ async def test_get_current_teacher_success(mock_get_teacher, mock_decode):
     teacher = await main.get_current_teacher(request)
 
     assert teacher == mock_teacher
+
+@pytest.mark.asyncio
+@patch('app.main.get_analysis_by_id')
+async def test_analysis_wordcloud_is_revalidated_with_etag(mock_get_analysis):
+    mock_get_analysis.return_value = {
+        "id": 1, "wordcloud_image": "aW1n", "wordcloud_thumbnail": "dGh1bWI=", "wordcloud_layout": None
+    }
+    request = MagicMock(spec=Request)
+    request.headers = {}
+    teacher = {"id": 1}
+
+    response = await main.get_analysis_wordcloud(1, request, size="full", teacher=teacher)
+    assert response.status_code == 200
+    assert response.body == b"img"
+    assert response.media_type == "image/png"
+    etag = response.headers["etag"]
+
+    thumbnail = await main.get_analysis_wordcloud(1, request, size="thumbnail", teacher=teacher)
+    assert thumbnail.body == b"thumb" and thumbnail.headers["etag"] != etag
+
+    request.headers = {"if-none-match": etag}
+    response = await main.get_analysis_wordcloud(1, request, size="full", teacher=teacher)
+    assert response.status_code == 304
+    assert response.body == b""
+
+@pytest.mark.asyncio
+@patch('app.main.get_analysis_by_id', return_value=None)
+async def test_analysis_wordcloud_not_found(mock_get_analysis):
+    request = MagicMock(spec=Request)
+    request.headers = {}
+
+    with pytest.raises(HTTPException) as excinfo:
+        await main.get_analysis_wordcloud(1, request, size="full", teacher={"id": 1})
+
+    assert excinfo.value.status_code == 404
+
+@pytest.mark.asyncio
+@patch('app.main.get_analysis_term_counts', return_value={"cours": 3, "exercices": 1})
+async def test_analysis_wordcloud_rerendered_from_term_counts(mock_term_counts):
+    rendered = []
+
+    async def fake_render(frequencies, timings=None, **options):
+        rendered.append((frequencies, options))
+        return "UklGRg=="
+
+    request = MagicMock(spec=Request)
+    request.headers = {}
+    with patch.object(main.render_pool, "render", side_effect=fake_render):
+        response = await main.get_analysis_wordcloud(
+            1, request, size="full", width=1920, height=1080, image_format="webp", teacher={"id": 1}
+        )
+        assert response.media_type == "image/webp"
+        assert rendered == [({"cours": 3, "exercices": 1}, {"width": 1920, "height": 1080, "image_format": "webp"})]
+
+        svg = await main.get_analysis_wordcloud(1, request, size="full", image_format="svg", teacher={"id": 1})
+        assert rendered[-1][1] == {"width": 800, "height": 400, "output": "svg"}
+        assert svg.headers["etag"] != response.headers["etag"]
+
+        request.headers = {"if-none-match": response.headers["etag"]}
+        cached = await main.get_analysis_wordcloud(
+            1, request, size="full", width=1920, height=1080, image_format="webp", teacher={"id": 1}
+        )
+    assert cached.status_code == 304
+    assert len(rendered) == 2
+
+
+@pytest.mark.asyncio
+@patch('app.main.get_analysis_term_counts', return_value={})
+async def test_analysis_wordcloud_rerender_needs_term_counts(mock_term_counts):
+    request = MagicMock(spec=Request)
+    request.headers = {}
+
+    with pytest.raises(HTTPException) as excinfo:
+        await main.get_analysis_wordcloud(1, request, size="full", width=1200, teacher={"id": 1})
+
+    assert excinfo.value.status_code == 404
+
+
+@pytest.mark.asyncio
+@patch('app.main.get_feedbacks_by_ids', return_value=[{"id": 1, "teacher_id": 1}])
+async def test_analyze_priority_is_set_by_the_server(mock_get_feedbacks):
+    from unittest.mock import AsyncMock
+    from app.models import AnalyzeRequest
+
+    # A priority sent by the client is not part of the request model
+    request_data = AnalyzeRequest(feedback_ids=[1], context="Cours", priority=9)
+    job = {"id": "job-1", "status": "queued"}
+    with patch.object(main.analysis_job_queue, "submit", new=AsyncMock(return_value=job)) as submit:
+        await main.analyze_feedbacks_endpoint(request_data, MagicMock(spec=Request), teacher={"id": 1, "credits": 3})
+        assert submit.call_args.kwargs["priority"] == 0
+
+        await main.analyze_feedbacks_endpoint(
+            request_data, MagicMock(spec=Request), teacher={"id": 1, "credits": 0, "is_admin": True}
+        )
+        assert submit.call_args.kwargs["priority"] == main.ANALYSIS_ADMIN_PRIORITY
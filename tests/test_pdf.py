@@ -0,0 +1,42 @@
+import base64
+
+from reportlab.graphics.shapes import Drawing
+
+from app.services.pdf import create_analysis_pdf, wordcloud_svg_drawing
+from app.services.wordcloud import create_wordcloud_from_frequencies
+
+SVG = (
+    b'<svg xmlns="http://www.w3.org/2000/svg" width="200" height="100" viewBox="0 0 200 100">'
+    b'<rect width="100%" height="100%" fill="#ffffff"/>'
+    b'<text transform="translate(10,40)" font-size="30" fill="#1f77b4">cours</text>\n'
+    b'<text transform="translate(150,90) rotate(-90)" font-size="20" fill="rgb(255, 127, 14)">prof</text>'
+    b'</svg>'
+)
+
+
+def test_svg_drawing_scales_words_as_vectors():
+    drawing = wordcloud_svg_drawing(SVG, max_width=100, max_height=100)
+
+    assert isinstance(drawing, Drawing)
+    assert (drawing.width, drawing.height) == (100, 50)
+    background, horizontal, rotated = drawing.contents
+    assert background.fillColor.hexval() == "0xffffff"
+    # Baselines from the top become PDF coordinates from the bottom, at half scale
+    assert horizontal.transform == (0.5, 0, 0, 0.5, 5, 30)
+    assert horizontal.contents[0].text == "cours"
+    assert rotated.transform[4:] == (75, 5)
+    assert rotated.transform[1] > 0  # Rotated counter-clockwise, reading upwards
+    assert rotated.contents[0].fillColor.hexval() == "0xff7f0e"
+
+
+def test_pdf_embeds_svg_wordcloud_without_bitmap():
+    frequencies = {f"mot{i}": 100 - i for i in range(100)}
+    svg, _ = create_wordcloud_from_frequencies(frequencies, output="svg")
+    png, _ = create_wordcloud_from_frequencies(frequencies)
+
+    svg_pdf = create_analysis_pdf(svg, "Résumé\nTout va bien", context="Cours 1")
+    png_pdf = create_analysis_pdf(png, "Résumé\nTout va bien", context="Cours 1")
+
+    assert svg_pdf.startswith(b"%PDF")
+    assert b"/Subtype /Image" not in svg_pdf
+    assert len(svg_pdf) < len(png_pdf)
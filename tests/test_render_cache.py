@@ -0,0 +1,103 @@
+import base64
+import os
+
+import pytest
+
+from app.services import render_pool as render_pool_module
+from app.services import wordcloud as wordcloud_service
+from app.services.render_cache import RenderCache, canonical_frequencies, render_key
+from app.services.render_pool import RenderPool
+
+PNG = base64.b64encode(b"\x89PNG fake").decode()
+
+
+def test_canonical_frequencies_orders_ties_by_term():
+    first = canonical_frequencies({"b": 2, "a": 2, "c": 5, "d": 1}, limit=3)
+    second = canonical_frequencies({"c": 5, "a": 2, "d": 1, "b": 2}, limit=3)
+
+    assert list(first.items()) == [("c", 5), ("a", 2), ("b", 2)]
+    assert render_key(first, {}) == render_key(second, {})
+
+
+def test_key_depends_on_counts_and_options():
+    table = {"cours": 3, "prof": 1}
+    assert render_key(table, {}) != render_key({"cours": 3, "prof": 2}, {})
+    assert render_key(table, {}) != render_key(table, {"width": 400})
+    assert render_key(table, {"colormap": "tab20"}) == render_key(table, {"colormap": "tab20"})
+
+
+def test_key_resolves_default_output_and_quality(monkeypatch):
+    table = {"cours": 3, "prof": 1}
+    explicit = {"output": "png", "quality": "standard", "image_format": "png"}
+    monkeypatch.setattr(wordcloud_service, "WORDCLOUD_QUALITY", "standard")
+    monkeypatch.setattr(wordcloud_service, "WORDCLOUD_IMAGE_FORMAT", "png")
+
+    assert render_key(table, {}) == render_key(table, explicit)
+    assert render_key(table, {}) != render_key(table, {"output": "svg"})
+    assert render_key(table, {"output": "svg"}) == render_key(table, {"output": "svg", "image_format": "webp"})
+
+    # Renders left at the defaults get another key once the defaults change
+    monkeypatch.setattr(wordcloud_service, "WORDCLOUD_QUALITY", "print")
+    assert render_key(table, {}) != render_key(table, explicit)
+    assert render_key(table, {}) == render_key(table, {"quality": "print", "output": "png"})
+
+
+def test_memory_lru_and_hit_ratio():
+    cache = RenderCache(max_entries=2, directory=None)
+    cache.put("a", PNG)
+    cache.put("b", PNG)
+    assert cache.get("a") == PNG
+    cache.put("c", PNG)  # Evicts "b", the least recently used
+
+    assert cache.get("b") is None
+    assert cache.get("c") == PNG
+    snapshot = cache.snapshot()
+    assert snapshot["entries"] == 2
+    assert snapshot["hits"] == 2 and snapshot["misses"] == 1
+    assert snapshot["hit_ratio"] == pytest.approx(0.667)
+
+
+def test_disk_cache_survives_restart_and_is_pruned(tmp_path):
+    cache = RenderCache(max_entries=4, directory=str(tmp_path))
+    cache.put("k1", PNG)
+
+    restarted = RenderCache(max_entries=4, directory=str(tmp_path))
+    assert restarted.get("k1") == PNG
+    assert restarted.snapshot()["disk_hits"] == 1
+
+    pruned = RenderCache(directory=str(tmp_path), max_disk=2)
+    for key in ("k2", "k3"):
+        pruned.put(key, PNG)
+    os.utime(tmp_path / "k1.png", (0, 0))
+    assert pruned.prune_disk() == 1
+    assert sorted(os.listdir(tmp_path)) == ["k2.png", "k3.png"]
+
+
+def test_layout_json_kind_is_stored_as_text(tmp_path):
+    cache = RenderCache(directory=str(tmp_path))
+    cache.put("k1", '{"v":1}', kind="json")
+
+    restarted = RenderCache(directory=str(tmp_path))
+    assert restarted.get("k1", kind="json") == '{"v":1}'
+    assert restarted.get("k1") is None
+    assert (tmp_path / "k1.json").read_text() == '{"v":1}'
+
+
+@pytest.mark.asyncio
+async def test_render_pool_hits_bypass_layout(tmp_path, monkeypatch):
+    renders = []
+    monkeypatch.setattr(render_pool_module, "_render_task", lambda freqs, options: renders.append(freqs) or (PNG, {"layout": 5.0}))
+    pool = RenderPool(processes=0, cache=RenderCache(directory=str(tmp_path)))
+
+    timings = {}
+    assert await pool.render({"cours": 3, "prof": 1, "td": 1}, timings=timings) == PNG
+    assert timings == {"layout": 5.0}
+    # Same table in another order: served from the cache
+    timings = {}
+    assert await pool.render({"td": 1, "prof": 1, "cours": 3}, timings=timings) == PNG
+    assert timings == {}
+    assert len(renders) == 1
+    # Different options render again
+    await pool.render({"cours": 3, "prof": 1, "td": 1}, width=400)
+    assert len(renders) == 2
+    assert pool.cache.snapshot()["hits"] == 1
@@ -0,0 +1,46 @@
+import base64
+
+import pytest
+
+from app.services import render_pool as render_pool_module
+from app.services.render_pool import RenderPool
+
+
+@pytest.mark.asyncio
+async def test_thread_mode_renders_and_reports_timings():
+    pool = RenderPool(processes=0)
+    timings = {"tokenize": 1.0}
+
+    image = await pool.render({"cours": 10, "exercices": 4}, timings=timings)
+
+    assert base64.b64decode(image).startswith(b"\x89PNG")
+    assert set(timings) == {"tokenize", "layout", "encode"}
+    snapshot = pool.snapshot()
+    assert snapshot["mode"] == "thread"
+    assert snapshot["completed"] == 1 and snapshot["pending"] == 0
+
+
+@pytest.mark.asyncio
+async def test_only_top_terms_are_sent_to_workers(monkeypatch):
+    sent = []
+    monkeypatch.setattr(render_pool_module, "_render_task", lambda freqs, options: sent.append(freqs) or ("aW1n", {}))
+    pool = RenderPool(processes=0)
+
+    assert await pool.render({f"mot{i}": i for i in range(1, 1001)}, max_words=10) == "aW1n"
+    assert len(sent[0]) == 10 * render_pool_module.IPC_TERMS_FACTOR
+    assert min(sent[0].values()) == 961
+    assert await pool.render({}) is None
+
+
+@pytest.mark.asyncio
+async def test_process_mode_renders_in_worker():
+    pool = RenderPool(processes=1, max_tasks=2)
+    try:
+        images = [await pool.render({"cours": 10, "prof": i}) for i in range(1, 4)]
+    finally:
+        pool.shutdown()
+
+    # The worker was recycled after two renders and the third still succeeded
+    assert all(base64.b64decode(image).startswith(b"\x89PNG") for image in images)
+    assert pool.snapshot()["completed"] == 3
+    assert pool.snapshot()["thread_fallbacks"] == 0
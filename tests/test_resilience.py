@@ -0,0 +1,165 @@
+import time
+import pytest
+
+from app.services import deepseek
+from app.services.deepseek import analyze_feedbacks
+from app.services.resilience import CircuitBreaker, Deadline, LatencyTracker, backoff_delay, hedged
+from llm_stub_server import LLMStub, ServerThread, create_stub_app
+
+
+@pytest.fixture(scope="module")
+def stub_server():
+    # Synthetic answers without latency: only scripted faults slow requests down
+    stub = LLMStub(time_scale=0, seed=1)
+    server = ServerThread(create_stub_app(stub)).start()
+    yield stub, server
+    server.stop()
+
+
+@pytest.fixture
+def stub(stub_server, monkeypatch):
+    """Point the DeepSeek client at the stub server with fresh resilience state."""
+    stub, server = stub_server
+    stub.faults = []
+    stub.stats.update(dict.fromkeys(stub.stats, 0))
+    monkeypatch.setattr(deepseek, "DEEPSEEK_BASE_URL", server.base_url)
+    monkeypatch.setattr(deepseek, "DEEPSEEK_API_KEY", "test-key")
+    monkeypatch.setattr(deepseek, "DEEPSEEK_RETRY_BASE_DELAY", 0.01)
+    monkeypatch.setattr(deepseek, "DEEPSEEK_RETRY_MAX_DELAY", 0.05)
+    monkeypatch.setattr(deepseek, "_breaker", CircuitBreaker(5, 30.0))
+    monkeypatch.setattr(deepseek, "_latency", LatencyTracker())
+    return stub
+
+
+@pytest.mark.asyncio
+async def test_retries_then_succeeds(stub):
+    stub.faults = [("status", 500), ("status", 503)]
+
+    summary = await analyze_feedbacks(["Très bien"], "Cours")
+
+    assert summary.startswith("- ")
+    assert stub.stats["requests"] == 3
+
+
+@pytest.mark.asyncio
+async def test_client_error_is_not_retried(stub):
+    stub.faults = [("status", 400)]
+
+    assert await analyze_feedbacks(["Très bien"], "Cours") is None
+    assert stub.stats["requests"] == 1
+    # A bad request says nothing about upstream health
+    assert deepseek._breaker.failures == 0
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_honours_retry_after(stub):
+    stub.faults = [("status", 429, {"Retry-After": "0.3"})]
+
+    start = time.monotonic()
+    summary = await analyze_feedbacks(["Très bien"], "Cours")
+
+    assert summary.startswith("- ")
+    assert stub.stats["requests"] == 2
+    assert time.monotonic() - start >= 0.3
+
+
+@pytest.mark.asyncio
+async def test_retries_are_bounded(stub, monkeypatch):
+    monkeypatch.setattr(deepseek, "DEEPSEEK_MAX_RETRIES", 2)
+    stub.faults = [("status", 502)] * 10
+
+    assert await analyze_feedbacks(["Très bien"], "Cours") is None
+    assert stub.stats["requests"] == 3
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_fails_fast(stub, monkeypatch):
+    monkeypatch.setattr(deepseek, "DEEPSEEK_MAX_RETRIES", 0)
+    monkeypatch.setattr(deepseek, "_breaker", CircuitBreaker(2, 30.0))
+    stub.faults = [("status", 503)] * 10
+
+    await analyze_feedbacks(["A"], "Cours")
+    await analyze_feedbacks(["A"], "Cours")
+    assert deepseek._breaker.state == "open"
+
+    assert await analyze_feedbacks(["A"], "Cours") is None
+    assert stub.stats["requests"] == 2
+
+
+@pytest.mark.asyncio
+async def test_deadline_bounds_total_time(stub, monkeypatch):
+    monkeypatch.setattr(deepseek, "DEEPSEEK_TIMEOUT_BUDGET", 0.3)
+    stub.faults = [("slow", 2.0)] * 3
+
+    start = time.monotonic()
+    assert await analyze_feedbacks(["A"], "Cours") is None
+    assert time.monotonic() - start < 1.0
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_beats_slow_response(stub, monkeypatch):
+    monkeypatch.setattr(deepseek, "DEEPSEEK_HEDGE", True)
+    monkeypatch.setattr(deepseek, "DEEPSEEK_HEDGE_MIN_SAMPLES", 1)
+    deepseek._latency.record(0.05)
+    stub.faults = [("slow", 1.5)]
+
+    start = time.monotonic()
+    summary = await analyze_feedbacks(["A"], "Cours")
+
+    assert summary.startswith("- ")
+    assert stub.stats["requests"] == 2
+    assert time.monotonic() - start < 1.0
+
+
+def test_circuit_breaker_half_open_probe():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    now[0] = 11
+    assert breaker.allow()  # single probe
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] = 22
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_backoff_delay_is_capped():
+    for attempt in range(10):
+        assert 0 <= backoff_delay(attempt, 0.5, 4) <= 4
+
+
+def test_latency_percentile():
+    tracker = LatencyTracker(window=100)
+    assert tracker.percentile(95) is None
+    for i in range(1, 101):
+        tracker.record(i / 100)
+    assert tracker.percentile(95) == pytest.approx(0.95, abs=0.01)
+
+
+def test_deadline_remaining():
+    deadline = Deadline(0)
+    assert deadline.expired
+    assert Deadline(10).remaining() > 9
+
+
+@pytest.mark.asyncio
+async def test_hedged_returns_first_result_without_hedging():
+    calls = []
+
+    async def call():
+        calls.append(1)
+        return "ok"
+
+    assert await hedged(call, delay=1) == "ok"
+    assert len(calls) == 1
@@ -0,0 +1,73 @@
+import pytest
+
+from app import database
+from app.services import telemetry
+from app.services.telemetry import estimate_cost, summarize_phases, timed_phase
+
+
+@pytest.fixture
+def test_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DATABASE_URL", str(tmp_path / "test_telemetry.db"))
+    database.init_db()
+
+
+def test_timed_phase_accumulates():
+    timings = {}
+    with timed_phase(timings, "llm"):
+        pass
+    first = timings["llm"]
+    with timed_phase(timings, "llm"):
+        pass
+    assert timings["llm"] >= first >= 0
+    # No-op without a dict
+    with timed_phase(None, "llm"):
+        pass
+
+
+def test_estimate_cost(monkeypatch):
+    monkeypatch.setattr(telemetry, "DEEPSEEK_PRICE_INPUT", 1.0)
+    monkeypatch.setattr(telemetry, "DEEPSEEK_PRICE_CACHED_INPUT", 0.1)
+    monkeypatch.setattr(telemetry, "DEEPSEEK_PRICE_OUTPUT", 2.0)
+
+    usage = {"prompt_tokens": 1_000_000, "cached_tokens": 400_000, "completion_tokens": 500_000}
+    assert estimate_cost(usage) == pytest.approx(0.6 + 0.04 + 1.0)
+    assert estimate_cost({}) == 0.0
+    assert estimate_cost(None) == 0.0
+
+
+def test_summarize_phases_skips_missing_values():
+    rows = [{"llm_ms": float(v), "total_ms": float(v) + 10, "tokenize_ms": None} for v in range(1, 101)]
+
+    summary = summarize_phases(rows)
+
+    assert summary["llm"]["count"] == 100
+    assert summary["llm"]["p50"] == pytest.approx(50.5)
+    assert summary["llm"]["p95"] == pytest.approx(95.0, abs=0.1)
+    assert summary["llm"]["max"] == 100.0
+    assert summary["tokenize"] == {"count": 0, "p50": None, "p95": None, "max": None}
+
+
+def test_store_and_aggregate_telemetry(test_db):
+    teacher_id = database.create_teacher("Prof", "prof@example.com", "hash", "PROF1")
+    analysis_id = database.save_analysis(teacher_id, "résumé", "aW1n", 3, "Cours")
+    for prompt_tokens in (100, 300):
+        database.insert_analysis_telemetry(analysis_id, teacher_id, "job", {
+            "mode": "full",
+            "feedback_count": 3,
+            "processed_feedbacks": 3,
+            "timings": {"db_fetch": 1.5, "llm": 800.0, "total": 900.0},
+            "usage": {"calls": 1, "prompt_tokens": prompt_tokens, "completion_tokens": 50, "model": "deepseek-chat"},
+            "cost_usd": 0.001
+        })
+
+    rows = database.get_analysis_telemetry(days=7)
+    assert len(rows) == 2
+    assert rows[0]["prompt_tokens"] == 300
+    assert rows[0]["layout_ms"] is None
+    assert rows[0]["model"] == "deepseek-chat"
+
+    by_day = database.get_token_usage_by_day(days=7)
+    assert len(by_day) == 1
+    assert by_day[0]["analyses"] == 2
+    assert by_day[0]["prompt_tokens"] == 400
+    assert by_day[0]["cost_usd"] == pytest.approx(0.002)
@@ -0,0 +1,55 @@
+import pytest
+from wordcloud import WordCloud
+
+from app.services.tokenizer import ARABIC_RANGE, TokenizerEngine, get_tokenizer, top_words
+
+
+TEXT = (
+    "Le cours était clair, les exercices trop longs. Les exercices du prof sont utiles! "
+    "The teacher's examples helped; examples EXAMPLES 2024 labs lab "
+    "الدرس كان واضحا جدا لكن التمارين صعبة الدرس"
+)
+
+
+def test_counts_match_wordcloud_process_text():
+    stopwords = {"le", "les", "du", "the", "sont", "trop", "كان", "لكن"}
+    expected = WordCloud(
+        stopwords=stopwords,
+        regexp=f"[\\w{ARABIC_RANGE}']+",
+        collocations=False
+    ).process_text(TEXT)
+
+    assert TokenizerEngine(stopwords).count_words(TEXT) == expected
+
+
+def test_counts_merge_case_and_plurals():
+    engine = TokenizerEngine(set())
+
+    counts = engine.count_words("Example examples EXAMPLE example class classes 42 teacher's")
+
+    # Plurals fold into the singular; "ss" words are not treated as plurals
+    assert counts == {"example": 4, "class": 1, "classes": 1, "teacher": 1}
+
+
+def test_tokenize_drops_stopwords_and_numbers():
+    engine = TokenizerEngine({"Le", "في"})
+    assert engine.tokenize("le cours 12 في الدرس") == ["cours", "الدرس"]
+    assert engine.count_words("") == {}
+
+
+def test_engine_is_built_once_per_process():
+    assert get_tokenizer() is get_tokenizer()
+    assert isinstance(get_tokenizer().stopwords, frozenset)
+
+
+def test_ngram_counts_skip_stopwords_and_numbers():
+    engine = TokenizerEngine({"le", "de"})
+
+    counts = engine.ngram_counts(["Cours magistral trop long", "cours magistral le matin", "cours 12 magistral"], 2)
+
+    assert counts == {"cours magistral": 2, "magistral trop": 1, "trop long": 1}
+    assert engine.ngram_counts(["cours magistral trop long"], 3) == {"cours magistral trop": 1, "magistral trop long": 1}
+
+
+def test_top_words_breaks_ties_alphabetically():
+    assert top_words({"b": 2, "a": 2, "c": 3, "d": 1}, 3) == [("c", 3), ("a", 2), ("b", 2)]
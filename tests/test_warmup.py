@@ -0,0 +1,111 @@
+import asyncio
+import sqlite3
+import pytest
+from unittest.mock import patch
+from fastapi import Response
+
+import app.main as main
+from app.services.warmup import Warmup
+
+
+@pytest.mark.asyncio
+async def test_runs_sync_and_async_steps_and_becomes_ready():
+    calls = []
+
+    async def connect():
+        calls.append("deepseek")
+
+    warmup = Warmup({"tokenizer": lambda: calls.append("tokenizer"), "deepseek": connect})
+    assert not warmup.ready
+
+    warmup.start(enabled=True)
+    await warmup._task
+
+    assert calls == ["tokenizer", "deepseek"]
+    assert warmup.ready
+    snapshot = warmup.snapshot()
+    assert snapshot["state"] == "done"
+    assert snapshot["steps"]["tokenizer"]["status"] == "ok"
+    assert snapshot["duration_ms"] is not None
+
+
+@pytest.mark.asyncio
+async def test_failed_step_does_not_block_readiness():
+    def broken():
+        raise OSError("no font")
+
+    warmup = Warmup({"fonts": broken, "tokenizer": lambda: None})
+    await warmup.run()
+
+    assert warmup.ready
+    assert warmup.results["fonts"] == {"status": "failed", "error": "no font", "ms": warmup.results["fonts"]["ms"]}
+    assert warmup.results["tokenizer"]["status"] == "ok"
+
+
+@pytest.mark.asyncio
+async def test_disabled_warmup_is_ready_immediately():
+    warmup = Warmup({"tokenizer": lambda: None})
+    warmup.start(enabled=False)
+
+    assert warmup.ready
+    assert warmup._task is None
+
+
+@pytest.mark.asyncio
+async def test_stop_cancels_a_running_warmup():
+    async def slow():
+        await asyncio.sleep(10)
+
+    warmup = Warmup({"deepseek": slow})
+    warmup.start(enabled=True)
+    await asyncio.sleep(0)
+    await warmup.stop()
+
+    assert warmup._task.cancelled()
+    assert not warmup.ready
+
+
+@pytest.mark.asyncio
+async def test_ready_endpoint_reports_warmup_and_database():
+    warmup = Warmup({})
+    response = Response()
+    with patch.object(main, "warmup", warmup), patch("app.main.ping_db"):
+        body = await main.readiness_check(response)
+        assert response.status_code == 503
+        assert body["status"] == "warming_up"
+
+        await warmup.run()
+        response = Response()
+        body = await main.readiness_check(response)
+
+    assert response.status_code == 200
+    assert body["status"] == "ready"
+    assert body["database"]["ok"] and body["database"]["latency_ms"] is not None
+
+
+@pytest.mark.asyncio
+async def test_ready_endpoint_unavailable_without_database():
+    warmup = Warmup({})
+    await warmup.run()
+    response = Response()
+    with patch.object(main, "warmup", warmup), \
+            patch("app.main.ping_db", side_effect=sqlite3.OperationalError("unable to open database file")):
+        body = await main.readiness_check(response)
+
+    assert response.status_code == 503
+    assert body["status"] == "unavailable"
+    assert body["database"] == {"ok": False, "error": "unable to open database file"}
+
+
+@pytest.mark.asyncio
+async def test_default_steps_prime_the_pipeline(monkeypatch):
+    from app.services import deepseek
+
+    monkeypatch.setattr(deepseek, "DEEPSEEK_API_KEY", "")
+    warmup = Warmup()
+    await warmup.run()
+    await deepseek.close_client()
+
+    assert {name: result["status"] for name, result in warmup.results.items()} == {
+        "fonts": "ok", "tokenizer": "ok", "wordcloud": "ok", "dedup": "ok", "deepseek": "ok"
+    }
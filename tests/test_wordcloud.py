@@ -1,6 +1,10 @@
 import pytest
 import os
+import io
+import base64
+import json
 from unittest.mock import patch, MagicMock
+from PIL import Image
 
 # The module under test
 from app.services.wordcloud import (
@@ -10,7 +14,11 @@ from app.services.wordcloud import (
     get_french_stopwords,
     find_multilingual_font,
     create_wordcloud,
-    get_top_words
+    create_wordcloud_from_frequencies,
+    extract_word_counts,
+    get_top_words,
+    render_layout_png,
+    WORDCLOUD_QUALITY_TIERS
 )
 
 def test_detect_has_arabic():
@@ -25,29 +33,31 @@ def test_detect_has_arabic():
     assert detect_has_arabic("!@#$") is False
     assert detect_has_arabic("") is False
 
-@patch('app.services.wordcloud.arabic_reshaper.ArabicReshaper')
-@patch('app.services.wordcloud.get_display')
-def test_process_arabic_word(mock_get_display, mock_reshaper_class):
-    mock_reshaper_instance = MagicMock()
-    mock_reshaper_class.return_value = mock_reshaper_instance
-
-    mock_reshaper_instance.reshape.return_value = "reshaped_arabic"
+@patch('app.services.tokenizer._reshaper')
+@patch('app.services.tokenizer.get_display')
+def test_process_arabic_word(mock_get_display, mock_reshaper):
+    process_arabic_word.cache_clear()
+    mock_reshaper.reshape.return_value = "reshaped_arabic"
     mock_get_display.return_value = "displayed_arabic"
 
     # Arabic word
     result = process_arabic_word("مرحبا")
     assert result == "displayed_arabic"
-    mock_reshaper_class.assert_called_once()
-    mock_reshaper_instance.reshape.assert_called_with("مرحبا")
+    mock_reshaper.reshape.assert_called_with("مرحبا")
     mock_get_display.assert_called_with("reshaped_arabic")
 
+    # Display forms are cached per word
+    assert process_arabic_word("مرحبا") == "displayed_arabic"
+    assert mock_reshaper.reshape.call_count == 1
+
     # Non-Arabic word should be returned as is
-    mock_reshaper_class.reset_mock()
+    mock_reshaper.reset_mock()
     mock_get_display.reset_mock()
     result = process_arabic_word("hello")
     assert result == "hello"
-    mock_reshaper_class.assert_not_called()
+    mock_reshaper.reshape.assert_not_called()
     mock_get_display.assert_not_called()
+    process_arabic_word.cache_clear()
 
 def test_get_multilingual_stopwords_happy_path():
     """Test get_multilingual_stopwords when stopwordsiso returns expected sets."""
@@ -60,7 +70,7 @@ def test_get_multilingual_stopwords_happy_path():
             return {'من', 'إلى'}
         return set()
 
-    with patch('app.services.wordcloud.stopwords', side_effect=mock_stopwords):
+    with patch('app.services.tokenizer.stopwords', side_effect=mock_stopwords):
         stopwords = get_multilingual_stopwords()
         assert 'le' in stopwords
         assert 'la' in stopwords
@@ -74,7 +84,7 @@ def test_get_multilingual_stopwords_fallback_path():
     def mock_stopwords_raise(lang):
         raise Exception(f"Mock exception for {lang}")
 
-    with patch('app.services.wordcloud.stopwords', side_effect=mock_stopwords_raise):
+    with patch('app.services.tokenizer.stopwords', side_effect=mock_stopwords_raise):
         stopwords = get_multilingual_stopwords()
         # Check some French fallback words
         assert 'le' in stopwords
@@ -91,7 +101,7 @@ def test_get_multilingual_stopwords_fallback_path():
 
 def test_get_french_stopwords():
     # Use patch to ensure both functions get the same mocked environment
-    with patch('app.services.wordcloud.stopwords', return_value={'test'}):
+    with patch('app.services.tokenizer.stopwords', return_value={'test'}):
         stopwords1 = get_multilingual_stopwords()
         stopwords2 = get_french_stopwords()
         assert stopwords1 == stopwords2
@@ -141,52 +151,144 @@ def test_create_wordcloud_empty_text(mock_plt, mock_wordcloud):
     assert img is None
     assert freqs == {}
 
+@patch('app.services.wordcloud.WORDCLOUD_RENDERER', 'matplotlib')
 @patch('app.services.wordcloud.WordCloud')
 @patch('app.services.wordcloud.plt')
 def test_create_wordcloud_success(mock_plt, mock_wordcloud):
-    # Setup mocks
-    mock_wc_base = MagicMock()
+    # Setup mocks: WordCloud is only used for the layout, counting uses the tokenizer
     mock_wc_final = MagicMock()
-
-    # WordCloud() returns different objects based on call order
-    mock_wordcloud.side_effect = [mock_wc_base, mock_wc_final]
-
-    mock_wc_base.process_text.return_value = {"word1": 10, "word2": 5}
+    mock_wordcloud.return_value = mock_wc_final
     mock_wc_final.generate_from_frequencies.return_value = mock_wc_final
-    mock_wc_final.words_ = {"word1": 10, "word2": 5}
+    mock_wc_final.words_ = {"word1": 1.0, "word2": 0.5}
 
     # Mock plt functions
     mock_fig = MagicMock()
     mock_ax = MagicMock()
     mock_plt.subplots.return_value = (mock_fig, mock_ax)
 
-    # Mock io.BytesIO indirectly by patching it or just let the real one run
     # Let's just patch plt.savefig to write something to the buffer
     def mock_savefig(buffer, *args, **kwargs):
         buffer.write(b"fake image data")
 
     mock_plt.savefig.side_effect = mock_savefig
 
-    img, freqs = create_wordcloud("word1 word2")
+    img, freqs = create_wordcloud("word1 word2 word1")
 
     assert img is not None
     # Base64 of "fake image data"
     assert img == "ZmFrZSBpbWFnZSBkYXRh"
-    assert freqs == {"word1": 10, "word2": 5}
+    assert freqs == {"word1": 1.0, "word2": 0.5}
 
     # Verify processing
-    mock_wc_base.process_text.assert_called_with("word1 word2")
-    mock_wc_final.generate_from_frequencies.assert_called_once()
+    mock_wc_final.generate_from_frequencies.assert_called_once_with({"word1": 2, "word2": 1})
+
+@patch('app.services.wordcloud.plt')
+def test_create_wordcloud_pil_renderer(mock_plt):
+    img, freqs = create_wordcloud_from_frequencies({"cours": 10, "exercices": 5, "الدرس": 3})
+
+    png = base64.b64decode(img)
+    assert png.startswith(b"\x89PNG")
+    image = Image.open(io.BytesIO(png))
+    # Wordcloud bitmap plus margins and the title band
+    assert image.width > 800 and image.height > 400
+    assert set(freqs) == {"cours", "exercices", process_arabic_word("الدرس")}
+    mock_plt.subplots.assert_not_called()
+
+def test_create_wordcloud_layout_output():
+    frequencies = {"cours": 10, "exercices": 5, "الدرس": 3}
+    layout_json, freqs = create_wordcloud_from_frequencies(frequencies, output="layout")
+
+    layout = json.loads(layout_json)
+    assert (layout["width"], layout["height"]) == (800, 400)
+    # Original words are shipped, the browser shapes Arabic itself
+    assert {word[0] for word in layout["words"]} == set(frequencies)
+    assert all(word[5].startswith("#") for word in layout["words"])
+    assert set(freqs) == {"cours", "exercices", process_arabic_word("الدرس")}
+
+    # The PNG drawn from the layout (PDF export) matches the direct render
+    image, _ = create_wordcloud_from_frequencies(frequencies)
+    assert render_layout_png(layout) == image
+
+def test_create_wordcloud_svg_output():
+    frequencies = {f"mot{i}": 100 - i for i in range(100)}
+    frequencies["الدرس"] = 50
+    svg_base64, _ = create_wordcloud_from_frequencies(frequencies, output="svg")
+    png_base64, _ = create_wordcloud_from_frequencies(frequencies)
+
+    svg = base64.b64decode(svg_base64).decode("utf-8")
+    assert svg.startswith("<svg") and "@font-face" in svg
+    # Arabic words are written in display form, without bidi reordering
+    assert process_arabic_word("الدرس") in svg and "unicode-bidi:bidi-override" in svg
+    layout = json.loads(create_wordcloud_from_frequencies(frequencies, output="layout")[0])
+    assert svg.count("<text") == len(layout["words"]) + 1  # Words and the title
+    assert len(svg_base64) < len(png_base64)
+
+def test_create_wordcloud_quality_tiers():
+    frequencies = {f"mot{i}": 100 - i for i in range(100)}
+
+    def size(image):
+        return Image.open(io.BytesIO(base64.b64decode(image))).size
+
+    standard, _ = create_wordcloud_from_frequencies(frequencies)
+    preview, preview_freqs = create_wordcloud_from_frequencies(frequencies, quality="preview")
+    printed, _ = create_wordcloud_from_frequencies(frequencies, quality="print")
+
+    # Preview lays out on a smaller canvas but renders at the requested size
+    assert size(preview) == size(standard)
+    assert len(preview_freqs) <= WORDCLOUD_QUALITY_TIERS["preview"]["max_words"]
+    assert size(printed)[0] > 1.9 * size(standard)[0]
+
+    # Layouts are in pixels of the rendered image
+    layout = json.loads(create_wordcloud_from_frequencies(frequencies, output="layout", quality="print")[0])
+    assert (layout["width"], layout["height"]) == (1600, 800)
+    assert render_layout_png(layout) == printed
+
+    # Unknown tier: no wordcloud, as for any rendering error
+    assert create_wordcloud_from_frequencies(frequencies, quality="ultra") == (None, {})
+
+def test_render_layout_png_scale():
+    layout = json.loads(create_wordcloud_from_frequencies({"cours": 10, "exercices": 5}, output="layout")[0])
+
+    width, height = Image.open(io.BytesIO(base64.b64decode(render_layout_png(layout, scale=2)))).size
+    base_width, base_height = Image.open(io.BytesIO(base64.b64decode(render_layout_png(layout)))).size
+    assert width > 1.9 * base_width and height > 1.9 * base_height
+
+def test_create_wordcloud_image_formats():
+    frequencies = {f"mot{i}": i for i in range(1, 60)}
+    images = {
+        image_format: base64.b64decode(create_wordcloud_from_frequencies(frequencies, image_format=image_format)[0])
+        for image_format in ("png", "png8", "webp")
+    }
+
+    assert Image.open(io.BytesIO(images["png"])).mode == "RGB"
+    assert Image.open(io.BytesIO(images["png8"])).mode == "P"
+    assert Image.open(io.BytesIO(images["webp"])).format == "WEBP"
+    assert len(images["png8"]) < len(images["png"]) and len(images["webp"]) < len(images["png"])
+
 
 @patch('app.services.wordcloud.create_wordcloud')
 def test_get_top_words(mock_create):
-    mock_create.return_value = ("img", {"apple": 5, "banana": 10, "orange": 2})
-
-    top = get_top_words("text", 2)
+    top = get_top_words("banana apple banana orange apple banana", 2)
+
+    assert top == [("banana", 1.0), ("apple", 2 / 3)]
+    # Frequencies come from the tokenizer, no image is rendered
+    mock_create.assert_not_called()
+    assert get_top_words("", 2) == []
+
+def test_create_wordcloud_passes_rendering_options():
+    text = "cours clair exemples cours exercices"
+    frequencies = extract_word_counts(text)
+
+    layout, _ = create_wordcloud(text, output="layout", quality="preview")
+    assert layout == create_wordcloud_from_frequencies(frequencies, output="layout", quality="preview")[0]
+    svg_base64, _ = create_wordcloud(text, output="svg")
+    assert base64.b64decode(svg_base64).decode("utf-8").startswith("<svg")
+    webp_base64, _ = create_wordcloud(text, image_format="webp")
+    assert Image.open(io.BytesIO(base64.b64decode(webp_base64))).format == "WEBP"
+    timings = {}
+    create_wordcloud(text, timings=timings)
+    assert set(timings) == {"layout", "encode"}
 
-    assert len(top) == 2
-    assert top[0] == ("banana", 10)
-    assert top[1] == ("apple", 5)
 
 @patch('app.services.wordcloud.WordCloud')
 def test_create_wordcloud_exception(mock_wordcloud):